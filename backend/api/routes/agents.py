@@ -1,22 +1,66 @@
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from typing import List
+from uuid import UUID
+from backend.core.agents.llm_settings import LLMSettings
 from backend.core.managers.agent_manager import AgentManager, get_agent_manager
+from backend.schemas.agent import AgentLLMSettingsResponse, AgentLLMSettingsUpdate
 
 router = APIRouter()
 
 
 @router.get("/all_agents", response_model=List[dict])
 async def get_all_agents(
+    request: Request,
+    response: Response,
     limit: int = Query(100, ge=1, le=1000, description="Number of agents to return"),
     offset: int = Query(0, ge=0, description="Number of agents to miss"),
     agent_manager: AgentManager = Depends(get_agent_manager)
 ):
-    agents = agent_manager.get_all_agents(limit=limit, offset=offset)
+    snapshot = agent_manager.get_snapshot()
+    etag = f'W/"agents-{snapshot.etag}-{limit}-{offset}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag in request.headers.get("if-none-match", ""):
+        return Response(status_code=304, headers=headers)
+
+    response.headers.update(headers)
     return [
         {
             "id": str(agent.id),
             "name": agent.name,
             "system_prompt": agent.system_prompt if agent.system_prompt else None
         }
-        for agent in agents
+        for agent in snapshot.agents[offset:offset + limit]
     ]
+
+
+def _llm_settings_response(agent) -> AgentLLMSettingsResponse:
+    settings = LLMSettings.from_agent(agent)
+    return AgentLLMSettingsResponse(id=str(agent.id), llm_provider=settings.provider,
+                                    model=settings.model_name,
+                                    temperature=settings.temperature,
+                                    max_tokens=settings.max_tokens, timeout=settings.timeout)
+
+
+@router.get("/agents/{agent_id}/llm_settings", response_model=AgentLLMSettingsResponse)
+async def get_agent_llm_settings(
+    agent_id: UUID,
+    agent_manager: AgentManager = Depends(get_agent_manager)
+):
+    """Діючі налаштування LLM агента (з урахуванням значень за замовчуванням)"""
+    agent = agent_manager.get_agent_by_id(str(agent_id))
+    if not agent:
+        raise HTTPException(status_code=404, detail="Agent not found")
+    return _llm_settings_response(agent)
+
+
+@router.patch("/agents/{agent_id}/llm_settings", response_model=AgentLLMSettingsResponse)
+async def update_agent_llm_settings(
+    agent_id: UUID,
+    settings: AgentLLMSettingsUpdate,
+    agent_manager: AgentManager = Depends(get_agent_manager)
+):
+    agent = agent_manager.update_agent_llm_settings(
+        str(agent_id), **settings.model_dump(exclude_unset=True))
+    if not agent:
+        raise HTTPException(status_code=404, detail="Agent not found")
+    return _llm_settings_response(agent)
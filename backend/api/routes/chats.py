@@ -1,10 +1,20 @@
-from fastapi import APIRouter, Depends
-from typing import List
+import logging
+from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, WebSocket, \
+    WebSocketDisconnect
+from pydantic import ValidationError
+from typing import List, Optional
+from uuid import UUID
+from backend.core.chat_memory import CHAT_MEMORY_ENABLED, get_chat_memory
+from backend.core.jobs.worker import get_worker_pool
 from backend.core.managers.chat_manager import ChatManager, get_chat_manager
-from backend.schemas.chat import ChatMessageCreate, ChatMessageResponse, \
-    ClearChatRequest
+from backend.core.managers.job_manager import JobLimitExceeded
+from backend.core.realtime import get_chat_hub
+from backend.schemas.chat import ChatMessage, ChatMessageCreate, ChatMessageResponse, \
+    ChatSummaryResponse, ClearChatRequest, ChatMessageBulkCreate, ChatMessageBulkResponse
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
 
 
 @router.post("/add_message", response_model=ChatMessageResponse)
@@ -13,22 +23,94 @@ async def add_message(
     chat_manager: ChatManager = Depends(get_chat_manager),
 ):
     new_message = chat_manager.add_message(**message_data.dict())
+    if new_message and CHAT_MEMORY_ENABLED:
+        get_chat_memory().remember([{**message_data.dict(), "id": new_message.id}])
     return new_message
 
 
+@router.post("/add_messages", response_model=ChatMessageBulkResponse)
+async def add_messages(
+    bulk_data: ChatMessageBulkCreate,
+    chat_manager: ChatManager = Depends(get_chat_manager),
+):
+    """Пакетне збереження повідомлень (імпорт, синхронізація) в одній транзакції"""
+    messages = [message.dict() for message in bulk_data.messages]
+    ids = chat_manager.add_messages(messages)
+    if CHAT_MEMORY_ENABLED:
+        get_chat_memory().remember([{**message, "id": id} for message, id in zip(messages, ids)])
+    return ChatMessageBulkResponse(ids=ids, count=len(ids))
+
+
 @router.get("/get_chat", response_model=List[ChatMessageResponse])
 async def get_chat(
     user_id: str,
     agent_id: str,
+    request: Request,
+    response: Response,
+    since: Optional[UUID] = None,
     chat_manager: ChatManager = Depends(get_chat_manager),
 ):
-    chat = chat_manager.get_chat_by_user_and_agent(
-        user_id=user_id,
-        agent_id=agent_id
-    )
+    """
+    Історія чату. З since=<X-Chat-Cursor попередньої відповіді> повертає
+    лише повідомлення, записані після нього; якщо курсор більше не існує -
+    повну історію з заголовком X-Chat-Reset.
+    """
+    etag = f'W/"{chat_manager.get_chat_version(user_id=user_id, agent_id=agent_id)}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag in request.headers.get("if-none-match", ""):
+        return Response(status_code=304, headers=headers)
+
+    response.headers.update(headers)
+    chat = None
+    if since:
+        chat = chat_manager.get_chat_since(
+            user_id=user_id,
+            agent_id=agent_id,
+            cursor=str(since)
+        )
+        if chat is None:
+            response.headers["X-Chat-Reset"] = "1"
+    if chat is None:
+        chat = chat_manager.get_chat_by_user_and_agent(
+            user_id=user_id,
+            agent_id=agent_id
+        )
+    if chat:
+        # Повна історія впорядкована за was_sent, курсор - останнє записане повідомлення
+        response.headers["X-Chat-Cursor"] = str(max(chat, key=lambda message: message.seq).id)
     return chat
 
 
+@router.get("/get_chat_summary", response_model=Optional[ChatSummaryResponse])
+async def get_chat_summary(
+    user_id: str,
+    agent_id: str,
+    chat_manager: ChatManager = Depends(get_chat_manager),
+):
+    """Підсумок архівованої частини чату (null, якщо архіву ще немає)"""
+    return chat_manager.get_chat_summary(user_id=user_id, agent_id=agent_id)
+
+
+@router.get("/get_chat_archive", response_model=List[ChatMessageResponse])
+async def get_chat_archive(
+    user_id: str,
+    agent_id: str,
+    before: Optional[UUID] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    chat_manager: ChatManager = Depends(get_chat_manager),
+):
+    """
+    Архівовані повідомлення чату сторінками від новіших до старіших:
+    before=<id найстарішого отриманого повідомлення> повертає попередні
+    limit повідомлень (у хронологічному порядку)
+    """
+    messages = chat_manager.get_archived_messages(
+        user_id=user_id, agent_id=agent_id, before=str(before) if before else None, limit=limit)
+    if messages is None:
+        raise HTTPException(status_code=404, detail="Cursor message not found")
+    return messages
+
+
 @router.post("/clear_chat")
 async def clear_chat(
     request: ClearChatRequest,
@@ -38,4 +120,63 @@ async def clear_chat(
         user_id=request.user_id,
         agent_id=request.agent_id
     )
+    if result:
+        get_chat_memory().forget(request.user_id, request.agent_id)
     return result
+
+
+async def handle_socket_message(user_id: str, agent_id: str, data: dict) -> None:
+    """Ставить повідомлення з WebSocket у чергу задач; відповідь прийде подіями воркера"""
+    hub = get_chat_hub()
+    try:
+        chat_message = ChatMessage(
+            message_type=data.get("message_type", "TEXT"),
+            text=data.get("text"),
+            image=data.get("image"),
+            was_sent=data.get("was_sent") or datetime.utcnow(),
+            agent_id=agent_id,
+            user_id=user_id,
+        )
+        job = get_worker_pool().enqueue(
+            user_id=user_id,
+            kind="chat_response",
+            payload=chat_message.model_dump(mode="json"),
+            agent_id=agent_id,
+        )
+    except (ValidationError, JobLimitExceeded) as e:
+        await hub.send(user_id, agent_id, {"type": "error", "detail": str(e)})
+        return
+    except Exception as e:
+        logger.exception(f"Помилка обробки повідомлення з WebSocket: {e}")
+        await hub.send(user_id, agent_id, {"type": "error", "detail": str(e)})
+        return
+    await hub.send(user_id, agent_id, {"type": "job", "job": job})
+
+
+@router.websocket("/ws/chat/{user_id}/{agent_id}")
+async def chat_socket(websocket: WebSocket, user_id: str, agent_id: str):
+    """
+    Канал чату для сесії (user, agent). Клієнт надсилає
+    {"type": "message", "text": ...}, {"type": "subscribe", "topic": ...}
+    або {"type": "ping"}; сервер - стан задачі ("job"), збережені
+    повідомлення ("message"), прогрес агента ("progress"), помилки ("error")
+    та події фонових процесів.
+    """
+    hub = get_chat_hub()
+    await hub.connect(websocket, user_id, agent_id)
+    try:
+        while True:
+            data = await websocket.receive_json()
+            if not isinstance(data, dict):
+                continue
+            kind = data.get("type")
+            if kind == "message":
+                await handle_socket_message(user_id, agent_id, data)
+            elif kind == "subscribe" and data.get("topic"):
+                hub.subscribe(websocket, data["topic"])
+            elif kind == "ping":
+                await websocket.send_json({"type": "pong"})
+    except (WebSocketDisconnect, ValueError):
+        pass
+    finally:
+        hub.disconnect(websocket)
@@ -0,0 +1,40 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from typing import List
+from uuid import UUID
+from backend.core.jobs.worker import serialize_job
+from backend.core.managers.job_manager import JobManager, get_job_manager
+
+router = APIRouter()
+
+
+@router.get("/jobs", response_model=List[dict])
+async def get_user_jobs(
+    user_id: UUID,
+    active_only: bool = Query(False, description="Only queued and running jobs"),
+    limit: int = Query(50, ge=1, le=500),
+    job_manager: JobManager = Depends(get_job_manager),
+):
+    jobs = job_manager.get_user_jobs(str(user_id), active_only=active_only, limit=limit)
+    return [serialize_job(job) for job in jobs]
+
+
+@router.get("/jobs/{job_id}")
+async def get_job(
+    job_id: UUID,
+    job_manager: JobManager = Depends(get_job_manager),
+):
+    job = job_manager.get_job(str(job_id))
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return serialize_job(job)
+
+
+@router.post("/jobs/{job_id}/cancel")
+async def cancel_job(
+    job_id: UUID,
+    job_manager: JobManager = Depends(get_job_manager),
+):
+    job = job_manager.request_cancel(str(job_id))
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return serialize_job(job)
@@ -0,0 +1,81 @@
+from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, Query
+from typing import List, Optional
+from uuid import UUID
+from backend.core.managers.usage_manager import UsageManager, get_usage_manager
+
+router = APIRouter()
+
+
+def serialize_usage(usage) -> dict:
+    return {
+        "id": str(usage.id),
+        "chat_message_id": str(usage.chat_message_id),
+        "user_id": str(usage.user_id),
+        "agent_id": str(usage.agent_id) if usage.agent_id else None,
+        "agent_type": usage.agent_type,
+        "model": usage.model,
+        "prompt_chars": usage.prompt_chars,
+        "prompt_tokens": usage.prompt_tokens,
+        "cached_prompt_tokens": usage.cached_prompt_tokens,
+        "completion_tokens": usage.completion_tokens,
+        "llm_requests": usage.llm_requests,
+        "tool_calls": usage.tool_calls,
+        "duration_ms": usage.duration_ms,
+        "coins": usage.coins,
+        "created_at": usage.created_at.isoformat(),
+    }
+
+
+def _serialize_totals(totals: dict) -> dict:
+    result = {key: (str(value) if isinstance(value, UUID) else value) for key, value in totals.items()}
+    result["avg_duration_ms"] = round(float(result["avg_duration_ms"]), 1)
+    return result
+
+
+@router.get("/usage/agents", response_model=List[dict])
+async def get_usage_by_agent(
+    since: Optional[datetime] = None,
+    user_id: Optional[UUID] = None,
+    usage_manager: UsageManager = Depends(get_usage_manager),
+):
+    """Токени, монети і затримки по агентах, від найдорожчого"""
+    totals = usage_manager.usage_by_agent(since=since, user_id=str(user_id) if user_id else None)
+    return [_serialize_totals(row) for row in totals]
+
+
+@router.get("/usage/users/{user_id}")
+async def get_user_usage(
+    user_id: UUID,
+    since: Optional[datetime] = None,
+    usage_manager: UsageManager = Depends(get_usage_manager),
+):
+    balance = usage_manager.get_balance(str(user_id))
+    if balance is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    totals = _serialize_totals(usage_manager.usage_by_user(str(user_id), since=since))
+    return {"user_id": str(user_id), "coin_count": balance, **totals}
+
+
+@router.get("/usage/top", response_model=List[dict])
+async def get_top_usage(
+    limit: int = Query(20, ge=1, le=200),
+    since: Optional[datetime] = None,
+    agent_id: Optional[UUID] = None,
+    usage_manager: UsageManager = Depends(get_usage_manager),
+):
+    """Найдорожчі повідомлення за токенами"""
+    rows = usage_manager.top_messages(limit=limit, since=since,
+                                      agent_id=str(agent_id) if agent_id else None)
+    return [serialize_usage(row) for row in rows]
+
+
+@router.get("/usage/messages/{chat_message_id}")
+async def get_message_usage(
+    chat_message_id: UUID,
+    usage_manager: UsageManager = Depends(get_usage_manager),
+):
+    usage = usage_manager.get_message_usage(str(chat_message_id))
+    if not usage:
+        raise HTTPException(status_code=404, detail="Usage not found")
+    return serialize_usage(usage)
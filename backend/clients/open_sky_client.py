@@ -1,12 +1,15 @@
 import os
 from dataclasses import dataclass
 
-import requests
 from typing import Optional, List, Union, Dict, Any
 from datetime import datetime, timezone
 import time
 from pydantic import BaseModel
 
+from backend.clients.open_sky_scheduler import get_scheduler
+from backend.clients.photo_cache import get_photo_cache
+from backend.clients.transport import get_transport
+
 AIRPORT_DB_TOKEN = os.getenv("AIRPORT_DB_TOKEN")
 
 class StateVector(BaseModel):
@@ -90,9 +93,18 @@ class OpenSkyClient:
 
     def __init__(self, username: Optional[str] = None, password: Optional[str] = None):
         self.base_url = "https://opensky-network.org/api"
-        self.session = requests.Session()
-        if username and password:
-            self.session.auth = (username, password)
+        self.transport = get_transport()
+        self.auth = (username, password) if username and password else None
+        self.scheduler = get_scheduler(authenticated=self.auth is not None)
+
+    def _get_json(self, endpoint: str, params: Dict[str, Any]) -> Any:
+        """GET до OpenSky API через спільний планувальник кредитів"""
+        return self.scheduler.execute(
+            endpoint,
+            params,
+            lambda: self.transport.get(f"{self.base_url}/{endpoint}", params=params,
+                                       auth=self.auth)
+        )
 
     def get_current_aircraft_state(self, icao24: str) -> Optional[AircraftState]:
         """
@@ -110,10 +122,7 @@ class OpenSkyClient:
                 'icao24': icao24.lower()  # OpenSky вимагає lowercase
             }
 
-            response = self.session.get(f"{self.base_url}/states/all", params=params)
-            response.raise_for_status()
-
-            data = response.json()
+            data = self._get_json("states/all", params)
 
             # Перевіряємо чи є дані про літаки
             if not data.get('states') or len(data['states']) == 0:
@@ -285,10 +294,7 @@ class OpenSkyClient:
 
         print(f"Request params: {params}")
 
-        response = self.session.get(f"{self.base_url}/states/all", params=params)
-        response.raise_for_status()
-
-        data = response.json()
+        data = self._get_json("states/all", params)
         print(f"API Response: {data}")
 
         if not data.get('states'):
@@ -321,13 +327,12 @@ class OpenSkyClient:
         return states
 
     def get_image_of_aircraft(self, hex_code: str):
-        url = f"https://api.planespotters.net/pub/photos/hex/{hex_code}"
-        response = self.session.get(url)
-        return response.json()
+        """Фото літака з planespotters через постійний кеш (див. photo_cache)"""
+        return get_photo_cache().get_photo(hex_code)
 
     def get_airport_info(self, code: str):
         url = f"https://airportdb.io/api/v1/airport/{code}?apiToken={AIRPORT_DB_TOKEN}"
-        response = self.session.get(url)
+        response = self.transport.get(url)
         return response.json()
 
     def get_flights_by_aircraft(
@@ -343,11 +348,8 @@ class OpenSkyClient:
             'end': end
         }
 
-        response = self.session.get(f"{self.base_url}/flights/aircraft", params=params)
-        response.raise_for_status()
-
         flights = []
-        for flight_data in response.json():
+        for flight_data in self._get_json("flights/aircraft", params):
             flights.append(Flight(
                 icao24=flight_data['icao24'],
                 first_seen=flight_data['firstSeen'],
@@ -379,10 +381,7 @@ class OpenSkyClient:
             'end': end
         }
 
-        response = self.session.get(f"{self.base_url}/flights/all", params=params)
-        response.raise_for_status()
-
-        return [Flight(**flight) for flight in response.json()]
+        return [Flight(**flight) for flight in self._get_json("flights/all", params)]
 
     def get_arrivals_by_airport(self, airport: str, begin: int, end: int) -> List[
         Flight]:
@@ -393,11 +392,8 @@ class OpenSkyClient:
             'end': end
         }
 
-        response = self.session.get(f"{self.base_url}/flights/arrival", params=params)
-        response.raise_for_status()
-
         flights = []
-        for flight_data in response.json():
+        for flight_data in self._get_json("flights/arrival", params):
             flights.append(Flight(
                 icao24=flight_data['icao24'],
                 first_seen=flight_data['firstSeen'],
@@ -435,11 +431,8 @@ class OpenSkyClient:
             'end': end
         }
 
-        response = self.session.get(f"{self.base_url}/flights/departure", params=params)
-        response.raise_for_status()
-
         flights = []
-        for flight_data in response.json():
+        for flight_data in self._get_json("flights/departure", params):
             flights.append(Flight(
                 icao24=flight_data['icao24'],
                 first_seen=flight_data['firstSeen'],
@@ -471,10 +464,7 @@ class OpenSkyClient:
             'time': time
         }
 
-        response = self.session.get(f"{self.base_url}/tracks/all", params=params)
-        response.raise_for_status()
-
-        data = response.json()
+        data = self._get_json("tracks/all", params)
         if not data.get('path'):
             return []
 
@@ -506,10 +496,7 @@ class OpenSkyClient:
             'lomax': lomax
         }
 
-        response = self.session.get(f"{self.base_url}/states/all", params=params)
-        response.raise_for_status()
-
-        return response.json()
+        return self._get_json("states/all", params)
 
     @staticmethod
     def timestamp_to_datetime(timestamp: int) -> datetime:
@@ -543,7 +530,7 @@ if __name__ == "__main__":
     try:
         # Якщо автентифікація є, використовуємо bbox, інакше без нього
         params = {'time': current_time - 300}  # 5 хвилин тому
-        if client.session.auth:
+        if client.auth:
             params.update({'lamin': 45.0, 'lomin': 5.0, 'lamax': 55.0, 'lomax': 25.0})
         states = client.get_states(**params)
         print(f"Отримано {len(states)} векторів стану")
@@ -568,7 +555,7 @@ if __name__ == "__main__":
 
     # Тест 3: get_flights_by_interval
     print("\nТестування get_flights_by_interval...")
-    if client.session.auth:  # Перевірка наявності автентифікації
+    if client.auth:  # Перевірка наявності автентифікації
         try:
             flights = client.get_flights_by_interval(begin=seven_days_ago, end=current_time)
             print(f"Отримано {len(flights)} рейсів у часовому діапазоні")
@@ -624,7 +611,7 @@ if __name__ == "__main__":
     print("\nТестування get_states_raw...")
     try:
         # Якщо автентифікація є, використовуємо bbox, інакше без нього
-        if client.session.auth:
+        if client.auth:
             raw_data = client.get_states_raw(lamin=45.0, lomin=5.0, lamax=55.0, lomax=25.0)
         else:
             raw_data = client.get_states_raw()  # Без bbox для неавтентифікованих
@@ -0,0 +1,261 @@
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import requests
+
+from backend.core.metrics import record_cache
+from backend.core.tracing import annotate
+
+logger = logging.getLogger(__name__)
+
+# Денні ліміти кредитів OpenSky
+ANONYMOUS_DAILY_CREDITS = 400
+AUTHENTICATED_DAILY_CREDITS = 4000
+
+# Часова роздільність /states/all (секунди): анонімні - 10 с, з логіном - 5 с
+ANONYMOUS_RESOLUTION = 10
+AUTHENTICATED_RESOLUTION = 5
+
+# Вартість /states/all за площею bbox (кв. градуси): (верхня межа, кредити)
+STATES_AREA_COSTS = [(25, 1), (100, 2), (400, 3)]
+STATES_GLOBAL_COST = 4
+
+REMAINING_HEADER = "X-Rate-Limit-Remaining"
+RETRY_AFTER_HEADER = "X-Rate-Limit-Retry-After-Seconds"
+
+
+class OpenSkyRateLimitError(requests.HTTPError):
+    """Кредити OpenSky вичерпано і немає кешованих даних для відповіді"""
+
+
+def estimate_cost(endpoint: str, params: Dict[str, Any]) -> int:
+    """
+    Оцінює вартість запиту в кредитах OpenSky.
+    /states/all залежить від площі bbox, решта ендпоінтів - 1 кредит за запит
+    (flights/all - 4, бо це глобальний запит).
+    """
+    if endpoint == "states/all":
+        if params.get("icao24") and not _has_bbox(params):
+            return 1
+        if not _has_bbox(params):
+            return STATES_GLOBAL_COST
+        area = (params["lamax"] - params["lamin"]) * (params["lomax"] - params["lomin"])
+        for limit, cost in STATES_AREA_COSTS:
+            if area <= limit:
+                return cost
+        return STATES_GLOBAL_COST
+    if endpoint == "flights/all":
+        return 4
+    return 1
+
+
+def _has_bbox(params: Dict[str, Any]) -> bool:
+    return all(key in params for key in ("lamin", "lamax", "lomin", "lomax"))
+
+
+def _cache_key(endpoint: str, params: Dict[str, Any]) -> Tuple:
+    return endpoint, tuple(sorted((key, str(value)) for key, value in params.items()))
+
+
+def _covers(cached_params: Dict[str, Any], params: Dict[str, Any]) -> bool:
+    """Чи містить кешований знімок /states/all усі дані запитуваного"""
+    if "time" in cached_params or "icao24" in cached_params or "time" in params:
+        return False
+    if not _has_bbox(cached_params):
+        return True
+    if not _has_bbox(params):
+        return False
+    return (cached_params["lamin"] <= params["lamin"]
+            and cached_params["lamax"] >= params["lamax"]
+            and cached_params["lomin"] <= params["lomin"]
+            and cached_params["lomax"] >= params["lomax"])
+
+
+def _slice_states(data: Dict[str, Any], params: Dict[str, Any]) -> Dict[str, Any]:
+    """Вирізає з ширшого знімку стани для bbox / icao24 запиту"""
+    states = data.get("states") or []
+    if _has_bbox(params):
+        states = [
+            state for state in states
+            if state[6] is not None and state[5] is not None
+            and params["lamin"] <= state[6] <= params["lamax"]
+            and params["lomin"] <= state[5] <= params["lomax"]
+        ]
+    if params.get("icao24"):
+        wanted = set(str(params["icao24"]).lower().split(","))
+        states = [state for state in states if state[0] in wanted]
+    return {**data, "states": states}
+
+
+class OpenSkyRequestScheduler:
+    """
+    Спільний для всіх OpenSkyClient планувальник запитів з обліком кредитів.
+
+    - оцінює вартість запиту за площею bbox і веде залишок кредитів
+      (з заголовка X-Rate-Limit-Remaining, а без нього - локально);
+    - не робить повторних запитів у межах часової роздільності OpenSky
+      і відповідає з ширшого свіжого знімку, якщо він покриває bbox;
+    - об'єднує однакові запити, що виконуються одночасно;
+    - обмежує кількість паралельних запитів (решта чекає в черзі);
+    - коли кредитів мало або отримано 429 - віддає застарілі кешовані дані.
+    """
+
+    def __init__(self, daily_credits: int, resolution_seconds: int,
+                 reserve_ratio: float = 0.1, max_stale_seconds: int = 3600,
+                 max_concurrent: int = 2, cache_size: int = 256):
+        self.daily_credits = daily_credits
+        self.resolution_seconds = resolution_seconds
+        self.reserve = int(daily_credits * reserve_ratio)
+        self.max_stale_seconds = max_stale_seconds
+        self.cache_size = cache_size
+
+        self.remaining = daily_credits
+        self.blocked_until = 0.0
+        self._day = self._today()
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_concurrent)
+        self._cache: "OrderedDict[Tuple, Tuple[float, Dict, Any]]" = OrderedDict()
+        self._inflight: Dict[Tuple, threading.Event] = {}
+
+    @staticmethod
+    def _today():
+        return datetime.now(timezone.utc).date()
+
+    def _reset_if_new_day(self) -> None:
+        today = self._today()
+        if today != self._day:
+            self._day = today
+            self.remaining = self.daily_credits
+
+    def _lookup(self, endpoint: str, params: Dict[str, Any], max_age: float) -> Optional[Any]:
+        now = time.time()
+        cached = self._cache.get(_cache_key(endpoint, params))
+        if cached and now - cached[0] <= max_age:
+            return cached[2]
+        if endpoint != "states/all":
+            return None
+        for fetched_at, cached_params, data in reversed(self._cache.values()):
+            if (fetched_at is not None and now - fetched_at <= max_age
+                    and cached_params.get("_endpoint") == endpoint
+                    and _covers(cached_params, params)):
+                return _slice_states(data, params)
+        return None
+
+    def _store(self, endpoint: str, params: Dict[str, Any], data: Any) -> None:
+        key = _cache_key(endpoint, params)
+        self._cache[key] = (time.time(), {**params, "_endpoint": endpoint}, data)
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def _update_budget(self, response: requests.Response, cost: int) -> None:
+        remaining = response.headers.get(REMAINING_HEADER)
+        if remaining is not None and remaining.lstrip("-").isdigit():
+            self.remaining = int(remaining)
+        elif response.status_code != 429:
+            self.remaining -= cost
+
+        if response.status_code == 429:
+            retry_after = response.headers.get(RETRY_AFTER_HEADER, "")
+            wait = int(retry_after) if retry_after.isdigit() else 60
+            self.blocked_until = time.time() + wait
+            self.remaining = 0
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            self._reset_if_new_day()
+            return {
+                "remaining": self.remaining,
+                "daily_credits": self.daily_credits,
+                "blocked_for_seconds": max(0, int(self.blocked_until - time.time())),
+                "cached_responses": len(self._cache),
+            }
+
+    def execute(self, endpoint: str, params: Dict[str, Any],
+                send: Callable[[], requests.Response]) -> Any:
+        """
+        Виконує запит через планувальник і повертає розібраний JSON
+
+        Args:
+            endpoint (str): Шлях без базового URL (наприклад, "states/all")
+            params (Dict): Параметри запиту
+            send (Callable): Функція, що робить HTTP-запит і повертає response
+        """
+        key = _cache_key(endpoint, params)
+        coalesced = False
+        while True:
+            with self._lock:
+                self._reset_if_new_day()
+                fresh = self._lookup(endpoint, params, self.resolution_seconds)
+                if fresh is not None:
+                    annotate(opensky_cache="coalesced" if coalesced else "fresh")
+                    record_cache("opensky", "coalesced" if coalesced else "fresh")
+                    return fresh
+
+                pending = self._inflight.get(key)
+                if pending is None:
+                    cost = estimate_cost(endpoint, params)
+                    blocked = time.time() < self.blocked_until
+                    if blocked or self.remaining - cost < self.reserve:
+                        stale = self._lookup(endpoint, params, self.max_stale_seconds)
+                        if stale is not None:
+                            logger.warning(f"OpenSky budget low ({self.remaining} credits), "
+                                           f"serving cached {endpoint}")
+                            annotate(opensky_cache="stale")
+                            record_cache("opensky", "stale")
+                            return stale
+                        if blocked or self.remaining < cost:
+                            raise OpenSkyRateLimitError(
+                                f"OpenSky credits exhausted ({self.remaining} left, "
+                                f"{cost} needed) and no cached data for {endpoint}")
+                    self._inflight[key] = threading.Event()
+                    break
+            # Такий самий запит уже виконується - чекаємо і беремо його результат
+            coalesced = True
+            pending.wait()
+
+        annotate(opensky_cache="miss", opensky_cost=cost)
+        record_cache("opensky", "miss")
+
+        try:
+            with self._slots:
+                response = send()
+            with self._lock:
+                self._update_budget(response, cost)
+                if response.status_code == 429:
+                    stale = self._lookup(endpoint, params, self.max_stale_seconds)
+                    if stale is not None:
+                        annotate(opensky_cache="stale")
+                        record_cache("opensky", "stale")
+                        return stale
+                    raise OpenSkyRateLimitError(
+                        f"OpenSky rate limit reached for {endpoint}", response=response)
+            response.raise_for_status()
+            data = response.json()
+            with self._lock:
+                self._store(endpoint, params, data)
+            return data
+        finally:
+            with self._lock:
+                self._inflight.pop(key).set()
+
+
+_schedulers: Dict[bool, OpenSkyRequestScheduler] = {}
+_schedulers_lock = threading.Lock()
+
+
+def get_scheduler(authenticated: bool) -> OpenSkyRequestScheduler:
+    """Один планувальник на процес для анонімного і для авторизованого доступу"""
+    with _schedulers_lock:
+        if authenticated not in _schedulers:
+            default_credits = AUTHENTICATED_DAILY_CREDITS if authenticated else ANONYMOUS_DAILY_CREDITS
+            _schedulers[authenticated] = OpenSkyRequestScheduler(
+                daily_credits=int(os.getenv("OPENSKY_DAILY_CREDITS") or default_credits),
+                resolution_seconds=AUTHENTICATED_RESOLUTION if authenticated else ANONYMOUS_RESOLUTION,
+            )
+        return _schedulers[authenticated]
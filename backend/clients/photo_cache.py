@@ -0,0 +1,256 @@
+"""
+Кеш фото літаків з planespotters.
+
+Метадані фото (і результат "фото немає") зберігаються в таблиці
+aircraft_photos з довгим TTL і дублюються в пам'яті процесу, тому
+повторний запит того самого hex коду не робить жодного мережевого виклику.
+Опціонально мініатюри зберігаються локально і віддаються з /static;
+після закінчення TTL файл ревалідується умовним GET (If-None-Match /
+If-Modified-Since).
+"""
+import logging
+import os
+import re
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional, Tuple
+
+from backend.clients.transport import get_transport
+from backend.core.managers.aircraft_photo_manager import AircraftPhotoManagerContext
+from backend.core.metrics import record_cache
+from backend.core.tracing import span
+
+logger = logging.getLogger(__name__)
+
+PLANESPOTTERS_URL = "https://api.planespotters.net/pub/photos/hex/{hex_code}"
+
+# Фото літаків майже не змінюються, а "фото немає" може з'явитися згодом
+PHOTO_TTL = timedelta(days=int(os.getenv("AIRCRAFT_PHOTO_TTL_DAYS") or 30))
+NO_PHOTO_TTL = timedelta(days=1)
+
+LOCAL_STORE_ENABLED = os.getenv("AIRCRAFT_PHOTO_STORE", "false").lower() in ("1", "true", "yes")
+STATIC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__)))), "frontend", "static")
+STORE_SUBDIR = "aircraft_photos"
+
+MEMORY_CACHE_SIZE = 2048
+HEX_CODE_PATTERN = re.compile(r"^[0-9a-f]{6}$")
+# Поля запису, крім терміну дії: якщо ревалідація їх не змінила, рядок у БД не переписується
+ENTRY_FIELDS = ("has_photo", "thumbnail_url", "link", "photographer", "local_path", "etag",
+                "last_modified")
+
+
+class AircraftPhotoCache:
+    """Дворівневий кеш (пам'ять -> БД) метаданих фото + локальне сховище мініатюр"""
+
+    def __init__(self, store_enabled: bool = LOCAL_STORE_ENABLED, static_dir: str = STATIC_DIR,
+                 memory_size: int = MEMORY_CACHE_SIZE):
+        self.store_enabled = store_enabled
+        self.store_dir = os.path.join(static_dir, STORE_SUBDIR)
+        self.memory_size = memory_size
+        self.transport = get_transport()
+        self._memory: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    # --- рівні кешу ---
+
+    def _remember(self, hex_code: str, entry: Dict[str, Any]) -> None:
+        with self._lock:
+            self._memory[hex_code] = entry
+            self._memory.move_to_end(hex_code)
+            while len(self._memory) > self.memory_size:
+                self._memory.popitem(last=False)
+
+    def _from_memory(self, hex_code: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._memory.get(hex_code)
+            if entry:
+                self._memory.move_to_end(hex_code)
+            return entry
+
+    @staticmethod
+    def _from_db(hex_code: str) -> Optional[Dict[str, Any]]:
+        try:
+            with AircraftPhotoManagerContext() as photo_manager:
+                photo = photo_manager.get_photo(hex_code)
+                if not photo:
+                    return None
+                return {
+                    "has_photo": photo.has_photo,
+                    "thumbnail_url": photo.thumbnail_url,
+                    "link": photo.link,
+                    "photographer": photo.photographer,
+                    "local_path": photo.local_path,
+                    "etag": photo.etag,
+                    "last_modified": photo.last_modified,
+                    "expires_at": photo.expires_at,
+                }
+        except Exception as e:
+            logger.warning(f"Aircraft photo cache: DB lookup failed for {hex_code}: {e}")
+            return None
+
+    @staticmethod
+    def _to_db(hex_code: str, entry: Dict[str, Any]) -> None:
+        try:
+            with AircraftPhotoManagerContext() as photo_manager:
+                photo_manager.save_photo(hex_code, **entry)
+        except Exception as e:
+            logger.warning(f"Aircraft photo cache: DB save failed for {hex_code}: {e}")
+
+    @staticmethod
+    def _extend_in_db(hex_code: str, expires_at: datetime) -> None:
+        try:
+            with AircraftPhotoManagerContext() as photo_manager:
+                photo_manager.extend_photo(hex_code, expires_at)
+        except Exception as e:
+            logger.warning(f"Aircraft photo cache: DB extend failed for {hex_code}: {e}")
+
+    # --- мережа ---
+
+    def _fetch_metadata(self, hex_code: str) -> Dict[str, Any]:
+        response = self.transport.get(PLANESPOTTERS_URL.format(hex_code=hex_code))
+        response.raise_for_status()
+        photos = response.json().get("photos") or []
+        if not photos:
+            return {"has_photo": False}
+
+        photo = photos[0]
+        return {
+            "has_photo": True,
+            "thumbnail_url": photo.get("thumbnail", {}).get("src"),
+            "link": photo.get("link"),
+            "photographer": photo.get("photographer"),
+        }
+
+    def _local_file(self, hex_code: str) -> str:
+        return os.path.join(self.store_dir, f"{hex_code}.jpg")
+
+    def _store_thumbnail(self, hex_code: str, entry: Dict[str, Any],
+                         previous: Optional[Dict[str, Any]]) -> None:
+        """
+        Завантажує мініатюру в локальне сховище. Якщо файл уже є і URL не
+        змінився - робить умовний GET і при 304 залишає файл без змін.
+        """
+        path = self._local_file(hex_code)
+        headers = {}
+        same_image = (previous and previous.get("local_path")
+                      and previous.get("thumbnail_url") == entry["thumbnail_url"]
+                      and os.path.exists(path))
+        if same_image:
+            if previous.get("etag"):
+                headers["If-None-Match"] = previous["etag"]
+            if previous.get("last_modified"):
+                headers["If-Modified-Since"] = previous["last_modified"]
+
+        response = self.transport.get(entry["thumbnail_url"], headers=headers)
+        if response.status_code == 304 and same_image:
+            entry.update(local_path=previous["local_path"], etag=previous.get("etag"),
+                         last_modified=previous.get("last_modified"))
+            return
+        response.raise_for_status()
+
+        os.makedirs(self.store_dir, exist_ok=True)
+        temp_path = f"{path}.tmp"
+        with open(temp_path, "wb") as f:
+            f.write(response.content)
+        os.replace(temp_path, path)
+        entry.update(local_path=f"/static/{STORE_SUBDIR}/{hex_code}.jpg",
+                     etag=response.headers.get("ETag"),
+                     last_modified=response.headers.get("Last-Modified"))
+
+    def _refresh(self, hex_code: str, previous: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        entry = self._fetch_metadata(hex_code)
+        entry.setdefault("thumbnail_url", None)
+        entry.setdefault("link", None)
+        entry.setdefault("photographer", None)
+        entry.update(local_path=None, etag=None, last_modified=None)
+
+        if entry["has_photo"] and entry["thumbnail_url"] and self.store_enabled:
+            try:
+                self._store_thumbnail(hex_code, entry, previous)
+            except Exception as e:
+                logger.warning(f"Aircraft photo cache: thumbnail download failed for {hex_code}: {e}")
+
+        ttl = PHOTO_TTL if entry["has_photo"] else NO_PHOTO_TTL
+        entry["expires_at"] = datetime.utcnow() + ttl
+        return entry
+
+    # --- публічний інтерфейс ---
+
+    def lookup(self, hex_code: str) -> Dict[str, Any]:
+        """
+        Повертає запис кешу для літака (фото або негативний результат).
+        Мережа використовується лише для відсутніх або прострочених записів;
+        якщо planespotters недоступний - віддається прострочений запис.
+        """
+        hex_code = hex_code.lower().strip()
+        with span("aircraft_photo.lookup", kind="cache", hex_code=hex_code) as lookup_span:
+            entry, source = self._lookup(hex_code)
+            record_cache("aircraft_photo", source)
+            if lookup_span:
+                lookup_span.set(cache=source)
+            return entry
+
+    def _lookup(self, hex_code: str) -> Tuple[Dict[str, Any], str]:
+        now = datetime.utcnow()
+
+        source = "memory"
+        entry = self._from_memory(hex_code)
+        if entry is None:
+            source = "db"
+            entry = self._from_db(hex_code)
+            if entry is not None:
+                self._remember(hex_code, entry)
+        if entry is not None and entry["expires_at"] > now:
+            return entry, source
+
+        if not HEX_CODE_PATTERN.match(hex_code):
+            return {"has_photo": False}, "invalid"
+
+        try:
+            fresh = self._refresh(hex_code, entry)
+        except Exception as e:
+            if entry is not None:
+                logger.warning(f"Aircraft photo cache: refresh failed for {hex_code}, "
+                               f"serving stale entry: {e}")
+                return entry, "stale"
+            raise
+
+        self._remember(hex_code, fresh)
+        if entry is not None and all(fresh.get(field) == entry.get(field) for field in ENTRY_FIELDS):
+            # Ревалідація підтвердила запис (мініатюра - 304) - лише продовжуємо термін
+            self._extend_in_db(hex_code, fresh["expires_at"])
+        else:
+            self._to_db(hex_code, fresh)
+        return fresh, "network"
+
+    def get_photo(self, hex_code: str) -> Dict[str, Any]:
+        """
+        Фото у форматі відповіді planespotters ({"photos": [...]}).
+        Якщо мініатюра збережена локально - src вказує на /static.
+        """
+        entry = self.lookup(hex_code)
+        if not entry.get("has_photo"):
+            return {"photos": []}
+
+        src = entry["thumbnail_url"]
+        if entry.get("local_path") and os.path.exists(self._local_file(hex_code.lower().strip())):
+            src = entry["local_path"]
+        return {"photos": [{
+            "thumbnail": {"src": src},
+            "link": entry.get("link"),
+            "photographer": entry.get("photographer"),
+        }]}
+
+
+_photo_cache: Optional[AircraftPhotoCache] = None
+_photo_cache_lock = threading.Lock()
+
+
+def get_photo_cache() -> AircraftPhotoCache:
+    global _photo_cache
+    with _photo_cache_lock:
+        if _photo_cache is None:
+            _photo_cache = AircraftPhotoCache()
+        return _photo_cache
@@ -0,0 +1,463 @@
+import logging
+import os
+import random
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from backend.core.tracing import annotate, span
+
+logger = logging.getLogger(__name__)
+
+RETRYABLE_STATUSES = {502, 503, 504}
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+# Межі відер гістограми затримок (секунди)
+LATENCY_BUCKETS = [0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, float("inf")]
+
+
+@dataclass
+class HostPolicy:
+    """Налаштування транспорту для одного хоста"""
+    connect_timeout: float = 3.05
+    read_timeout: float = 15.0
+    max_retries: int = 2
+    backoff_base: float = 0.25
+    backoff_cap: float = 2.0
+    deadline: float = 30.0  # загальний ліміт часу на запит з усіма повторами
+    failure_threshold: int = 5
+    reset_timeout: float = 30.0
+    pool_maxsize: int = 16
+
+
+HOST_POLICIES = {
+    "opensky-network.org": HostPolicy(read_timeout=20.0),
+    "api.windy.com": HostPolicy(read_timeout=20.0),
+    "api.weatherapi.com": HostPolicy(read_timeout=10.0),
+    "api.planespotters.net": HostPolicy(read_timeout=8.0, max_retries=1),
+    "airportdb.io": HostPolicy(read_timeout=8.0, max_retries=1),
+}
+
+
+@dataclass
+class HedgePolicy:
+    """
+    Налаштування hedging для ендпоінта: якщо відповіді немає довше за
+    observed percentile, відправляється дубль і береться перша відповідь.
+    """
+    percentile: float = 0.95
+    min_samples: int = 20  # до цього hedging вимкнено - p95 ще невідомий
+    min_delay: float = 0.05
+    budget_ratio: float = 0.1  # не більше ~10% запитів отримують дубль
+
+
+# Лише ідемпотентні GET-ендпоінти: (хост, префікс шляху) -> політика
+HEDGED_ENDPOINTS = {
+    ("opensky-network.org", "/api/states/all"): HedgePolicy(),
+    ("opensky-network.org", "/api/flights/aircraft"): HedgePolicy(),
+    ("opensky-network.org", "/api/tracks/all"): HedgePolicy(),
+    ("api.planespotters.net", "/pub/photos/hex/"): HedgePolicy(),
+    ("airportdb.io", "/api/v1/airport/"): HedgePolicy(),
+}
+
+HEDGING_ENABLED = os.getenv("HTTP_HEDGING_ENABLED", "false").lower() in ("1", "true", "yes")
+
+_hedge_executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix="http-hedge")
+
+
+class CircuitOpenError(requests.ConnectionError):
+    """Хост вважається недоступним - запит відхилено без мережевого виклику"""
+
+
+class LatencyHistogram:
+    """Гістограма затримок з фіксованими відрами"""
+
+    def __init__(self, buckets: List[float] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.total = 0
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float) -> None:
+        with self._lock:
+            self.counts[bisect_left(self.buckets, seconds)] += 1
+            self.total += 1
+            self.sum += seconds
+
+    def percentile(self, q: float) -> Optional[float]:
+        """Верхня межа відра, у яке потрапляє q-й перцентиль (None без даних)"""
+        with self._lock:
+            if not self.total:
+                return None
+            rank = q * self.total
+            seen = 0
+            for bound, count in zip(self.buckets, self.counts):
+                seen += count
+                if seen >= rank:
+                    return bound
+            return self.buckets[-1]
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "count": self.total,
+            "sum": round(self.sum, 3),
+            "p50": self.percentile(0.5),
+            "p95": self.percentile(0.95),
+            "p99": self.percentile(0.99),
+            "buckets": dict(zip([str(b) for b in self.buckets], self.counts)),
+        }
+
+
+class CircuitBreaker:
+    """closed -> open після failure_threshold помилок поспіль -> half-open після reset_timeout"""
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half-open" and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            self._trial_in_flight = False
+            if self.opened_at is not None or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+
+
+class RetryBudget:
+    """
+    Token bucket для повторів: кожен запит додає ratio токена, кожен повтор
+    забирає один. Не дає повторам помножити навантаження на хост, що деградує.
+    """
+
+    def __init__(self, ratio: float = 0.2, capacity: float = 10.0):
+        self.ratio = ratio
+        self.capacity = capacity
+        self.tokens = capacity
+        self._lock = threading.Lock()
+
+    def deposit(self) -> None:
+        with self._lock:
+            self.tokens = min(self.capacity, self.tokens + self.ratio)
+
+    def withdraw(self) -> bool:
+        with self._lock:
+            if self.tokens >= 1.0:
+                self.tokens -= 1.0
+                return True
+            return False
+
+
+class LatencyWindow:
+    """Ковзне вікно останніх затримок для точних перцентилів (поріг hedging)"""
+
+    def __init__(self, size: int = 256):
+        self.samples = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float) -> None:
+        with self._lock:
+            self.samples.append(seconds)
+
+    def __len__(self) -> int:
+        return len(self.samples)
+
+    def percentile(self, q: float) -> Optional[float]:
+        with self._lock:
+            if not self.samples:
+                return None
+            ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class _Endpoint:
+    def __init__(self, policy: HedgePolicy):
+        self.policy = policy
+        self.latency = LatencyWindow()
+        self.budget = RetryBudget(ratio=policy.budget_ratio)
+        self.hedged = 0
+        self.hedge_wins = 0
+
+    def hedge_delay(self) -> Optional[float]:
+        if len(self.latency) < self.policy.min_samples:
+            return None
+        return max(self.policy.min_delay, self.latency.percentile(self.policy.percentile))
+
+
+class _Host:
+    def __init__(self, name: str, policy: HostPolicy):
+        self.name = name
+        self.policy = policy
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=policy.pool_maxsize)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.breaker = CircuitBreaker(policy.failure_threshold, policy.reset_timeout)
+        self.retry_budget = RetryBudget()
+        self.latency = LatencyHistogram()
+        self.requests = 0
+        self.errors = 0
+        self.retries = 0
+        self.rejected = 0
+
+
+class HttpTransport:
+    """
+    Спільний HTTP-шар для всіх зовнішніх клієнтів: пул з'єднань на хост,
+    таймаути connect/read, повтори з jitter і бюджетом, circuit breaker
+    та гістограми затримок на хост.
+    """
+
+    def __init__(self, policies: Optional[Dict[str, HostPolicy]] = None,
+                 hedged_endpoints: Optional[Dict[Tuple[str, str], HedgePolicy]] = None,
+                 hedging_enabled: bool = HEDGING_ENABLED):
+        self.policies = policies if policies is not None else HOST_POLICIES
+        self.hedged_endpoints = hedged_endpoints if hedged_endpoints is not None else HEDGED_ENDPOINTS
+        self.hedging_enabled = hedging_enabled
+        self._hosts: Dict[str, _Host] = {}
+        self._endpoints: Dict[Tuple[str, str], _Endpoint] = {}
+        self._lock = threading.Lock()
+
+    def _endpoint(self, host: _Host, url: str) -> Optional[_Endpoint]:
+        """Hedging-стан ендпоінта, якщо для нього налаштовано HedgePolicy"""
+        path = urlsplit(url).path
+        for (name, prefix), policy in self.hedged_endpoints.items():
+            if name == host.name and path.startswith(prefix):
+                with self._lock:
+                    if (name, prefix) not in self._endpoints:
+                        self._endpoints[(name, prefix)] = _Endpoint(policy)
+                    return self._endpoints[(name, prefix)]
+        return None
+
+    @staticmethod
+    def _discard(future: Future) -> None:
+        """Скасовує програшний запит або закриває його відповідь, коли вона прийде"""
+        if future.cancel():
+            return
+
+        def close(done: Future) -> None:
+            if not done.cancelled() and done.exception() is None:
+                done.result().close()
+
+        future.add_done_callback(close)
+
+    def _send(self, host: _Host, endpoint: Optional[_Endpoint], method: str, url: str,
+              timeout: Tuple[float, float], kwargs: Dict[str, Any]) -> requests.Response:
+        """Одна спроба запиту; для hedged GET - з дублем після observed p95"""
+        delay = endpoint.hedge_delay() if endpoint and method == "GET" else None
+        if delay is None:
+            return host.session.request(method, url, timeout=timeout, **kwargs)
+
+        primary = _hedge_executor.submit(host.session.request, method, url,
+                                         timeout=timeout, **kwargs)
+        try:
+            return primary.result(timeout=delay)
+        except FutureTimeoutError:
+            pass
+        if not endpoint.budget.withdraw():
+            return primary.result()
+
+        endpoint.hedged += 1
+        annotate(hedged=True)
+        backup = _hedge_executor.submit(host.session.request, method, url,
+                                        timeout=timeout, **kwargs)
+        pending = {primary, backup}
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is backup:
+                        endpoint.hedge_wins += 1
+                    for loser in pending:
+                        self._discard(loser)
+                    return future.result()
+                error = future.exception()
+        raise error
+
+    def _host(self, url: str) -> _Host:
+        name = urlsplit(url).hostname or ""
+        with self._lock:
+            if name not in self._hosts:
+                self._hosts[name] = _Host(name, self.policies.get(name, HostPolicy()))
+            return self._hosts[name]
+
+    @staticmethod
+    def _backoff(policy: HostPolicy, attempt: int) -> float:
+        # Full jitter: випадкова пауза в [0, min(cap, base * 2^attempt)]
+        return random.uniform(0, min(policy.backoff_cap, policy.backoff_base * 2 ** attempt))
+
+    def request(self, method: str, url: str, *, idempotent: Optional[bool] = None,
+                timeout: Optional[Tuple[float, float]] = None,
+                max_retries: Optional[int] = None, **kwargs) -> requests.Response:
+        """
+        Виконує HTTP-запит з таймаутами, повторами та circuit breaker.
+
+        Повертає response навіть для помилкових статусів - перевірка статусу
+        лишається за клієнтом. Мережеві помилки після вичерпання повторів
+        прокидаються як requests.RequestException (CircuitOpenError, якщо
+        хост вимкнено breaker'ом).
+
+        Args:
+            method (str): HTTP метод
+            url (str): Повний URL
+            idempotent (bool): Чи можна повторювати запит; за замовчуванням
+                True для GET/HEAD/OPTIONS
+            timeout (Tuple[float, float]): (connect, read) замість політики хоста
+            max_retries (int): Кількість повторів замість політики хоста
+        """
+        with span(f"http {method.upper()} {urlsplit(url).hostname}", kind="http",
+                  method=method.upper(), url=url.split("?")[0]) as current:
+            response = self._request(method, url, idempotent=idempotent, timeout=timeout,
+                                     max_retries=max_retries, **kwargs)
+            if current is not None:
+                current.set(status_code=response.status_code,
+                            response_bytes=(int(response.headers.get("Content-Length") or 0)
+                                            if kwargs.get("stream") else len(response.content)))
+            return response
+
+    def _request(self, method: str, url: str, *, idempotent: Optional[bool],
+                 timeout: Optional[Tuple[float, float]], max_retries: Optional[int],
+                 **kwargs) -> requests.Response:
+        host = self._host(url)
+        policy = host.policy
+        method = method.upper()
+        if idempotent is None:
+            idempotent = method in IDEMPOTENT_METHODS
+        retries_left = (policy.max_retries if max_retries is None else max_retries) if idempotent else 0
+        timeout = timeout or (policy.connect_timeout, policy.read_timeout)
+        deadline = time.monotonic() + policy.deadline
+
+        host.retry_budget.deposit()
+        endpoint = self._endpoint(host, url) if self.hedging_enabled else None
+        if endpoint:
+            endpoint.budget.deposit()
+        attempt = 0
+        while True:
+            if not host.breaker.allow():
+                host.rejected += 1
+                raise CircuitOpenError(f"Circuit open for {host.name}, failing fast")
+
+            host.requests += 1
+            started = time.monotonic()
+            attempt_timeout = (timeout[0], max(0.1, min(timeout[1], deadline - started)))
+            response, error = None, None
+            try:
+                response = self._send(host, endpoint, method, url, attempt_timeout, kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                error = e
+            except Exception:
+                # Не повторюється, але звільняє пробний запит half-open breaker'а
+                host.errors += 1
+                host.breaker.record_failure()
+                raise
+            elapsed = time.monotonic() - started
+            host.latency.observe(elapsed)
+            if endpoint and error is None:
+                endpoint.latency.observe(elapsed)
+
+            failed = error is not None or response.status_code in RETRYABLE_STATUSES
+            if not failed:
+                host.breaker.record_success()
+                return response
+
+            host.errors += 1
+            host.breaker.record_failure()
+
+            pause = self._backoff(policy, attempt)
+            can_retry = (retries_left > 0
+                         and time.monotonic() + pause < deadline
+                         and host.retry_budget.withdraw())
+            if not can_retry:
+                if error is not None:
+                    raise error
+                return response
+
+            retries_left -= 1
+            attempt += 1
+            host.retries += 1
+            annotate(retries=attempt)
+            logger.warning(f"{method} {host.name} failed "
+                           f"({error or response.status_code}), retry {attempt} in {pause:.2f}s")
+            time.sleep(pause)
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request("POST", url, **kwargs)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Статистика по хостах: лічильники, стан breaker'а, гістограма затримок, hedging"""
+        with self._lock:
+            hosts = list(self._hosts.values())
+            endpoints = dict(self._endpoints)
+        stats = {
+            host.name: {
+                "requests": host.requests,
+                "errors": host.errors,
+                "retries": host.retries,
+                "rejected": host.rejected,
+                "circuit": host.breaker.state,
+                "latency": host.latency.snapshot(),
+                "hedging": {},
+            }
+            for host in hosts
+        }
+        for (name, prefix), endpoint in endpoints.items():
+            stats[name]["hedging"][prefix] = {
+                "hedged": endpoint.hedged,
+                "hedge_wins": endpoint.hedge_wins,
+                "delay": endpoint.hedge_delay(),
+            }
+        return stats
+
+
+_transport: Optional[HttpTransport] = None
+_transport_lock = threading.Lock()
+
+
+def get_transport() -> HttpTransport:
+    """Єдиний транспорт на процес, щоб пули і breaker'и були спільними"""
+    global _transport
+    with _transport_lock:
+        if _transport is None:
+            _transport = HttpTransport()
+        return _transport
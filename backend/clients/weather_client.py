@@ -2,17 +2,19 @@ import os
 import requests
 from datetime import datetime, timedelta
 
+from backend.clients.transport import get_transport
+
 
 class WeatherClient:
     def __init__(self, api_key=None, base_url="http://api.weatherapi.com/v1"):
         self.api_key = api_key or os.getenv("WEATHER_API_KEY")
         self.base_url = base_url.rstrip("/")
-        self.session = requests.Session()
+        self.transport = get_transport()
 
     def _make_request(self, endpoint, params):
         params["key"] = self.api_key
         try:
-            response = self.session.get(f"{self.base_url}/{endpoint}", params=params)
+            response = self.transport.get(f"{self.base_url}/{endpoint}", params=params)
             if response.status_code == 200:
                 return response.json()
             else:
@@ -1,9 +1,10 @@
 import os
 import requests
-import time
 import math
 from typing import Dict, Any
 
+from backend.clients.transport import get_transport
+
 
 def get_current_weather(lat: float, lon: float) -> Dict[str, Any]:
     api_key = os.getenv('WINDY_API_KEY')
@@ -28,48 +29,16 @@ def get_current_weather(lat: float, lon: float) -> Dict[str, Any]:
         'Content-Type': 'application/json',
         'User-Agent': 'Python Weather Client'
     }
-    max_retries = 3
-    for attempt in range(max_retries):
-        try:
-            response = requests.post(
-                url,
-                json=payload,
-                headers=headers,
-                timeout=30
-            )
-
-            if response.ok:
-                break
-
-            if response.status_code == 503:
-                if attempt < max_retries - 1:
-                    print(
-                        f"The server is not available, attempted "
-                        f"{attempt + 1}/{max_retries}, waiting..."
-                    )
-                    time.sleep(2 ** attempt)
-                    continue
-
-            raise requests.HTTPError(f'HTTP {response.status_code}: {response.text}')
-
-        except requests.ConnectionError as e:
-            if attempt < max_retries - 1:
-                print(
-                    f"Connection error, attempt "
-                    f"{attempt + 1}/{max_retries}, waiting..."
-                )
-                time.sleep(2 ** attempt)
-                continue
-            raise requests.ConnectionError(
-                f"Failed to connect to API after {max_retries} attempts: {e}")
 
-        except requests.Timeout as e:
-            if attempt < max_retries - 1:
-                print(
-                    f"Таймаут запиту, спроба {attempt + 1}/{max_retries}, очікування...")
-                time.sleep(2 ** attempt)
-                continue
-            raise requests.Timeout(f"Таймаут запиту після {max_retries} спроб: {e}")
+    # Point forecast - читання даних, тому POST можна безпечно повторювати
+    response = get_transport().post(
+        url,
+        json=payload,
+        headers=headers,
+        idempotent=True
+    )
+    if not response.ok:
+        raise requests.HTTPError(f'HTTP {response.status_code}: {response.text}')
 
     data = response.json()
     wind_speed = None
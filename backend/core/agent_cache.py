@@ -0,0 +1,164 @@
+"""
+Кеш таблиці agents у пам'яті процесу. Таблиця маленька і майже не
+змінюється, тому знімок завантажується цілком одним запитом і живе до
+інвалідації: зміни через AgentManager збільшують версію кешу, а в
+Postgres ще й надсилають NOTIFY, щоб інші процеси (воркери uvicorn) теж
+скинули свої знімки. Як страховка від втрачених сповіщень знімок
+перечитується не рідше ніж раз на AGENT_CACHE_TTL секунд.
+"""
+import hashlib
+import logging
+import os
+import select
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from backend.config.database import engine
+from backend.models.agents import Agent
+from backend.core.metrics import record_cache
+from backend.core.tracing import annotate
+
+logger = logging.getLogger(__name__)
+
+AGENTS_CHANNEL = "agents_changed"
+DEFAULT_TTL_SECONDS = 300.0
+LISTEN_POLL_SECONDS = 5.0
+LISTEN_RETRY_SECONDS = 10.0
+
+
+@dataclass(frozen=True)
+class AgentSnapshot:
+    version: int
+    loaded_at: float
+    agents: Tuple[Agent, ...]
+    by_id: Dict[str, Agent]
+    by_name: Dict[str, Agent]
+    etag: str
+
+
+def _load_agents(db: Session) -> Tuple[Agent, ...]:
+    # Читаємо рядки таблиці, а не сутності: identity map сесії могла б повернути
+    # застарілі об'єкти. Агенти знімка не прив'язані до сесії і спільні для всіх потоків
+    rows = db.execute(Agent.__table__.select()).mappings().all()
+    return tuple(Agent(**row) for row in rows)
+
+
+def _is_postgres(bind) -> bool:
+    return bind is not None and bind.dialect.name == "postgresql"
+
+
+class AgentCache:
+
+    def __init__(self, ttl: float = DEFAULT_TTL_SECONDS):
+        self.ttl = ttl
+        self._version = 0
+        self._snapshot: Optional[AgentSnapshot] = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._listener: Optional[threading.Thread] = None
+
+    def _is_fresh(self, snapshot: Optional[AgentSnapshot]) -> bool:
+        return (snapshot is not None and snapshot.version == self._version
+                and time.monotonic() - snapshot.loaded_at < self.ttl)
+
+    def snapshot(self, db: Session) -> AgentSnapshot:
+        """Поточний знімок агентів; перечитує таблицю лише після інвалідації або TTL"""
+        snapshot = self._snapshot
+        if self._is_fresh(snapshot):
+            annotate(agent_cache="hit")
+            record_cache("agents", "hit")
+            return snapshot
+        with self._lock:
+            snapshot = self._snapshot
+            if self._is_fresh(snapshot):
+                annotate(agent_cache="hit")
+                record_cache("agents", "hit")
+                return snapshot
+            annotate(agent_cache="miss")
+            record_cache("agents", "miss")
+            # Версію фіксуємо до читання: інвалідація під час завантаження змусить перечитати
+            version = self._version
+            agents = _load_agents(db)
+            digest = hashlib.sha1(repr([
+                tuple(getattr(agent, column.key) for column in Agent.__table__.columns)
+                for agent in agents
+            ]).encode("utf-8")).hexdigest()[:16]
+            snapshot = AgentSnapshot(
+                version=version,
+                loaded_at=time.monotonic(),
+                agents=agents,
+                by_id={str(agent.id): agent for agent in agents},
+                by_name={agent.name: agent for agent in agents},
+                etag=digest,
+            )
+            self._snapshot = snapshot
+            return snapshot
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._version += 1
+
+    def notify_change(self, db: Session) -> None:
+        """
+        Ставить NOTIFY в поточну транзакцію: Postgres доставить його іншим
+        процесам лише після commit. Викликати до commit зміни агентів.
+        """
+        if _is_postgres(db.get_bind()):
+            db.execute(text("SELECT pg_notify(:channel, '')"), {"channel": AGENTS_CHANNEL})
+
+    def _listen(self) -> None:
+        # Окреме з'єднання поза пулом: слухач тримає його весь час роботи процесу
+        connect_args, connect_kwargs = engine.dialect.create_connect_args(engine.url)
+        while not self._stop.is_set():
+            dbapi_connection = None
+            try:
+                dbapi_connection = engine.dialect.connect(*connect_args, **connect_kwargs)
+                dbapi_connection.autocommit = True
+                cursor = dbapi_connection.cursor()
+                cursor.execute(f"LISTEN {AGENTS_CHANNEL}")
+                # Поки слухача не було, сповіщення могли загубитися
+                self.invalidate()
+                while not self._stop.is_set():
+                    if select.select([dbapi_connection], [], [], LISTEN_POLL_SECONDS) == ([], [], []):
+                        continue
+                    dbapi_connection.poll()
+                    if dbapi_connection.notifies:
+                        dbapi_connection.notifies.clear()
+                        self.invalidate()
+            except Exception as e:
+                logger.warning(f"Agent cache listener disconnected: {e}")
+                self._stop.wait(LISTEN_RETRY_SECONDS)
+            finally:
+                if dbapi_connection is not None:
+                    try:
+                        dbapi_connection.close()
+                    except Exception:
+                        pass
+
+    def start_listener(self) -> None:
+        """Слухає NOTIFY від інших процесів (лише для Postgres)"""
+        if not _is_postgres(engine):
+            return
+        if self._listener and self._listener.is_alive():
+            return
+        self._stop.clear()
+        self._listener = threading.Thread(target=self._listen, name="agent-cache-listener",
+                                          daemon=True)
+        self._listener.start()
+
+    def stop_listener(self, timeout: float = LISTEN_POLL_SECONDS + 1) -> None:
+        self._stop.set()
+        if self._listener:
+            self._listener.join(timeout=timeout)
+
+
+_agent_cache = AgentCache(ttl=float(os.getenv("AGENT_CACHE_TTL", DEFAULT_TTL_SECONDS)))
+
+
+def get_agent_cache() -> AgentCache:
+    return _agent_cache
@@ -0,0 +1,163 @@
+"""
+Налаштування LLM агента з рядка agents: постачальник, модель,
+температура, ліміт токенів відповіді і таймаут. Порожні колонки означають
+значення за замовчуванням, тож дешеві чи локальні моделі можна призначити
+лише тим агентам, яким вистачає їхньої якості.
+
+Постачальники (LLM_PROVIDER або agents.llm_provider):
+    openai - OpenAI API (DEFAULT_LLM_MODEL)
+    local  - OpenAI-сумісний сервер: llama.cpp server, vLLM, Ollama (LOCAL_LLM_*)
+    fake   - детермінована сценарна модель без мережі (див. scripted_llm)
+
+Інструменти crewai створюють власні LLM-виклики (HTML-звіти) - вони
+беруть налаштування агента, від імені якого запущені (use_llm_settings).
+"""
+import os
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+from crewai import LLM
+from crewai.llms.base_llm import BaseLLM
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_openai import ChatOpenAI
+
+from backend.core.agents.progress import llm_usage_callback
+
+DEFAULT_PROVIDER = os.getenv("LLM_PROVIDER", "openai").lower()
+DEFAULT_MODEL = os.getenv("DEFAULT_LLM_MODEL") or "gpt-4o"
+DEFAULT_TEMPERATURE = 0.7
+
+LOCAL_BASE_URL = os.getenv("LOCAL_LLM_BASE_URL", "http://localhost:8080/v1")
+LOCAL_API_KEY = os.getenv("LOCAL_LLM_API_KEY", "local")
+LOCAL_MODEL = os.getenv("LOCAL_LLM_MODEL", "local-model")
+
+
+@dataclass(frozen=True)
+class LLMSettings:
+    provider: str = DEFAULT_PROVIDER
+    model: Optional[str] = None
+    temperature: float = DEFAULT_TEMPERATURE
+    max_tokens: Optional[int] = None
+    timeout: Optional[float] = None
+
+    @property
+    def model_name(self) -> str:
+        """Модель з урахуванням моделі постачальника за замовчуванням"""
+        return self.model or get_llm_provider(self.provider).default_model
+
+    @classmethod
+    def from_agent(cls, agent) -> "LLMSettings":
+        """Налаштування з рядка agents (None у колонці - значення за замовчуванням)"""
+        return cls(
+            provider=getattr(agent, "llm_provider", None) or DEFAULT_PROVIDER,
+            model=getattr(agent, "model", None),
+            temperature=(agent.temperature if getattr(agent, "temperature", None) is not None
+                         else DEFAULT_TEMPERATURE),
+            max_tokens=getattr(agent, "max_tokens", None),
+            timeout=getattr(agent, "timeout", None),
+        )
+
+
+class LLMProvider(ABC):
+    """Створює моделі для crewai Agent і для прямих викликів з інструментів"""
+    default_model = DEFAULT_MODEL
+
+    @abstractmethod
+    def agent_llm(self, settings: LLMSettings) -> BaseLLM:
+        ...
+
+    @abstractmethod
+    def chat_model(self, settings: LLMSettings) -> BaseChatModel:
+        ...
+
+
+class OpenAIProvider(LLMProvider):
+
+    def agent_llm(self, settings: LLMSettings) -> BaseLLM:
+        # Одразу crewai LLM: з ChatOpenAI crewai сам переносить лише частину параметрів і губить таймаут
+        return LLM(model=settings.model_name, temperature=settings.temperature,
+                   max_tokens=settings.max_tokens, timeout=settings.timeout)
+
+    def chat_model(self, settings: LLMSettings) -> BaseChatModel:
+        return ChatOpenAI(model=settings.model_name, temperature=settings.temperature,
+                          max_tokens=settings.max_tokens, timeout=settings.timeout)
+
+
+class LocalProvider(LLMProvider):
+    """OpenAI-сумісний сервер (/v1/chat/completions) без ключа OpenAI"""
+    default_model = LOCAL_MODEL
+
+    def agent_llm(self, settings: LLMSettings) -> BaseLLM:
+        # Префікс openai/ - litellm іде на base_url як на OpenAI-сумісний API
+        return LLM(model=f"openai/{settings.model_name}", base_url=LOCAL_BASE_URL,
+                   api_key=LOCAL_API_KEY, temperature=settings.temperature,
+                   max_tokens=settings.max_tokens, timeout=settings.timeout)
+
+    def chat_model(self, settings: LLMSettings) -> BaseChatModel:
+        return ChatOpenAI(model=settings.model_name, base_url=LOCAL_BASE_URL,
+                          api_key=LOCAL_API_KEY, temperature=settings.temperature,
+                          max_tokens=settings.max_tokens, timeout=settings.timeout)
+
+
+class ScriptedProvider(LLMProvider):
+    default_model = "scripted"
+
+    def agent_llm(self, settings: LLMSettings) -> BaseLLM:
+        from backend.core.agents.scripted_llm import ScriptedLLM
+        return ScriptedLLM(model=settings.model_name, temperature=settings.temperature)
+
+    def chat_model(self, settings: LLMSettings) -> BaseChatModel:
+        from backend.core.agents.scripted_llm import ScriptedChatModel
+        return ScriptedChatModel()
+
+
+LLM_PROVIDERS: Dict[str, LLMProvider] = {
+    "openai": OpenAIProvider(),
+    "local": LocalProvider(),
+    "fake": ScriptedProvider(),
+}
+
+
+def get_llm_provider(name: str) -> LLMProvider:
+    provider = LLM_PROVIDERS.get(name.lower())
+    if provider is None:
+        raise ValueError(f"Unknown LLM provider '{name}', expected one of: "
+                         f"{', '.join(LLM_PROVIDERS)}")
+    return provider
+
+
+_current_settings: ContextVar[Optional[LLMSettings]] = ContextVar("llm_settings", default=None)
+
+
+@contextmanager
+def use_llm_settings(settings: LLMSettings):
+    """LLM-виклики інструментів у цьому контексті використовують налаштування агента"""
+    token = _current_settings.set(settings)
+    try:
+        yield
+    finally:
+        _current_settings.reset(token)
+
+
+def _resolve(settings: Optional[LLMSettings]) -> LLMSettings:
+    return settings or _current_settings.get() or LLMSettings()
+
+
+def create_agent_llm(settings: Optional[LLMSettings] = None) -> BaseLLM:
+    """LLM для crewai Agent від постачальника з налаштувань"""
+    settings = _resolve(settings)
+    return get_llm_provider(settings.provider).agent_llm(settings)
+
+
+def create_chat_model(settings: Optional[LLMSettings] = None) -> BaseChatModel:
+    """
+    LangChain-модель для прямих викликів llm.invoke з інструментів; токени
+    цих викликів потрапляють у спани, метрики і облік track_usage
+    """
+    settings = _resolve(settings)
+    model = get_llm_provider(settings.provider).chat_model(settings)
+    model.callbacks = [*(model.callbacks or []), llm_usage_callback]
+    return model
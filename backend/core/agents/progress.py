@@ -0,0 +1,354 @@
+"""
+Трансляція прогресу агента слухачу поточного запиту: фрагменти відповіді
+LLM, старт/завершення інструментів. Слухач зберігається в contextvar, а
+crew.kickoff запускається в executor-потоці з копією контексту, тому події
+з шини crewai потрапляють саме тому запиту, який їх спричинив.
+"""
+import asyncio
+import contextvars
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, Optional, Set
+from uuid import UUID
+
+from crewai.utilities.events import crewai_event_bus
+from crewai.utilities.events.llm_events import (
+    LLMCallCompletedEvent,
+    LLMCallFailedEvent,
+    LLMCallStartedEvent,
+    LLMStreamChunkEvent,
+)
+from crewai.utilities.events.tool_usage_events import (
+    ToolUsageErrorEvent,
+    ToolUsageFinishedEvent,
+    ToolUsageStartedEvent,
+)
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+
+from backend.core.metrics import (
+    CREW_ERRORS,
+    CREW_QUEUED,
+    CREW_QUEUE_SECONDS,
+    CREW_RUNNING,
+    CREW_SECONDS,
+    LLM_REQUESTS,
+    LLM_TOKENS,
+    TOOL_CALLS,
+)
+from backend.core.tracing import close_span, open_span, span
+
+logger = logging.getLogger(__name__)
+
+ProgressListener = Callable[[Dict[str, Any]], None]
+
+_listener: contextvars.ContextVar[Optional[ProgressListener]] = contextvars.ContextVar(
+    "agent_progress_listener", default=None)
+# Відкриті спани LLM/інструментів поточного контексту (події початку і кінця - окремі callback-и)
+_open_spans: contextvars.ContextVar[Optional[list]] = contextvars.ContextVar(
+    "agent_open_spans", default=None)
+# Тип агента, від імені якого запускається crew (мітка метрик)
+_agent_type: contextvars.ContextVar[str] = contextvars.ContextVar("agent_type", default="unknown")
+_hooks_installed = False
+_instrumentation_hooks_installed = False
+
+
+@dataclass
+class AgentUsage:
+    """Сумарне використання LLM усіма crew, запущеними в контексті track_usage"""
+    agent_type: str = "unknown"
+    prompt_tokens: int = 0
+    cached_prompt_tokens: int = 0
+    completion_tokens: int = 0
+    llm_requests: int = 0
+    tool_calls: int = 0
+    crew_runs: int = 0
+    failed_runs: int = 0
+    models: Set[str] = field(default_factory=set)
+
+    @property
+    def total_tokens(self) -> int:
+        return self.prompt_tokens + self.completion_tokens
+
+    @property
+    def succeeded(self) -> bool:
+        """Агент справді відпрацював: crew запускався і жоден запуск не впав"""
+        return self.crew_runs > 0 and self.failed_runs == 0
+
+
+_usage: contextvars.ContextVar[Optional[AgentUsage]] = contextvars.ContextVar(
+    "agent_usage", default=None)
+_hooks_lock = threading.Lock()
+
+
+@contextmanager
+def progress_listener(listener: ProgressListener):
+    """Підписує listener на прогрес агентів, запущених у цьому контексті"""
+    token = _listener.set(listener)
+    try:
+        yield
+    finally:
+        _listener.reset(token)
+
+
+@contextmanager
+def agent_run(agent_type: str):
+    """Позначає crew, запущені в цьому контексті, типом агента"""
+    usage = _usage.get()
+    if usage is not None:
+        usage.agent_type = agent_type
+    token = _agent_type.set(agent_type)
+    try:
+        yield
+    finally:
+        _agent_type.reset(token)
+
+
+@contextmanager
+def track_usage():
+    """Збирає токени, LLM-виклики та інструменти crew, запущених у цьому контексті"""
+    usage = AgentUsage()
+    token = _usage.set(usage)
+    try:
+        yield usage
+    finally:
+        _usage.reset(token)
+
+
+def report_progress(event: str, **data) -> None:
+    """Надсилає подію прогресу слухачу поточного контексту (якщо він є)"""
+    listener = _listener.get()
+    if listener is None:
+        return
+    try:
+        listener({"event": event, **data})
+    except Exception as e:
+        logger.warning(f"Agent progress listener failed: {e}")
+
+
+def _install_crewai_hooks() -> None:
+    global _hooks_installed
+    with _hooks_lock:
+        if _hooks_installed:
+            return
+
+        @crewai_event_bus.on(LLMStreamChunkEvent)
+        def on_stream_chunk(source, event):
+            report_progress("chunk", text=event.chunk)
+
+        @crewai_event_bus.on(ToolUsageStartedEvent)
+        def on_tool_started(source, event):
+            report_progress("tool_started", tool=event.tool_name)
+
+        @crewai_event_bus.on(ToolUsageFinishedEvent)
+        def on_tool_finished(source, event):
+            report_progress("tool_finished", tool=event.tool_name, from_cache=event.from_cache)
+
+        @crewai_event_bus.on(ToolUsageErrorEvent)
+        def on_tool_error(source, event):
+            report_progress("tool_error", tool=event.tool_name, error=str(event.error))
+
+        _hooks_installed = True
+
+
+def _push_span(name: str, kind: str, **attributes) -> None:
+    handle = open_span(name, kind, **attributes)
+    if handle is None:
+        return
+    stack = _open_spans.get()
+    if stack is None:
+        stack = []
+        _open_spans.set(stack)
+    stack.append(handle)
+
+
+def _pop_span(kind: str, error: Any = None, **attributes) -> None:
+    stack = _open_spans.get()
+    if stack and stack[-1][0].kind == kind:
+        close_span(stack.pop(), error=error, **attributes)
+
+
+def _message_chars(messages) -> int:
+    if isinstance(messages, str):
+        return len(messages)
+    return sum(len(str(message.get("content") or "")) for message in messages or [])
+
+
+def _install_instrumentation_hooks() -> None:
+    """Спани трасування і метрики для викликів LLM та інструментів crewai"""
+    global _instrumentation_hooks_installed
+    with _hooks_lock:
+        if _instrumentation_hooks_installed:
+            return
+
+        @crewai_event_bus.on(LLMCallStartedEvent)
+        def on_llm_started(source, event):
+            _push_span(f"llm {getattr(source, 'model', 'call')}", "llm",
+                       prompt_chars=_message_chars(event.messages))
+
+        @crewai_event_bus.on(LLMCallCompletedEvent)
+        def on_llm_completed(source, event):
+            _pop_span("llm", response_chars=len(str(event.response or "")))
+
+        @crewai_event_bus.on(LLMCallFailedEvent)
+        def on_llm_failed(source, event):
+            _pop_span("llm", error=event.error)
+
+        @crewai_event_bus.on(ToolUsageStartedEvent)
+        def on_tool_started(source, event):
+            _push_span(f"tool {event.tool_name}", "tool",
+                       input_chars=len(str(event.tool_args or "")))
+
+        @crewai_event_bus.on(ToolUsageFinishedEvent)
+        def on_tool_finished(source, event):
+            _pop_span("tool", output_chars=len(str(event.output or "")),
+                      cache="hit" if event.from_cache else "miss")
+            TOOL_CALLS.inc(tool=event.tool_name, outcome="cached" if event.from_cache else "ok")
+            _count_tool_call()
+
+        @crewai_event_bus.on(ToolUsageErrorEvent)
+        def on_tool_error(source, event):
+            _pop_span("tool", error=event.error)
+            TOOL_CALLS.inc(tool=event.tool_name, outcome="error")
+            _count_tool_call()
+
+        _instrumentation_hooks_installed = True
+
+
+def _count_tool_call() -> None:
+    usage = _usage.get()
+    if usage is not None:
+        usage.tool_calls += 1
+
+
+def _add_usage(agent_type: str, prompt_tokens: int, cached_prompt_tokens: int,
+               completion_tokens: int, requests: int, models: Iterable[str]) -> None:
+    """Токени в метрики та облік track_usage поточного контексту"""
+    LLM_REQUESTS.inc(requests, agent=agent_type)
+    LLM_TOKENS.inc(prompt_tokens - cached_prompt_tokens, agent=agent_type, kind="prompt")
+    LLM_TOKENS.inc(cached_prompt_tokens, agent=agent_type, kind="cached_prompt")
+    LLM_TOKENS.inc(completion_tokens, agent=agent_type, kind="completion")
+
+    usage = _usage.get()
+    if usage is None:
+        return
+    usage.prompt_tokens += prompt_tokens
+    usage.cached_prompt_tokens += cached_prompt_tokens
+    usage.completion_tokens += completion_tokens
+    usage.llm_requests += requests
+    usage.models.update(str(model) for model in models if model)
+
+
+def _record_usage(agent_type: str, crew) -> None:
+    """Токени crew (UsageMetrics після kickoff) у метрики та облік track_usage"""
+    metrics = getattr(crew, "usage_metrics", None)
+    if metrics is None:
+        return
+    _add_usage(agent_type, metrics.prompt_tokens, metrics.cached_prompt_tokens,
+               metrics.completion_tokens, metrics.successful_requests,
+               (getattr(getattr(agent, "llm", None), "model", None) for agent in crew.agents))
+
+
+class LLMUsageCallback(BaseCallbackHandler):
+    """
+    Прямі виклики LangChain-моделей (HTML-звіти інструментів, підсумки
+    чатів) проходять повз події crewai: спан llm, метрики і облік токенів
+    для них пишуться з callback-ів LangChain.
+    """
+
+    def __init__(self):
+        self._spans: Dict[UUID, Any] = {}
+        self._models: Dict[UUID, str] = {}
+
+    def on_chat_model_start(self, serialized, messages, *, run_id: UUID, metadata=None,
+                            **kwargs) -> None:
+        model = (metadata or {}).get("ls_model_name") or "call"
+        self._models[run_id] = model
+        self._spans[run_id] = open_span(
+            f"llm {model}", "llm",
+            prompt_chars=sum(len(str(message.content)) for batch in messages for message in batch))
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs) -> None:
+        model = self._models.pop(run_id, None)
+        prompt_tokens = cached_prompt_tokens = completion_tokens = response_chars = 0
+        for generations in response.generations:
+            for generation in generations:
+                response_chars += len(generation.text or "")
+                usage_metadata = getattr(getattr(generation, "message", None), "usage_metadata", None)
+                if usage_metadata:
+                    prompt_tokens += usage_metadata.get("input_tokens", 0)
+                    completion_tokens += usage_metadata.get("output_tokens", 0)
+                    cached_prompt_tokens += (usage_metadata.get("input_token_details") or {}).get(
+                        "cache_read", 0) or 0
+        llm_output = response.llm_output or {}
+        if not prompt_tokens and not completion_tokens:
+            token_usage = llm_output.get("token_usage") or {}
+            prompt_tokens = token_usage.get("prompt_tokens", 0) or 0
+            completion_tokens = token_usage.get("completion_tokens", 0) or 0
+        model = llm_output.get("model_name") or model
+        close_span(self._spans.pop(run_id, None), response_chars=response_chars,
+                   prompt_tokens=prompt_tokens, completion_tokens=completion_tokens)
+        _add_usage(_agent_type.get(), prompt_tokens, cached_prompt_tokens, completion_tokens, 1,
+                   [model] if model and model != "call" else [])
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs) -> None:
+        self._models.pop(run_id, None)
+        close_span(self._spans.pop(run_id, None), error=error)
+
+
+llm_usage_callback = LLMUsageCallback()
+
+
+async def run_crew(crew) -> Any:
+    """
+    Виконує crew.kickoff в executor-потоці, зберігаючи контекст запиту.
+    Якщо є слухач прогресу - вмикає стрімінг LLM, щоб передавати відповідь частинами.
+    """
+    _install_instrumentation_hooks()
+    if _listener.get() is not None:
+        _install_crewai_hooks()
+        for agent in crew.agents:
+            llm = getattr(agent, "llm", None)
+            if llm is not None and hasattr(llm, "stream"):
+                llm.stream = True
+
+    agent_type = _agent_type.get()
+    queued_at = time.perf_counter()
+    started = False
+
+    def kickoff():
+        nonlocal started
+        started = True
+        CREW_QUEUED.dec()
+        CREW_QUEUE_SECONDS.observe(time.perf_counter() - queued_at)
+        CREW_RUNNING.inc()
+        began = time.perf_counter()
+        usage = _usage.get()
+        if usage is not None:
+            usage.crew_runs += 1
+        try:
+            result = crew.kickoff()
+        except Exception:
+            CREW_ERRORS.inc(agent=agent_type)
+            if usage is not None:
+                usage.failed_runs += 1
+            raise
+        finally:
+            CREW_RUNNING.dec()
+            CREW_SECONDS.observe(time.perf_counter() - began, agent=agent_type)
+        _record_usage(agent_type, crew)
+        return result
+
+    with span("crew.kickoff", kind="agent", agents=len(crew.agents), tasks=len(crew.tasks)):
+        loop = asyncio.get_event_loop()
+        context = contextvars.copy_context()
+        CREW_QUEUED.inc()
+        try:
+            return await loop.run_in_executor(None, context.run, kickoff)
+        finally:
+            if not started:
+                # Скасовано до старту в executor-потоці
+                CREW_QUEUED.dec()
@@ -0,0 +1,122 @@
+"""
+Детермінована сценарна модель для роботи без мережі (LLM_PROVIDER=fake):
+відповідає у форматі ReAct, який парсить crewai, тому інструменти агентів
+викликаються як з реальною моделлю. Перший виклик у задачі - Action для
+першого інструмента агента, для якого у сценарії є аргументи; далі -
+Final Answer.
+
+Сценарій (SCRIPTED_LLM_SCRIPT) - JSON у форматі benchmarks/loadtest/fixtures/llm_script.json:
+{"final_answer": "...", "actions": {"<tool name>": {<аргументи>}}}.
+Без сценарію модель відповідає відлунням поточного повідомлення.
+"""
+import json
+import logging
+import os
+import re
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Union
+
+from crewai.llms.base_llm import BaseLLM
+from crewai.utilities.events import crewai_event_bus
+from crewai.utilities.events.llm_events import (
+    LLMCallCompletedEvent,
+    LLMCallStartedEvent,
+    LLMCallType,
+)
+from langchain_core.language_models.chat_models import SimpleChatModel
+
+logger = logging.getLogger(__name__)
+
+SCRIPT_PATH = os.getenv("SCRIPTED_LLM_SCRIPT")
+TOOL_NAME_PATTERN = re.compile(r"Tool Name: ([\w\-]+)")
+CURRENT_MESSAGE_PATTERN = re.compile(r"Поточне повідомлення: (.*?)(?:\"|\n|$)", re.S)
+ECHO_CHARS = 500
+
+
+@lru_cache(maxsize=4)
+def load_script(path: Optional[str] = SCRIPT_PATH) -> Dict[str, Any]:
+    if not path:
+        return {}
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        logger.warning(f"Scripted LLM: cannot load {path}, falling back to echo: {e}")
+        return {}
+
+
+def _message_text(message: Dict[str, Any]) -> str:
+    content = message.get("content") or ""
+    if isinstance(content, list):
+        return "".join(part.get("text", "") for part in content if isinstance(part, dict))
+    return content
+
+
+def final_answer(prompt: str, script: Dict[str, Any]) -> str:
+    if script.get("final_answer"):
+        return script["final_answer"]
+    match = CURRENT_MESSAGE_PATTERN.search(prompt)
+    text = (match.group(1) if match else prompt).strip()
+    return f"[scripted] {text[:ECHO_CHARS]}"
+
+
+def react_reply(messages: List[Dict[str, Any]], script: Dict[str, Any]) -> str:
+    """Наступна відповідь ReAct: один виклик інструмента, потім фінальна відповідь"""
+    prompt = "\n".join(_message_text(message) for message in messages)
+    already_acted = any(
+        message.get("role") == "assistant" and "Action:" in _message_text(message)
+        for message in messages
+    )
+    if not already_acted:
+        actions = script.get("actions", {})
+        for tool_name in TOOL_NAME_PATTERN.findall(prompt):
+            if tool_name in actions:
+                return (
+                    "Thought: I need fresh data for this question\n"
+                    f"Action: {tool_name}\n"
+                    f"Action Input: {json.dumps(actions[tool_name], ensure_ascii=False)}"
+                )
+    return f"Thought: I now know the final answer\nFinal Answer: {final_answer(prompt, script)}"
+
+
+class ScriptedLLM(BaseLLM):
+    """Сценарна модель для crewai Agent"""
+
+    def __init__(self, model: str = "scripted", temperature: Optional[float] = None,
+                 script_path: Optional[str] = SCRIPT_PATH):
+        super().__init__(model=model, temperature=temperature)
+        self.script = load_script(script_path)
+
+    def call(self, messages: Union[str, List[Dict[str, str]]], tools: Optional[List[dict]] = None,
+             callbacks: Optional[List[Any]] = None,
+             available_functions: Optional[Dict[str, Any]] = None) -> str:
+        if isinstance(messages, str):
+            messages = [{"role": "user", "content": messages}]
+        # Ті самі події, що й у crewai LLM: трасування і прогрес працюють без змін
+        crewai_event_bus.emit(self, LLMCallStartedEvent(
+            messages=messages, tools=tools, callbacks=callbacks,
+            available_functions=available_functions))
+        response = react_reply(messages, self.script)
+        crewai_event_bus.emit(self, LLMCallCompletedEvent(
+            response=response, call_type=LLMCallType.LLM_CALL))
+        return response
+
+    def supports_function_calling(self) -> bool:
+        return False
+
+    def get_context_window_size(self) -> int:
+        return 128_000
+
+
+class ScriptedChatModel(SimpleChatModel):
+    """Сценарна модель для прямих викликів llm.invoke з інструментів"""
+
+    script_path: Optional[str] = SCRIPT_PATH
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted"
+
+    def _call(self, messages, stop=None, run_manager=None, **kwargs) -> str:
+        prompt = "\n".join(str(message.content) for message in messages)
+        return final_answer(prompt, load_script(self.script_path))
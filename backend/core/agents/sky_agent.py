@@ -1,13 +1,13 @@
 from crewai import Agent, Task, Crew, Process
-from langchain_openai import ChatOpenAI
 from crewai.tools import tool
 from datetime import datetime, timezone, timedelta
-import asyncio
 import json
 from typing import List, Optional, Dict, Any
 import re
 
 from backend.clients.open_sky_client import OpenSkyClient
+from backend.core.agents.llm_settings import LLMSettings, create_agent_llm
+from backend.core.agents.progress import run_crew
 
 
 # Імпортуємо наш OpenSky клієнт
@@ -402,10 +402,12 @@ def _create_empty_result_html(message: str) -> str:
 class OpenSkyAviationAgent:
     """Агент для роботи з авіаційними даними OpenSky Network"""
 
-    def __init__(self, agent_id: str, name: str, system_prompt: str = None):
+    def __init__(self, agent_id: str, name: str, system_prompt: str = None,
+                 llm_settings: Optional[LLMSettings] = None):
         self.agent_id = agent_id
         self.name = name
-        self.llm = ChatOpenAI(model="gpt-4o", temperature=0.7)
+        self.llm_settings = llm_settings or LLMSettings()
+        self.llm = create_agent_llm(self.llm_settings)
 
         backstory = system_prompt if system_prompt else """
         Ви експертний авіаційний аналітик, який має доступ до даних OpenSky Network.
@@ -485,8 +487,7 @@ class OpenSkyAviationAgent:
             )
 
             # Запускаємо crew асинхронно
-            loop = asyncio.get_event_loop()
-            result = await loop.run_in_executor(None, crew.kickoff)
+            result = await run_crew(crew)
 
             return str(result)
 
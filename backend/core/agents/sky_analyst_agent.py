@@ -1,80 +1,79 @@
 from crewai import Agent, Task, Crew, Process
 from crewai.tools import tool
-from langchain_openai import ChatOpenAI
-import asyncio
+import heapq
 import time
-from collections import Counter, defaultdict
+from collections import Counter
 from typing import Dict, List, Optional, Tuple
 import json
 
 from backend.clients.open_sky_client import OpenSkyClient
 from backend.clients.windy_client import get_current_weather
-
-# Словник координат країн (bbox: [min_lat, max_lat, min_lon, max_lon])
-COUNTRY_COORDINATES = {
-    'poland': [49.0, 54.8, 14.1, 24.2],
-    'ukraine': [44.3, 52.4, 22.1, 40.2],
-    'germany': [47.3, 55.1, 5.9, 15.0],
-    'france': [41.4, 51.1, -5.1, 9.6],
-    'spain': [27.6, 43.8, -18.2, 4.3],
-    'italy': [35.5, 47.1, 6.6, 18.5],
-    'united kingdom': [49.9, 60.8, -8.6, 1.8],
-    'netherlands': [50.8, 53.6, 3.4, 7.2],
-    'belgium': [49.5, 51.5, 2.5, 6.4],
-    'czech republic': [48.6, 51.1, 12.1, 18.9],
-    'austria': [46.4, 49.0, 9.5, 17.2],
-    'switzerland': [45.8, 47.8, 5.9, 10.5],
-    'slovakia': [47.7, 49.6, 16.8, 22.6],
-    'hungary': [45.7, 48.6, 16.1, 22.9],
-    'romania': [43.6, 48.3, 20.3, 29.7],
-    'bulgaria': [41.2, 44.2, 22.4, 28.6],
-    'greece': [34.8, 41.7, 19.4, 29.6],
-    'turkey': [35.8, 42.1, 25.7, 44.8],
-    'norway': [57.9, 71.2, 4.6, 31.3],
-    'sweden': [55.3, 69.1, 11.1, 24.2],
-    'finland': [59.8, 70.1, 20.5, 31.6],
-    'denmark': [54.6, 57.8, 8.1, 15.2],
-    'portugal': [32.4, 42.2, -31.3, -6.2],
-    'ireland': [51.4, 55.4, -10.5, -6.0],
-    'croatia': [42.4, 46.5, 13.5, 19.4],
-    'serbia': [42.2, 46.2, 18.8, 23.0],
-    'bosnia and herzegovina': [42.6, 45.3, 15.7, 19.6],
-    'slovenia': [45.4, 46.9, 13.4, 16.6],
-    'montenegro': [41.9, 43.5, 18.4, 20.4],
-    'north macedonia': [40.9, 42.4, 20.5, 23.0],
-    'albania': [39.6, 42.7, 19.3, 21.1],
-    'latvia': [55.7, 58.1, 21.0, 28.2],
-    'lithuania': [53.9, 56.4, 21.0, 26.8],
-    'estonia': [57.5, 59.7, 21.8, 28.2],
-    'moldova': [45.5, 48.5, 26.6, 30.1],
-    'belarus': [51.3, 56.2, 23.2, 32.8],
-    'usa': [24.4, 71.4, -179.1, -66.9],
-    'canada': [41.7, 83.1, -141.0, -52.6],
-    'japan': [24.0, 45.6, 122.9, 153.9],
-    'south korea': [33.1, 38.6, 124.6, 131.9],
-    'china': [18.2, 53.6, 73.5, 134.8],
-    'australia': [-43.6, -10.7, 113.3, 153.6],
-}
-
+from backend.core.geo.country_index import get_country_index, country_bounds
+from backend.core.geo.spatial_index import (
+    SpatialGridIndex,
+    bbox_lon_span,
+    default_cell_size,
+    normalize_lon,
+    split_antimeridian,
+    union_bbox,
+)
+from backend.core.managers.airspace_history_manager import AirspaceHistoryManagerContext
+from backend.core.agents.llm_settings import LLMSettings, create_agent_llm, create_chat_model, \
+    use_llm_settings
+from backend.core.agents.progress import run_crew
 
 def get_country_bounds(country_name: str) -> Optional[
     Tuple[float, float, float, float]]:
-    """Отримати координати країни за назвою"""
-    country_key = country_name.lower().strip()
+    """
+    Отримати bbox полігону країни за назвою (min_lat, max_lat, min_lon, max_lon).
+    Для країн через антимеридіан min_lon > max_lon.
+    """
+    return country_bounds(country_name)
+
+
+def get_country_states(client: OpenSkyClient, country_name: str) -> Optional[List]:
+    """
+    Отримати state vectors над територією країни: один запит по bbox
+    полігону (два - якщо bbox перетинає антимеридіан), далі локальна
+    фільтрація point-in-polygon за один пакетний прохід.
+    """
+    country_index = get_country_index()
+    country = country_index.find(country_name)
+    if not country:
+        return None
+
+    states = []
+    for bbox in split_antimeridian(country.bbox):
+        states.extend(client.get_states(bbox=bbox))
+    return country_index.filter_states(country, states)
 
-    # Спробуємо знайти точну відповідність
-    if country_key in COUNTRY_COORDINATES:
-        bounds = COUNTRY_COORDINATES[country_key]
-        return bounds[0], bounds[1], bounds[2], bounds[
-            3]  # min_lat, max_lat, min_lon, max_lon
 
-    # Спробуємо знайти часткову відповідність
-    for key in COUNTRY_COORDINATES:
-        if country_key in key or key in country_key:
-            bounds = COUNTRY_COORDINATES[key]
-            return bounds[0], bounds[1], bounds[2], bounds[3]
+def get_countries_states(client: OpenSkyClient, country_names: List[str]) -> Tuple[
+    Dict[str, List], List[str]]:
+    """
+    Отримати state vectors для кількох країн одним запитом: спільний bbox
+    (або глобальний знімок) і один векторний прохід класифікації.
+
+    Returns:
+        Tuple[Dict[str, List], List[str]]: стани за назвою країни та
+        список назв, які не вдалося знайти
+    """
+    country_index = get_country_index()
+    countries, missing = [], []
+    for country_name in country_names:
+        country = country_index.find(country_name)
+        if not country:
+            missing.append(country_name)
+        elif country not in countries:
+            countries.append(country)
+
+    if not countries:
+        return {}, missing
 
-    return None
+    bbox = union_bbox(country.bbox for country in countries)
+    states = client.get_states(bbox=bbox) if bbox else client.get_states()
+    groups = country_index.group_states(states)
+    return {country.name: groups.get(country.name, []) for country in countries}, missing
 
 
 def analyze_aircraft_distribution(aircraft_states: List) -> Dict:
@@ -132,33 +131,38 @@ def analyze_aircraft_distribution(aircraft_states: List) -> Dict:
     return analysis
 
 
-def get_traffic_density_analysis(aircraft_states: List, bounds: Tuple) -> Dict:
-    """Аналіз щільності трафіку"""
-    min_lat, max_lat, min_lon, max_lon = bounds
-
-    # Розділяємо простір на сітку 10x10
-    grid_size = 10
-    lat_step = (max_lat - min_lat) / grid_size
-    lon_step = (max_lon - min_lon) / grid_size
-
-    grid_density = defaultdict(int)
+def get_traffic_density_analysis(aircraft_states: List, bounds: Optional[Tuple] = None,
+                                 cell_size_deg: Optional[float] = None,
+                                 top_k: int = 5) -> Dict:
+    """
+    Аналіз щільності трафіку на глобальній сітці SpatialGridIndex
 
-    for state in aircraft_states:
-        if state.latitude and state.longitude:
-            # Знаходимо позицію в сітці
-            lat_idx = min(int((state.latitude - min_lat) / lat_step), grid_size - 1)
-            lon_idx = min(int((state.longitude - min_lon) / lon_step), grid_size - 1)
-            grid_density[(lat_idx, lon_idx)] += 1
+    Args:
+        aircraft_states (List): State vectors літаків
+        bounds (Tuple): bbox області (min_lat, max_lat, min_lon, max_lon);
+            без нього рахується весь знімок
+        cell_size_deg (float): Розмір комірки в градусах; за замовчуванням
+            ~1/10 довшої сторони bbox (або 1° для глобального знімку)
+        top_k (int): Кількість найщільніших зон у відповіді
+    """
+    index = SpatialGridIndex.from_states(
+        aircraft_states, cell_size_deg or default_cell_size(bounds))
 
-    # Знаходимо найщільніші зони
-    sorted_density = sorted(grid_density.items(), key=lambda x: x[1], reverse=True)
+    if bounds:
+        zones = index.cells_in_bbox(bounds)
+        counts = [count for _, count in zones]
+        top_zones = heapq.nlargest(top_k, zones, key=lambda zone: zone[1])
+    else:
+        counts = index.counts.tolist()
+        top_zones = index.top_k(top_k)
 
     return {
-        'total_zones': len(grid_density),
-        'max_density': sorted_density[0][1] if sorted_density else 0,
-        'top_zones': sorted_density[:5],
-        'average_density': sum(grid_density.values()) / len(
-            grid_density) if grid_density else 0
+        'total_zones': len(counts),
+        'max_density': top_zones[0][1] if top_zones else 0,
+        'top_zones': top_zones,
+        'top_zone_centers': [index.cell_center(cell) for cell, _ in top_zones],
+        'cell_size_deg': index.cell_size,
+        'average_density': sum(counts) / len(counts) if counts else 0
     }
 
 
@@ -183,7 +187,7 @@ def analyze_country_airspace(country_name: str) -> str:
         # Отримання координат країни
         bounds = get_country_bounds(country_name)
         if not bounds:
-            return f"❌ Не вдалося знайти координати для країни: {country_name}. Доступні країни: {', '.join(list(COUNTRY_COORDINATES.keys())[:10])}..."
+            return f"❌ Не вдалося знайти координати для країни: {country_name}. Доступні країни: {', '.join(get_country_index().names[:10])}..."
 
         min_lat, max_lat, min_lon, max_lon = bounds
         result_parts.append(f"📍 Координати області аналізу:")
@@ -197,9 +201,8 @@ def analyze_country_airspace(country_name: str) -> str:
     try:
         current_time = int(time.time())
 
-        # Використовуємо метод get_states з bbox
-        bbox = (min_lat, max_lat, min_lon, max_lon)
-        aircraft_states = open_sky_client.get_states(bbox=bbox)
+        # Запит по bbox полігону та фільтрація по кордонах країни
+        aircraft_states = get_country_states(open_sky_client, country_name)
 
         if not aircraft_states:
             result_parts.append("\n⚠️ Не знайдено активних літаків у вказаному регіоні")
@@ -301,15 +304,17 @@ def analyze_country_airspace(country_name: str) -> str:
         result_parts.append(f"\n🌤️ ПОГОДНІ УМОВИ В РЕГІОНІ:")
 
         # Беремо 4 точки: центр та кути
+        east_lon = min_lon + bbox_lon_span(bounds)
         weather_points = [
-            ("Центр", (min_lat + max_lat) / 2, (min_lon + max_lon) / 2),
+            ("Центр", (min_lat + max_lat) / 2, (min_lon + east_lon) / 2),
             ("Півн.-Зах.", max_lat - (max_lat - min_lat) * 0.2,
-             min_lon + (max_lon - min_lon) * 0.2),
+             min_lon + (east_lon - min_lon) * 0.2),
             ("Півд.-Сх.", min_lat + (max_lat - min_lat) * 0.2,
-             max_lon - (max_lon - min_lon) * 0.2),
+             east_lon - (east_lon - min_lon) * 0.2),
         ]
 
         for location, lat, lon in weather_points:
+            lon = float(normalize_lon(lon))
             try:
                 weather = get_current_weather(lat=lat, lon=lon)
                 result_parts.append(f"  {location} ({lat:.2f}, {lon:.2f}):")
@@ -357,7 +362,7 @@ def analyze_country_airspace(country_name: str) -> str:
 
     # Обробка через LLM для створення HTML
     try:
-        llm = ChatOpenAI(model="gpt-4o", temperature=0.7)
+        llm = create_chat_model()
 
         analysis_prompt = f"""Ось повний аналіз авіапростору країни:
                         {result_text}
@@ -386,6 +391,130 @@ def analyze_country_airspace(country_name: str) -> str:
         return '\n'.join(result_parts)
 
 
+@tool("compare_countries_airspace")
+def compare_countries_airspace(country_names: str) -> str:
+    """
+    Порівнює ситуацію в авіапросторі кількох країн за одним знімком OpenSky
+
+    Args:
+        country_names (str): Назви країн через кому (наприклад: "Poland, Germany, Ukraine")
+    Returns:
+        str: HTML-звіт з порівнянням країн
+    """
+    names = [name.strip() for name in country_names.split(',') if name.strip()]
+    if not names:
+        return "❌ Не вказано жодної країни для порівняння"
+
+    try:
+        open_sky_client = OpenSkyClient()
+        states_by_country, missing = get_countries_states(open_sky_client, names)
+    except Exception as e:
+        return f"❌ Помилка отримання станів літаків: {e}"
+
+    if not states_by_country:
+        return f"❌ Не вдалося знайти країни: {', '.join(missing)}"
+
+    result_parts = [f"🌍 Порівняння авіапростору: {', '.join(states_by_country)}"]
+    if missing:
+        result_parts.append(f"⚠️ Не знайдено країн: {', '.join(missing)}")
+
+    rows = []
+    for country, aircraft_states in states_by_country.items():
+        distribution = analyze_aircraft_distribution(aircraft_states)
+        density = get_traffic_density_analysis(aircraft_states, get_country_bounds(country))
+        total = distribution['total_aircraft']
+        rows.append((country, distribution, density))
+
+        result_parts.append(f"\n✈️ {country.upper()}:")
+        result_parts.append(f"  Всього літаків: {total}")
+        result_parts.append(f"  Активні польоти: {distribution['active_flights']}")
+        result_parts.append(f"  На землі: {distribution['ground_aircraft']}")
+        result_parts.append(
+            f"  Висотні польоти (>10км): {distribution['altitudes']['high']}"
+            f" ({distribution['altitudes']['high'] / total * 100 if total else 0:.0f}%)")
+        result_parts.append(
+            f"  Швидкі (>800км/г): {distribution['speeds']['fast']}")
+        result_parts.append(
+            f"  Максимальна щільність в зоні: {density['max_density']} літаків")
+        if distribution['major_airlines']:
+            airlines = ', '.join(f"{airline} ({count})" for airline, count
+                                 in distribution['major_airlines'].most_common(3))
+            result_parts.append(f"  Топ авіакомпанії: {airlines}")
+
+    result_parts.append(f"\n🏆 РЕЙТИНГ ЗА КІЛЬКІСТЮ ЛІТАКІВ:")
+    rows.sort(key=lambda row: row[1]['total_aircraft'], reverse=True)
+    for place, (country, distribution, _) in enumerate(rows, start=1):
+        result_parts.append(f"  {place}. {country}: {distribution['total_aircraft']}")
+
+    result_parts.append(f"\n✅ Порівняння завершено")
+    result_text = '\n'.join(result_parts)
+
+    try:
+        llm = create_chat_model()
+
+        comparison_prompt = f"""Ось порівняльний аналіз авіапростору кількох країн:
+                        {result_text}
+
+                        Створи сучасний HTML-код з одним зведеним звітом для всіх країн.
+                        Використай:
+                        - Порівняльну таблицю та картки для кожної країни
+                        - Діаграми для порівняння (використай Chart.js або подібні)
+                        - Кольорове кодування та responsive дизайн
+
+                        ОБОВ'ЯЗКОВО! ПОВЕРТАЙ ВИКЛЮЧНО HTML КОД, БЕЗ ФОРМАТУВАННЯ ТА
+                        ТЕГІВ, У ЧИСТОМУ ВИГЛЯДІ, НЕ ЗАКРИВАЙ ЙОГО У ```html 
+                        ЧИ ЩОСЬ ПОДІБНЕ. ВИКЛЮЧНО ЧИСТИЙ КОД!
+
+                        Додай підсумковий висновок: де трафік найінтенсивніший і чим відрізняються країни.
+                        """
+
+        response = llm.invoke(comparison_prompt)
+        return response.content
+
+    except Exception as e:
+        result_parts.append(f"\n❌ Помилка обробки LLM: {e}")
+        return '\n'.join(result_parts)
+
+
+@tool("analyze_airspace_trends")
+def analyze_airspace_trends(country_name: str, hours_back: int = 24) -> str:
+    """
+    Аналізує тренд повітряного руху над країною за збереженою історією знімків
+
+    Args:
+        country_name (str): Назва країни (наприклад: "Poland", "Ukraine")
+        hours_back (int): Скільки годин історії аналізувати (за замовчуванням 24)
+    Returns:
+        str: Текстовий підсумок тренду
+    """
+    try:
+        with AirspaceHistoryManagerContext() as history_manager:
+            trends = history_manager.get_flight_trends(country_name, hours_back)
+    except Exception as e:
+        return f"❌ Помилка отримання історії авіапростору: {e}"
+
+    if not trends['points']:
+        return (f"⚠️ Немає збереженої історії для {country_name} за останні "
+                f"{hours_back} год. Запис ведеться лише для країн з "
+                f"AIRSPACE_RECORDER_COUNTRIES")
+
+    trend_labels = {
+        "increasing": "📈 Зростає",
+        "decreasing": "📉 Спадає",
+        "stable": "➡️ Стабільний",
+    }
+    result_parts = [
+        f"📊 ТРЕНД АВІАПРОСТОРУ: {country_name.upper()} (останні {hours_back} год)",
+        f"  Тренд: {trend_labels.get(trends['trend'], trends['trend'])}",
+        f"  Поточна кількість літаків: {trends['current']}",
+        f"  Середня кількість літаків у знімку: {trends['average_aircraft_per_snapshot']}",
+        f"  Максимум: {trends['maximum']}",
+        f"  Пікові періоди (UTC): {', '.join(trends['peak_hours'])}",
+        f"  Точок даних: {trends['points']} (крок {trends['resolution']})",
+    ]
+    return '\n'.join(result_parts)
+
+
 @tool("analysis_info_about_aircraft")
 def analysis_info_about_aircraft(hex_code: str) -> str:
     """
@@ -580,7 +709,7 @@ def analysis_info_about_aircraft(hex_code: str) -> str:
     result_text = '\n'.join(result_parts)
 
     # Обробка результату через LLM
-    llm = ChatOpenAI(model="gpt-4o", temperature=0.7)
+    llm = create_chat_model()
 
     analysis_prompt = f"""Ось усі доступні дані по повітряному судну:
                     {result_text}
@@ -600,10 +729,12 @@ def analysis_info_about_aircraft(hex_code: str) -> str:
 
 
 class AviationAnalysisAgent:
-    def __init__(self, agent_id: str, name: str, system_prompt: str = None):
+    def __init__(self, agent_id: str, name: str, system_prompt: str = None,
+                 llm_settings: Optional[LLMSettings] = None):
         self.agent_id = agent_id
         self.name = name
-        self.llm = ChatOpenAI(model="gpt-4o", temperature=0.7)
+        self.llm_settings = llm_settings or LLMSettings()
+        self.llm = create_agent_llm(self.llm_settings)
 
         # Set up default backstory if none provided
         backstory = system_prompt if system_prompt else """
@@ -633,6 +764,15 @@ class AviationAnalysisAgent:
              * Active flights analysis
              * Safety recommendations
 
+        3) For traffic trend questions over time: use "analyze_airspace_trends"
+           - Requires country name and optionally hours_back (default 24)
+           - Answers questions like "is traffic over Poland rising today?" from
+             stored history without live API calls
+
+        4) For comparing several countries: use "compare_countries_airspace"
+           - Requires comma separated country names (e.g., "Poland, Germany")
+           - Uses a single OpenSky snapshot and returns one combined report
+
         Key Features:
         - Real-time aircraft tracking and analysis
         - Comprehensive airspace monitoring
@@ -652,7 +792,8 @@ class AviationAnalysisAgent:
             verbose=True,
             allow_delegation=False,
             llm=self.llm,
-            tools=[analysis_info_about_aircraft, analyze_country_airspace]
+            tools=[analysis_info_about_aircraft, analyze_country_airspace,
+                   analyze_airspace_trends, compare_countries_airspace]
         )
 
     async def process_message(self, message: str) -> str:
@@ -669,6 +810,9 @@ class AviationAnalysisAgent:
                 - Determine if the user wants aircraft analysis or airspace analysis
                 - For aircraft analysis: extract hex code and use analysis_info_about_aircraft tool
                 - For airspace/country analysis: extract country name and use analyze_country_airspace tool
+                - For traffic trends over time: extract country name and period, use analyze_airspace_trends tool
+                - For comparing two or more countries: use compare_countries_airspace once with all names,
+                  do not call analyze_country_airspace for each country
                 - If the request is ambiguous, ask for clarification
                 - Provide comprehensive aviation analysis with safety insights
                 - Extract relevant parameters (hex codes, country names) carefully
@@ -693,9 +837,9 @@ class AviationAnalysisAgent:
                 verbose=True
             )
 
-            # Run the crew asynchronously
-            loop = asyncio.get_event_loop()
-            result = await loop.run_in_executor(None, crew.kickoff)
+            # Run the crew asynchronously; HTML-звіти інструментів - на моделі цього агента
+            with use_llm_settings(self.llm_settings):
+                result = await run_crew(crew)
 
             return f"```html-render \n{str(result)} \n```"
 
@@ -716,8 +860,7 @@ class EnhancedOpenSkyClient(OpenSkyClient):
         if not bounds:
             return {"error": f"Country {country_name} not found"}
 
-        bbox = (bounds[0], bounds[1], bounds[2], bounds[3])
-        aircraft_states = self.get_states(bbox=bbox)
+        aircraft_states = get_country_states(self, country_name)
 
         if not aircraft_states:
             return {"total": 0, "active": 0, "grounded": 0}
@@ -740,11 +883,6 @@ class EnhancedOpenSkyClient(OpenSkyClient):
         return []
 
     def get_flight_trends(self, country_name: str, hours_back: int = 24) -> Dict:
-        """Аналіз трендів польотів за останні години"""
-        # Для реалізації потрібно зберігати історичні дані
-        # Тут базова структура
-        return {
-            "trend": "stable",  # "increasing", "decreasing", "stable"
-            "peak_hours": [],
-            "average_flights_per_hour": 0
-        }
+        """Аналіз трендів польотів за останні години (з таблиці airspace_snapshots)"""
+        with AirspaceHistoryManagerContext() as history_manager:
+            return history_manager.get_flight_trends(country_name, hours_back)
@@ -1,14 +1,17 @@
+from typing import Optional
 from crewai import Agent, Task, Crew, Process
-from langchain_openai import ChatOpenAI
 from backend.core.tools.weather_tools import get_current_weather, get_weather_forecast
-import asyncio
+from backend.core.agents.llm_settings import LLMSettings, create_agent_llm
+from backend.core.agents.progress import run_crew
 
 
 class SmartWeatherAgent:
-    def __init__(self, agent_id: str, name: str, system_prompt: str):
+    def __init__(self, agent_id: str, name: str, system_prompt: str,
+                 llm_settings: Optional[LLMSettings] = None):
         self.agent_id = agent_id
         self.name = name
-        self.llm = ChatOpenAI(model="gpt-4o", temperature=0.7)
+        self.llm_settings = llm_settings or LLMSettings()
+        self.llm = create_agent_llm(self.llm_settings)
 
         # Set up backstory
         backstory = system_prompt if system_prompt else """
@@ -68,8 +71,7 @@ class SmartWeatherAgent:
             )
 
             # Run the crew asynchronously
-            loop = asyncio.get_event_loop()
-            result = await loop.run_in_executor(None, crew.kickoff)
+            result = await run_crew(crew)
 
             return str(result)
 
@@ -1,9 +1,10 @@
+from typing import Optional
 from crewai import Agent, Task, Crew, Process
-from langchain_openai import ChatOpenAI
 from backend.clients.windy_client import get_current_weather
 from crewai.tools import tool
 from datetime import datetime
-import asyncio
+from backend.core.agents.llm_settings import LLMSettings, create_agent_llm
+from backend.core.agents.progress import run_crew
 
 
 @tool("get_windy_weather")
@@ -106,10 +107,12 @@ def _create_weather_item(icon: str, label: str, value: str,
 
 class WindyWeatherAgent:
 
-    def __init__(self, agent_id: str, name: str, system_prompt: str = None):
+    def __init__(self, agent_id: str, name: str, system_prompt: str = None,
+                 llm_settings: Optional[LLMSettings] = None):
         self.agent_id = agent_id
         self.name = name
-        self.llm = ChatOpenAI(model="gpt-4o", temperature=0.7)
+        self.llm_settings = llm_settings or LLMSettings()
+        self.llm = create_agent_llm(self.llm_settings)
 
         backstory = system_prompt if system_prompt else """
         You are a smart weather assistant that provides accurate weather information based on coordinates.
@@ -175,8 +178,7 @@ class WindyWeatherAgent:
             )
 
             # Запускаємо crew асинхронно
-            loop = asyncio.get_event_loop()
-            result = await loop.run_in_executor(None, crew.kickoff)
+            result = await run_crew(crew)
 
             return str(result)
 
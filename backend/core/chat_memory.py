@@ -0,0 +1,293 @@
+"""
+Довготривала пам'ять чатів: замість усієї історії агент отримує останні
+MEMORY_RECENT_MESSAGES повідомлень і до MEMORY_TOP_K давніших, найближчих
+за змістом до поточного повідомлення. Розмір промпту і час побудови
+контексту не ростуть з довжиною чату, а давній контекст можна згадати.
+
+Збережені повідомлення ембеддяться у фоновому потоці (ChatMemoryIndexer)
+і пишуться в chat_message_embeddings. Індекси (user, agent) у пам'яті
+процесу - кеш цієї таблиці: завантажуються при першому зверненні, далі
+дочитують лише нові рядки (зокрема записані іншими процесами).
+Повідомлення без ембеддингу поточної моделі (історія до ввімкнення
+пам'яті, зміна EMBEDDING_MODEL) індексуються у фоні при завантаженні
+індексу. Пошук - повний перебір NumPy по індексу одного чату.
+"""
+import logging
+import os
+import queue
+import re
+import threading
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple, Union
+
+import numpy as np
+
+from backend.core.embeddings import embed, get_embedder
+from backend.core.managers.chat_manager import ChatManager
+from backend.core.managers.memory_manager import MemoryManager, MemoryManagerContext
+from backend.core.metrics import CHAT_MEMORY_EMBEDDED
+from backend.core.tracing import annotate
+from backend.models.chat_history import ChatHistory
+
+logger = logging.getLogger(__name__)
+
+CHAT_MEMORY_ENABLED = os.getenv("CHAT_MEMORY", "false").lower() in ("1", "true", "yes")
+RECENT_MESSAGES = int(os.getenv("MEMORY_RECENT_MESSAGES", 10))
+DEFAULT_TOP_K = 6
+DEFAULT_MIN_SIMILARITY = 0.35
+DEFAULT_MAX_INDEXES = 256
+EMBED_BATCH_SIZE = 64
+BACKFILL_BATCH_SIZE = 500
+EMBED_TEXT_CHARS = 2000
+RECALLED_MESSAGE_CHARS = 1000
+INDEXER_FLUSH_SECONDS = 0.5
+# Рядки, закомічені іншими процесами трохи пізніше за свій created_at, не губляться
+REFRESH_OVERLAP = timedelta(seconds=30)
+HTML_TAG_PATTERN = re.compile(r"<[^>]+>")
+
+MemoryKey = Tuple[str, str]
+
+
+def plain_text(text: Optional[str], limit: int) -> str:
+    """Текст без HTML-розмітки (відповіді агентів - HTML), обрізаний до limit символів"""
+    return " ".join(HTML_TAG_PATTERN.sub(" ", text or "").split())[:limit]
+
+
+class _MemoryIndex:
+    """Ембеддинги одного чату: матриця рядків і id повідомлень у тому ж порядку"""
+
+    def __init__(self):
+        self.ids: List[uuid.UUID] = []
+        self.positions: Dict[uuid.UUID, int] = {}
+        self.vectors: Optional[np.ndarray] = None
+        self.loaded_until: Optional[datetime] = None
+
+    def add(self, rows: List[Any]) -> None:
+        """Рядки get_embeddings (за зростанням created_at); відомі повідомлення пропускаються"""
+        if not rows:
+            return
+        self.loaded_until = max(self.loaded_until or rows[-1].created_at, rows[-1].created_at)
+        fresh = [row for row in rows if row.message_id not in self.positions]
+        if not fresh:
+            return
+        vectors = np.stack([np.frombuffer(row.embedding, dtype=np.float32) for row in fresh])
+        self.vectors = vectors if self.vectors is None else np.vstack((self.vectors, vectors))
+        for row in fresh:
+            self.positions[row.message_id] = len(self.ids)
+            self.ids.append(row.message_id)
+
+    def remove(self, message_ids: Set[uuid.UUID]) -> None:
+        keep = [position for position, message_id in enumerate(self.ids)
+                if message_id not in message_ids]
+        self.ids = [self.ids[position] for position in keep]
+        self.positions = {message_id: position for position, message_id in enumerate(self.ids)}
+        self.vectors = self.vectors[keep] if self.ids else None
+
+    def search(self, vector: np.ndarray, limit: int,
+               exclude: Set[uuid.UUID]) -> List[Tuple[uuid.UUID, float]]:
+        """До limit найближчих повідомлень (без exclude), від найсхожішого"""
+        if not self.ids:
+            return []
+        similarities = self.vectors @ vector
+        for message_id in exclude:
+            position = self.positions.get(message_id)
+            if position is not None:
+                similarities[position] = -np.inf
+        count = min(limit, len(self.ids))
+        top = np.argpartition(-similarities, count - 1)[:count]
+        top = top[np.argsort(-similarities[top])]
+        return [(self.ids[position], float(similarities[position]))
+                for position in top if np.isfinite(similarities[position])]
+
+
+class ChatMemoryIndexer:
+    """
+    Фоновий потік: ембеддить повідомлення пакетами і пише їх у
+    chat_message_embeddings. Помилки лише логуються - пропущені
+    повідомлення доіндексує backfill при наступному завантаженні індексу.
+    """
+
+    def __init__(self, batch_size: int = EMBED_BATCH_SIZE,
+                 flush_interval: float = INDEXER_FLUSH_SECONDS):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue: "queue.Queue[Union[Dict[str, Any], MemoryKey]]" = queue.Queue()
+        self._pending_backfills: Set[MemoryKey] = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def submit(self, rows: List[Dict[str, Any]]) -> None:
+        if not rows:
+            return
+        self.start()
+        for row in rows:
+            self._queue.put(row)
+
+    def backfill(self, user_id: str, agent_id: str) -> None:
+        """Проіндексувати всі повідомлення чату без ембеддингу поточної моделі"""
+        key = (str(user_id), str(agent_id))
+        with self._lock:
+            if key in self._pending_backfills:
+                return
+            self._pending_backfills.add(key)
+        self.start()
+        self._queue.put(key)
+
+    def _drain(self) -> List[Union[Dict[str, Any], MemoryKey]]:
+        items = []
+        try:
+            items.append(self._queue.get(timeout=self.flush_interval))
+            while len(items) < self.batch_size:
+                items.append(self._queue.get_nowait())
+        except queue.Empty:
+            pass
+        return items
+
+    @staticmethod
+    def _index_rows(memory_manager: MemoryManager, rows: List[Dict[str, Any]]) -> None:
+        model = get_embedder().name
+        vectors = embed([plain_text(row["message_text"], EMBED_TEXT_CHARS) for row in rows])
+        memory_manager.save_embeddings([
+            {
+                "message_id": row["id"],
+                "user_id": row["user_id"],
+                "agent_id": row["agent_id"],
+                "model": model,
+                "embedding": vector.tobytes(),
+            }
+            for row, vector in zip(rows, vectors)
+        ])
+        CHAT_MEMORY_EMBEDDED.inc(len(rows))
+
+    def _backfill(self, key: MemoryKey) -> None:
+        try:
+            with MemoryManagerContext() as memory_manager:
+                while not self._stop.is_set():
+                    messages = memory_manager.get_unembedded_messages(
+                        *key, model=get_embedder().name, limit=BACKFILL_BATCH_SIZE)
+                    for start in range(0, len(messages), self.batch_size):
+                        self._index_rows(memory_manager, [
+                            {"id": message.id, "user_id": message.user_id,
+                             "agent_id": message.agent_id, "message_text": message.message_text}
+                            for message in messages[start:start + self.batch_size]
+                        ])
+                    if len(messages) < BACKFILL_BATCH_SIZE:
+                        return
+        except Exception as e:
+            logger.warning(f"Chat memory backfill for {key} failed: {e}")
+        finally:
+            with self._lock:
+                self._pending_backfills.discard(key)
+
+    def _loop(self) -> None:
+        while not self._stop.is_set() or not self._queue.empty():
+            items = self._drain()
+            rows = [item for item in items if isinstance(item, dict)]
+            if rows:
+                try:
+                    with MemoryManagerContext() as memory_manager:
+                        self._index_rows(memory_manager, rows)
+                except Exception as e:
+                    logger.warning(f"Chat memory indexing of {len(rows)} messages failed: {e}")
+            for key in (item for item in items if isinstance(item, tuple)):
+                self._backfill(key)
+
+    def start(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="chat-memory-indexer", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10.0) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=timeout)
+
+
+class ChatMemory:
+
+    def __init__(self, top_k: int = DEFAULT_TOP_K, min_similarity: float = DEFAULT_MIN_SIMILARITY,
+                 max_indexes: int = DEFAULT_MAX_INDEXES):
+        self.top_k = top_k
+        self.min_similarity = min_similarity
+        self.max_indexes = max_indexes
+        self.indexer = ChatMemoryIndexer()
+        self._indexes: "OrderedDict[MemoryKey, _MemoryIndex]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def remember(self, rows: Iterable[Dict[str, Any]]) -> None:
+        """Ставить збережені повідомлення (рядки chat_history) в чергу індексації"""
+        self.indexer.submit([row for row in rows if row.get("message_text")])
+
+    def forget(self, user_id: str, agent_id: str) -> None:
+        """Скидає індекс чату (після очищення історії)"""
+        with self._lock:
+            self._indexes.pop((str(user_id), str(agent_id)), None)
+
+    def _index(self, memory_manager: MemoryManager, user_id: str, agent_id: str) -> _MemoryIndex:
+        key = (str(user_id), str(agent_id))
+        with self._lock:
+            index = self._indexes.get(key)
+            created = index is None
+            if created:
+                index = self._indexes[key] = _MemoryIndex()
+                while len(self._indexes) > self.max_indexes:
+                    self._indexes.popitem(last=False)
+            else:
+                self._indexes.move_to_end(key)
+            since = index.loaded_until - REFRESH_OVERLAP if index.loaded_until else None
+
+        rows = memory_manager.get_embeddings(user_id, agent_id, get_embedder().name, since=since)
+        with self._lock:
+            index.add(rows)
+        if created:
+            self.indexer.backfill(user_id, agent_id)
+        return index
+
+    def recall(self, chat_manager: ChatManager, user_id: str, agent_id: str, text: str,
+               exclude: Set[uuid.UUID]) -> List[ChatHistory]:
+        """
+        До top_k повідомлень чату, найближчих за змістом до text, у
+        хронологічному порядку
+
+        Args:
+            exclude (Set[UUID]): Повідомлення, які вже є в контексті (останні)
+        """
+        index = self._index(MemoryManager(chat_manager.db), user_id, agent_id)
+        if not index.positions.keys() - exclude:
+            annotate(memory_index_size=len(index.ids), memory_recalled=0)
+            return []
+
+        vector = embed([plain_text(text, EMBED_TEXT_CHARS)])[0]
+        with self._lock:
+            hits = [(message_id, similarity)
+                    for message_id, similarity in index.search(vector, self.top_k, exclude)
+                    if similarity >= self.min_similarity]
+        messages = chat_manager.get_messages_by_ids([message_id for message_id, _ in hits])
+
+        missing = {message_id for message_id, _ in hits} - {message.id for message in messages}
+        if missing:
+            # Повідомлення видалено (наприклад, чат очищено в іншому процесі)
+            with self._lock:
+                index.remove(missing)
+        annotate(memory_index_size=len(index.ids), memory_recalled=len(messages),
+                 memory_best_similarity=round(hits[0][1], 3) if hits else None)
+        return messages
+
+    def stop(self) -> None:
+        self.indexer.stop()
+
+
+_chat_memory = ChatMemory(
+    top_k=int(os.getenv("MEMORY_TOP_K", DEFAULT_TOP_K)),
+    min_similarity=float(os.getenv("MEMORY_MIN_SIMILARITY", DEFAULT_MIN_SIMILARITY)),
+    max_indexes=int(os.getenv("MEMORY_MAX_INDEXES", DEFAULT_MAX_INDEXES)),
+)
+
+
+def get_chat_memory() -> ChatMemory:
+    return _chat_memory
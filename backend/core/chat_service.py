@@ -0,0 +1,399 @@
+"""
+Обробка повідомлення чату: виклик агента з історією як контекстом і
+збереження повідомлення та відповіді в chat_history. Спільна для HTTP
+/send та фонових задач.
+"""
+import asyncio
+import logging
+import math
+import os
+import queue
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+from backend.core.agents.progress import AgentUsage, agent_run, track_usage
+from backend.core.chat_memory import CHAT_MEMORY_ENABLED, RECALLED_MESSAGE_CHARS, RECENT_MESSAGES, \
+    get_chat_memory, plain_text
+from backend.core.managers.agent_manager import AgentManager
+from backend.core.tracing import annotate, fail_current, span
+from backend.core.managers.chat_manager import ChatManager, ChatManagerContext
+from backend.core.managers.usage_manager import UsageManager
+from backend.core.semantic_cache import get_semantic_cache
+from backend.models.chat_history import ChatHistory, MessageType as DBMessageType
+from backend.schemas.chat import ChatMessage, ChatMessageResponse, MessageType
+
+START_MEMORY_PROMPT = (
+    "ЦЕ СИСТЕМНИЙ ПРОМПТ. ІСТОРІЯ ПОВІДОМЛЕНЬ ТЕПЕР БУДЕ ПЕРЕДАНА ДЛЯ НАДАННЯ КОНТЕКСТУ:")
+END_MEMORY_PROMPT = "ІСТОРІЯ ПОВІДОМЛЕНЬ ЗАВЕРШЕНА"
+SUMMARY_MEMORY_PROMPT = "ПІДСУМОК ДАВНІШОЇ РОЗМОВИ:"
+RECALLED_MEMORY_PROMPT = "РЕЛЕВАНТНІ ДАВНІШІ ПОВІДОМЛЕННЯ:"
+RECENT_MEMORY_PROMPT = "ОСТАННІ ПОВІДОМЛЕННЯ:"
+IMAGE_RESPONSE = "Зображення отримано. Обробка зображень буде додана в майбутніх версіях."
+NO_COINS_RESPONSE = "На вашому рахунку закінчились монети - відповідь агента недоступна."
+
+# Повідомлення зберігаються за київським часом
+TIME_SHIFT = timedelta(hours=3)
+
+# Відкладений запис: відповідь не чекає на запис у БД
+WRITE_BEHIND_ENABLED = os.getenv("CHAT_WRITE_BEHIND", "false").lower() in ("1", "true", "yes")
+WRITE_BEHIND_BATCH_SIZE = 200
+WRITE_BEHIND_FLUSH_SECONDS = 0.2
+WRITE_BEHIND_ATTEMPTS = 3
+
+# Ціна відповіді агента в монетах: округлення вгору за кожну 1000 токенів
+COINS_PER_1K_TOKENS = float(os.getenv("COINS_PER_1K_TOKENS", 1))
+# Не викликати агента, якщо баланс користувача вичерпано
+COIN_BALANCE_REQUIRED = os.getenv("COIN_BALANCE_REQUIRED", "false").lower() in ("1", "true", "yes")
+
+logger = logging.getLogger(__name__)
+
+MessageCallback = Callable[[ChatHistory], Awaitable[None]]
+
+
+async def process_with_agent(message: str, user_id: str, agent_id: str,
+                             agent_manager: AgentManager) -> str:
+    with span("agent.process", kind="agent", agent_id=agent_id,
+              prompt_chars=len(message)) as agent_span:
+        try:
+            agent_instance = agent_manager.get_agent_instance(agent_id)
+            if not agent_instance:
+                return "Помилка: Агент не знайдено або неправильно налаштовано"
+
+            # Дочекатися результату асинхронного методу
+            with agent_run(type(agent_instance).__name__):
+                response = await agent_instance.process_message(message)
+            if agent_span:
+                agent_span.set(agent=type(agent_instance).__name__,
+                               response_chars=len(str(response or "")))
+            return response
+        except Exception as e:
+            logger.error(f"Помилка обробки з агентом {agent_id}: {e}")
+            if agent_span:
+                agent_span.fail(e)
+            return f"Вибачте, сталася помилка при обробці вашого повідомлення: {str(e)}"
+
+
+def serialize_message(message: ChatHistory) -> dict:
+    return ChatMessageResponse.model_validate(message).model_dump(mode="json")
+
+
+def build_message_to_llm(previous_messages: List[ChatHistory], text: str,
+                         recalled_messages: Sequence[ChatHistory] = (),
+                         summary: Optional[str] = None) -> str:
+    """
+    Склеює історію чату і поточне повідомлення в один промпт для агента.
+    Підсумок архівованої частини чату і згадані давніші повідомлення
+    (довготривала пам'ять) йдуть окремими блоками перед останніми,
+    текстом без розмітки.
+    """
+    message_to_llm = f"{START_MEMORY_PROMPT}\n"
+    if summary:
+        message_to_llm += f"{SUMMARY_MEMORY_PROMPT}\n{summary}\n"
+    if recalled_messages:
+        message_to_llm += f"{RECALLED_MEMORY_PROMPT}\n"
+        for recalled_message in recalled_messages:
+            message_to_llm += f"Відправник: {recalled_message.sender}\n"
+            message_to_llm += (f"Повідомлення: "
+                               f"{plain_text(recalled_message.message_text, RECALLED_MESSAGE_CHARS)}\n")
+    if summary or recalled_messages:
+        message_to_llm += f"{RECENT_MEMORY_PROMPT}\n"
+    for previous_message in previous_messages:
+        message_to_llm += f"Відправник: {previous_message.sender}\n"
+        message_to_llm += f"Повідомлення: {previous_message.message_text}\n"
+    message_to_llm += f"{END_MEMORY_PROMPT}\nПоточне повідомлення: {text}"
+    return message_to_llm
+
+
+def user_message_row(chat_message: ChatMessage) -> Dict[str, Any]:
+    return {
+        "id": uuid.uuid4(),
+        "user_id": chat_message.user_id,
+        "agent_id": chat_message.agent_id,
+        "message_type": DBMessageType.TEXT if chat_message.message_type == MessageType.TEXT else DBMessageType.IMAGE,
+        "sender": "USER",
+        "message_text": chat_message.text,
+        "message_image": chat_message.image,
+        "was_sent": chat_message.was_sent + TIME_SHIFT,
+    }
+
+
+def coins_for(usage: AgentUsage) -> int:
+    return math.ceil(usage.total_tokens * COINS_PER_1K_TOKENS / 1000)
+
+
+def usage_row(chat_message: ChatMessage, chat_message_id: uuid.UUID, usage: AgentUsage,
+              prompt_chars: int, duration_ms: int) -> Dict[str, Any]:
+    return {
+        "id": uuid.uuid4(),
+        "chat_message_id": chat_message_id,
+        "user_id": chat_message.user_id,
+        "agent_id": chat_message.agent_id,
+        "agent_type": usage.agent_type,
+        "model": ",".join(sorted(usage.models)) or None,
+        "prompt_chars": prompt_chars,
+        "prompt_tokens": usage.prompt_tokens,
+        "cached_prompt_tokens": usage.cached_prompt_tokens,
+        "completion_tokens": usage.completion_tokens,
+        "llm_requests": usage.llm_requests,
+        "tool_calls": usage.tool_calls,
+        "duration_ms": duration_ms,
+        "coins": coins_for(usage),
+    }
+
+
+def record_usage(usage_manager: UsageManager, row: Dict[str, Any]) -> None:
+    """Облік і списання монет; відповідь уже збережена, тому помилка лише логується"""
+    try:
+        balance = usage_manager.record_usage(row)
+        annotate(coins=row["coins"], coin_balance=balance)
+    except Exception as e:
+        logger.error(f"Failed to record LLM usage for message {row['chat_message_id']}: {e}")
+
+
+def agent_message_row(chat_message: ChatMessage, text: str) -> Dict[str, Any]:
+    return {
+        "id": uuid.uuid4(),
+        "user_id": chat_message.user_id,
+        "agent_id": chat_message.agent_id,
+        "message_type": DBMessageType.TEXT,
+        "sender": "AGENT",
+        "message_text": text,
+        "message_image": None,
+        "was_sent": datetime.now() + TIME_SHIFT,
+    }
+
+
+class ChatWriteBehind:
+    """
+    Черга відкладеного запису повідомлень: рядки з багатьох запитів
+    збираються в пакети і пишуться одним add_messages у фоновому потоці.
+    """
+
+    def __init__(self, batch_size: int = WRITE_BEHIND_BATCH_SIZE,
+                 flush_interval: float = WRITE_BEHIND_FLUSH_SECONDS):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue: "queue.Queue[Dict[str, Any]]" = queue.Queue()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def submit(self, rows: List[Dict[str, Any]]) -> None:
+        self.start()
+        for row in rows:
+            self._queue.put(row)
+
+    def _drain(self) -> List[Dict[str, Any]]:
+        rows = []
+        try:
+            rows.append(self._queue.get(timeout=self.flush_interval))
+            while len(rows) < self.batch_size:
+                rows.append(self._queue.get_nowait())
+        except queue.Empty:
+            pass
+        return rows
+
+    def _write(self, rows: List[Dict[str, Any]]) -> None:
+        for attempt in range(WRITE_BEHIND_ATTEMPTS):
+            try:
+                with ChatManagerContext() as chat_manager:
+                    chat_manager.add_messages(rows)
+                return
+            except Exception as e:
+                logger.warning(f"Write-behind batch of {len(rows)} messages failed "
+                               f"(attempt {attempt + 1}): {e}")
+                time.sleep(0.5 * (attempt + 1))
+        logger.error(f"Dropping {len(rows)} chat messages after {WRITE_BEHIND_ATTEMPTS} attempts")
+
+    def _loop(self) -> None:
+        while not self._stop.is_set() or not self._queue.empty():
+            rows = self._drain()
+            if rows:
+                self._write(rows)
+
+    def start(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="chat-write-behind", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """Дописує все, що залишилося в черзі, і зупиняє потік"""
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=timeout)
+
+
+_write_behind = ChatWriteBehind()
+
+
+def get_write_behind() -> ChatWriteBehind:
+    return _write_behind
+
+
+def persist_messages(chat_manager: ChatManager, rows: List[Dict[str, Any]]) -> None:
+    """Пише повідомлення одним пакетом: одразу або через write-behind чергу"""
+    if WRITE_BEHIND_ENABLED:
+        get_write_behind().submit(rows)
+        return
+    chat_manager.add_messages(rows)
+
+
+@dataclass
+class ChatContext:
+    previous_messages: List[ChatHistory]
+    recalled_messages: List[ChatHistory] = field(default_factory=list)
+    summary: Optional[str] = None
+
+
+async def load_chat_context(chat_manager: ChatManager, chat_message: ChatMessage) -> ChatContext:
+    """
+    Контекст для агента з гарячого шару історії і підсумку архіву: уся гаряча
+    історія чату; з CHAT_MEMORY=true - останні повідомлення і релевантні
+    давніші з довготривалої пам'яті
+    """
+    chat_summary = chat_manager.get_chat_summary(chat_message.user_id, chat_message.agent_id)
+    summary = chat_summary.summary if chat_summary else None
+    if not CHAT_MEMORY_ENABLED:
+        return ChatContext(chat_manager.get_chat_by_user_and_agent(
+            user_id=chat_message.user_id,
+            agent_id=chat_message.agent_id
+        ), summary=summary)
+
+    recent_messages = chat_manager.get_recent_messages(
+        chat_message.user_id, chat_message.agent_id, RECENT_MESSAGES)
+    if len(recent_messages) < RECENT_MESSAGES and chat_summary is None:
+        # Увесь чат і так потрапляє в контекст
+        return ChatContext(recent_messages)
+    try:
+        # Ембеддинг - робота CPU, не блокуємо event loop
+        recalled_messages = await asyncio.to_thread(
+            get_chat_memory().recall, chat_manager, chat_message.user_id, chat_message.agent_id,
+            chat_message.text, {message.id for message in recent_messages})
+    except Exception as e:
+        logger.warning(f"Chat memory recall failed, using recent messages only: {e}")
+        recalled_messages = []
+    return ChatContext(recent_messages, recalled_messages, summary)
+
+
+async def handle_chat_message(
+        chat_message: ChatMessage,
+        chat_manager: ChatManager,
+        agent_manager: AgentManager,
+        on_message: Optional[MessageCallback] = None,
+) -> Optional[str]:
+    """
+    Обробляє повідомлення: контекст будується з попередньої історії та
+    нового повідомлення в пам'яті, а повідомлення користувача і відповідь
+    агента записуються разом одним пакетом після відповіді агента. Якщо
+    запис не вдався, помилка логується, а відповідь однаково повертається.
+
+    Args:
+        chat_message (ChatMessage): Вхідне повідомлення
+        chat_manager (ChatManager): Менеджер історії чату
+        agent_manager (AgentManager): Менеджер агентів
+        on_message (Callable): Викликається для повідомлення користувача
+            одразу і для відповіді агента після її збереження
+
+    Returns:
+        Optional[str]: Відповідь агента (None для порожнього текстового повідомлення)
+    """
+    user_row = user_message_row(chat_message)
+    if on_message:
+        # Клієнт бачить своє повідомлення одразу, не чекаючи агента і запису в БД
+        await on_message(ChatHistory(**user_row))
+
+    with span("chat.handle_message", kind="chat", agent_id=chat_message.agent_id,
+              message_type=chat_message.message_type.value,
+              message_chars=len(chat_message.text or "")) as chat_span:
+        ai_response, rows = await _answer_chat_message(
+            chat_message, user_row, chat_manager, agent_manager)
+        if chat_span:
+            chat_span.set(response_chars=len(ai_response or ""), persisted_rows=len(rows))
+
+    if on_message:
+        for row in rows[1:]:
+            await on_message(ChatHistory(**row))
+    return ai_response
+
+
+async def _answer_chat_message(chat_message: ChatMessage, user_row: Dict[str, Any],
+                               chat_manager: ChatManager, agent_manager: AgentManager
+                               ) -> Tuple[Optional[str], List[Dict[str, Any]]]:
+    """Відповідь агента і збережені рядки (порожньо, якщо запис не вдався)"""
+    rows = [user_row]
+    usage_manager = UsageManager(chat_manager.db)
+    usage = None
+
+    ai_response = None
+    if (chat_message.message_type == MessageType.TEXT and chat_message.text
+            and COIN_BALANCE_REQUIRED
+            and (usage_manager.get_balance(chat_message.user_id) or 0) <= 0):
+        ai_response = NO_COINS_RESPONSE
+        rows.append(agent_message_row(chat_message, ai_response))
+
+    elif chat_message.message_type == MessageType.TEXT and chat_message.text:
+        semantic_cache = get_semantic_cache()
+        cache_scope = semantic_cache.scope_for(agent_manager.get_agent_by_id(chat_message.agent_id))
+        cached_response = None
+        if cache_scope:
+            # Ембеддинг - робота CPU, не блокуємо event loop
+            cached_response = await asyncio.to_thread(
+                semantic_cache.lookup, cache_scope, chat_message.text)
+
+        if cached_response is not None:
+            # Повторне питання: без історії, LLM і списання монет
+            ai_response = cached_response
+            rows.append(agent_message_row(chat_message, ai_response))
+        else:
+            context = await load_chat_context(chat_manager, chat_message)
+            annotate(history_messages=len(context.previous_messages),
+                     recalled_messages=len(context.recalled_messages),
+                     chat_summary=context.summary is not None)
+            message_to_llm = build_message_to_llm(
+                context.previous_messages + [ChatHistory(**user_row)], chat_message.text,
+                context.recalled_messages, context.summary)
+
+            started = time.perf_counter()
+            try:
+                with track_usage() as usage:
+                    ai_response = await process_with_agent(
+                        message_to_llm,
+                        chat_message.user_id,
+                        chat_message.agent_id,
+                        agent_manager
+                    )
+            except Exception as e:
+                logger.error(f"Помилка генерації відповіді AI: {e}")
+                fail_current(e)
+                ai_response = "Вибачте, не вдалося згенерувати відповідь на ваше повідомлення."
+            else:
+                rows.append(agent_message_row(chat_message, ai_response))
+                if cache_scope and usage.succeeded:
+                    await asyncio.to_thread(
+                        semantic_cache.store, cache_scope, chat_message.text, ai_response)
+
+    elif chat_message.message_type == MessageType.IMAGE:
+        ai_response = IMAGE_RESPONSE
+        rows.append(agent_message_row(chat_message, ai_response))
+
+    saved_rows = rows
+    try:
+        persist_messages(chat_manager, rows)
+    except Exception as e:
+        # Відповідь однаково повертається, а витрачені токени - обліковуються
+        logger.error(f"Не вдалося зберегти повідомлення чату: {e}")
+        fail_current(e, persist_failed=True)
+        saved_rows = []
+    if saved_rows and CHAT_MEMORY_ENABLED:
+        get_chat_memory().remember(saved_rows)
+    if usage is not None:
+        # Облік прив'язується до відповіді агента (або до повідомлення, якщо відповіді немає)
+        record_usage(usage_manager, usage_row(
+            chat_message, rows[-1]["id"], usage, len(message_to_llm),
+            int((time.perf_counter() - started) * 1000)))
+    return ai_response, saved_rows
@@ -0,0 +1,96 @@
+"""
+Локальні ембеддинги тексту без зовнішніх API. За замовчуванням -
+all-MiniLM-L6-v2 (ONNX, 384 виміри) з chromadb, яка вже є залежністю
+crewai; модель (~80 МБ) завантажується один раз у ~/.cache/chroma.
+Якщо модель недоступна (немає мережі) або EMBEDDING_MODEL=hashing -
+хешовані символьні n-грами: без завантажень, ловлять повтори і дрібні
+перефразування, але не синоніми.
+
+Вектори нормовані (L2), тож косинусна подібність - скалярний добуток.
+"""
+import logging
+import os
+import re
+import threading
+import zlib
+from dataclasses import dataclass
+from typing import Callable, Optional, Sequence
+
+import numpy as np
+
+from backend.core.tracing import span
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "minilm").lower()
+HASHING_DIMENSIONS = 1024
+HASHING_NGRAM = 3
+WORD_PATTERN = re.compile(r"\w+")
+
+
+def normalize_text(text: str) -> str:
+    """Нижній регістр, лише слова через один пробіл (без пунктуації)"""
+    return " ".join(WORD_PATTERN.findall(text.lower()))
+
+
+def _unit_rows(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (vectors / norms).astype(np.float32)
+
+
+def hashing_embed(texts: Sequence[str]) -> np.ndarray:
+    """Символьні триграми і слова, хешовані в HASHING_DIMENSIONS вимірів зі знаком"""
+    vectors = np.zeros((len(texts), HASHING_DIMENSIONS), dtype=np.float32)
+    for row, text in enumerate(texts):
+        normalized = normalize_text(text)
+        padded = f" {normalized} "
+        features = [padded[i:i + HASHING_NGRAM] for i in range(len(padded) - HASHING_NGRAM + 1)]
+        features.extend(normalized.split())
+        for feature in features:
+            digest = zlib.crc32(feature.encode("utf-8"))
+            vectors[row, digest % HASHING_DIMENSIONS] += 1.0 if digest & 0x80000000 else -1.0
+    return _unit_rows(vectors)
+
+
+@dataclass(frozen=True)
+class Embedder:
+    name: str
+    encode: Callable[[Sequence[str]], np.ndarray]
+
+
+def _load_embedder(name: str) -> Embedder:
+    if name == "minilm":
+        try:
+            from chromadb.utils.embedding_functions import ONNXMiniLM_L6_V2
+            model = ONNXMiniLM_L6_V2()
+            # Завантаження і ініціалізація моделі тут, а не на першому запиті користувача
+            model(["warmup"])
+            return Embedder(model.MODEL_NAME,
+                            lambda texts: _unit_rows(np.asarray(model(list(texts)), dtype=np.float32)))
+        except Exception as e:
+            logger.warning(f"Embedding model unavailable, falling back to hashing embeddings: {e}")
+    elif name != "hashing":
+        logger.warning(f"Unknown EMBEDDING_MODEL '{name}', using hashing embeddings")
+    return Embedder("hashing", hashing_embed)
+
+
+_embedder: Optional[Embedder] = None
+_embedder_lock = threading.Lock()
+
+
+def get_embedder() -> Embedder:
+    """Модель обирається один раз на процес: вектори різних моделей несумісні"""
+    global _embedder
+    if _embedder is None:
+        with _embedder_lock:
+            if _embedder is None:
+                _embedder = _load_embedder(EMBEDDING_MODEL)
+    return _embedder
+
+
+def embed(texts: Sequence[str]) -> np.ndarray:
+    """Матриця (len(texts), виміри) з нормованими рядками"""
+    embedder = get_embedder()
+    with span("embeddings.encode", kind="embedding", model=embedder.name, texts=len(texts)):
+        return embedder.encode(texts)
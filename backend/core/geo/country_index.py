@@ -0,0 +1,309 @@
+"""
+Індекс полігонів країн для точної класифікації state vectors.
+
+Дані: Natural Earth 1:110m admin 0 countries (public domain),
+data/countries.json - кільця у форматі [lat, lon]. Полігони покривають
+лише сушу і спрощені до ~10 км, тому точка поза всіма полігонами
+належить країні з найближчим берегом у межах COASTAL_BUFFER_NM
+(територіальні води, заходи на посадку над морем). Малі держави, яких
+немає в 1:110m (Сінгапур, Гонконг, Бахрейн, Мальта), - наближені
+полігони з data/small_countries.json; вони перевіряються першими.
+"""
+import json
+import os
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from backend.core.geo.spatial_index import BBox, SpatialGridIndex, points_from_states
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+DATA_PATH = os.path.join(DATA_DIR, "countries.json")
+SMALL_COUNTRIES_PATH = os.path.join(DATA_DIR, "small_countries.json")
+
+# Розмір комірки грід-індексу кандидатів (градуси)
+INDEX_CELL_SIZE = 5.0
+# Максимум елементів у матриці точки x ребра за один крок
+MAX_CHUNK_ELEMENTS = 2_000_000
+# Територіальні води: 12 морських миль = 0.2 градуса широти
+COASTAL_BUFFER_NM = 12.0
+COASTAL_BUFFER_DEG = COASTAL_BUFFER_NM / 60.0
+
+COUNTRY_ALIASES = {
+    'usa': 'united states of america',
+    'us': 'united states of america',
+    'united states': 'united states of america',
+    'america': 'united states of america',
+    'uk': 'united kingdom',
+    'great britain': 'united kingdom',
+    'britain': 'united kingdom',
+    'england': 'united kingdom',
+    'czech republic': 'czechia',
+    'bosnia and herzegovina': 'bosnia and herz.',
+    'bosnia': 'bosnia and herz.',
+    'macedonia': 'north macedonia',
+    'korea': 'south korea',
+    'republic of korea': 'south korea',
+    'holland': 'netherlands',
+    'ivory coast': "côte d'ivoire",
+    'swaziland': 'eswatini',
+    'burma': 'myanmar',
+    'drc': 'dem. rep. congo',
+    'democratic republic of the congo': 'dem. rep. congo',
+    'central african republic': 'central african rep.',
+    'dominican republic': 'dominican rep.',
+    'south sudan': 's. sudan',
+    'western sahara': 'w. sahara',
+    'uae': 'united arab emirates',
+    'turkiye': 'turkey',
+    'russian federation': 'russia',
+}
+
+
+@dataclass
+class Country:
+    """Полігон країни з передобчисленими ребрами для point-in-polygon"""
+    name: str
+    iso_a3: str
+    continent: str
+    bbox: BBox  # з буфером; (min_lat, max_lat, min_lon, max_lon); min_lon > max_lon - через антимеридіан
+    ring_bboxes: List[BBox] = field(repr=False)  # з буфером
+    edges: np.ndarray = field(repr=False)  # (n, 4): lat1, lon1, lat2, lon2
+
+
+def _ring_edges(ring: List[List[float]]) -> np.ndarray:
+    points = np.asarray(ring, dtype=float)
+    return np.hstack([points, np.roll(points, -1, axis=0)])
+
+
+def _country_bbox(ring_bboxes: List[BBox]) -> BBox:
+    """
+    Мінімальний bbox з урахуванням антимеридіану: довготний інтервал -
+    доповнення до найбільшого проміжку між кільцями на колі.
+    """
+    min_lat = min(b[0] for b in ring_bboxes)
+    max_lat = max(b[1] for b in ring_bboxes)
+
+    intervals = sorted((b[2], b[3]) for b in ring_bboxes)
+    merged = [list(intervals[0])]
+    for start, end in intervals[1:]:
+        if start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+
+    west, east = merged[0][0], merged[-1][1]
+    largest_gap = merged[0][0] + 360.0 - merged[-1][1]
+    for previous, following in zip(merged, merged[1:]):
+        gap = following[0] - previous[1]
+        if gap > largest_gap:
+            largest_gap = gap
+            west, east = following[0], previous[1]
+    return min_lat, max_lat, west, east
+
+
+def points_in_edges(edges: np.ndarray, lats: np.ndarray, lons: np.ndarray) -> np.ndarray:
+    """Векторний even-odd тест: які точки лежать усередині набору кілець"""
+    if not len(lats):
+        return np.zeros(0, dtype=bool)
+    lat1, lon1, lat2, lon2 = (edges[:, i] for i in range(4))
+    step = max(1, MAX_CHUNK_ELEMENTS // max(len(edges), 1))
+    inside = np.empty(len(lats), dtype=bool)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        slope = (lon2 - lon1) / (lat2 - lat1)
+        for start in range(0, len(lats), step):
+            p_lat = lats[start:start + step, None]
+            p_lon = lons[start:start + step, None]
+            spans = (lat1 > p_lat) != (lat2 > p_lat)
+            crossing = spans & (p_lon < lon1 + (p_lat - lat1) * slope)
+            inside[start:start + step] = crossing.sum(axis=1) % 2 == 1
+    return inside
+
+
+def _buffered_bbox(points: np.ndarray, buffer: float) -> BBox:
+    """bbox кільця, розширений на buffer градусів (за довготою - з поправкою на широту)"""
+    min_lat, max_lat = float(points[:, 0].min()), float(points[:, 0].max())
+    lon_buffer = buffer / max(float(np.cos(np.radians(max(abs(min_lat), abs(max_lat))))), 0.1)
+    return (max(min_lat - buffer, -90.0), min(max_lat + buffer, 90.0),
+            max(float(points[:, 1].min()) - lon_buffer, -180.0),
+            min(float(points[:, 1].max()) + lon_buffer, 180.0))
+
+
+def edges_distance(edges: np.ndarray, lats: np.ndarray, lons: np.ndarray) -> np.ndarray:
+    """
+    Відстань (градуси широти) від кожної точки до найближчого ребра у
+    локальній рівнопроміжній проєкції - для буфера в кілька десятків км
+    похибка нехтовна
+    """
+    if not len(lats):
+        return np.zeros(0)
+    lat1, lon1, lat2, lon2 = (edges[:, i] for i in range(4))
+    step = max(1, MAX_CHUNK_ELEMENTS // max(len(edges), 1))
+    distance = np.empty(len(lats))
+
+    for start in range(0, len(lats), step):
+        p_lat = lats[start:start + step, None]
+        p_lon = lons[start:start + step, None]
+        scale = np.cos(np.radians(p_lat))
+        edge_x, edge_y = (lon2 - lon1) * scale, lat2 - lat1
+        point_x, point_y = (p_lon - lon1) * scale, p_lat - lat1
+        length = edge_x ** 2 + edge_y ** 2
+        with np.errstate(divide="ignore", invalid="ignore"):
+            t = np.clip(np.where(length > 0, (point_x * edge_x + point_y * edge_y) / length, 0.0),
+                        0.0, 1.0)
+        distance[start:start + step] = np.hypot(point_x - t * edge_x, point_y - t * edge_y).min(axis=1)
+    return distance
+
+
+class CountryPolygonIndex:
+    """
+    Полігони всіх країн + грубий грід-індекс (комірка -> кандидати),
+    що заміняє R-tree для відбору кандидатів перед point-in-polygon.
+    """
+
+    def __init__(self, countries: List[Country], buffer: float = COASTAL_BUFFER_DEG):
+        self.countries = countries
+        self.buffer = buffer
+        self.grid = SpatialGridIndex(INDEX_CELL_SIZE)
+        self._by_key: Dict[str, int] = {}
+        self._candidates: Dict[int, List[int]] = {}
+
+        for position, country in enumerate(countries):
+            self._by_key[country.name.lower()] = position
+            if country.iso_a3 and country.iso_a3 != "-99":
+                self._by_key[country.iso_a3.lower()] = position
+            for ring_bbox in country.ring_bboxes:
+                row_lo, col_lo = self.grid.cell_of(ring_bbox[0], ring_bbox[2])
+                row_hi, col_hi = self.grid.cell_of(ring_bbox[1], min(ring_bbox[3], 179.999))
+                for row in range(row_lo, row_hi + 1):
+                    for col in range(col_lo, col_hi + 1):
+                        cell_id = int(self.grid.cell_id(row, col))
+                        candidates = self._candidates.setdefault(cell_id, [])
+                        if position not in candidates:
+                            candidates.append(position)
+
+    @classmethod
+    def load(cls, paths: Tuple[str, ...] = (SMALL_COUNTRIES_PATH, DATA_PATH),
+             buffer: float = COASTAL_BUFFER_DEG) -> "CountryPolygonIndex":
+        """Країни з кількох файлів; при перетині полігонів перемагає раніший файл"""
+        raw = []
+        for path in paths:
+            with open(path, encoding="utf-8") as f:
+                raw.extend(json.load(f))
+
+        countries = []
+        for item in raw:
+            ring_bboxes = [_buffered_bbox(np.asarray(ring, dtype=float), buffer)
+                           for ring in item["rings"]]
+            countries.append(Country(
+                name=item["name"],
+                iso_a3=item["iso_a3"],
+                continent=item["continent"],
+                bbox=_country_bbox(ring_bboxes),
+                ring_bboxes=ring_bboxes,
+                edges=np.vstack([_ring_edges(ring) for ring in item["rings"]]),
+            ))
+        return cls(countries, buffer)
+
+    @property
+    def names(self) -> List[str]:
+        return [country.name for country in self.countries]
+
+    def find(self, country_name: str) -> Optional[Country]:
+        """Пошук за назвою, ISO A3 кодом або псевдонімом, потім часткова відповідність"""
+        key = country_name.lower().strip()
+        if not key:
+            return None
+        key = COUNTRY_ALIASES.get(key, key)
+        if key in self._by_key:
+            return self.countries[self._by_key[key]]
+
+        # Короткі ключі ("ua") не шукаємо як підрядок - інакше "ua" -> Papua New Guinea
+        if len(key) <= 3:
+            return None
+        for name, position in self._by_key.items():
+            if len(name) > 3 and (key in name or name in key):
+                return self.countries[position]
+        return None
+
+    def classify(self, lats, lons) -> np.ndarray:
+        """
+        Повертає для кожної точки індекс країни в self.countries або -1.
+        Кандидати відбираються через грід, тож кожна точка перевіряється
+        лише з кількома полігонами. Спершу - попадання в полігон (за
+        порядком країн), потім для решти - найближчий берег у межах буфера.
+        """
+        lats = np.asarray(lats, dtype=float)
+        lons = np.asarray(lons, dtype=float)
+        result = np.full(len(lats), -1, dtype=np.int64)
+        if not len(lats):
+            return result
+
+        cells = self.grid.locate(lats, lons)
+        unique_cells, inverse = np.unique(cells, return_inverse=True)
+        order = np.argsort(inverse, kind="stable")
+        bounds = np.searchsorted(inverse[order], np.arange(len(unique_cells) + 1))
+
+        per_country: Dict[int, List[np.ndarray]] = {}
+        for cell_position, cell_id in enumerate(unique_cells):
+            members = order[bounds[cell_position]:bounds[cell_position + 1]]
+            for position in self._candidates.get(int(cell_id), []):
+                per_country.setdefault(position, []).append(members)
+        per_country_members = {position: np.concatenate(groups)
+                               for position, groups in sorted(per_country.items())}
+
+        for position, members in per_country_members.items():
+            members = members[result[members] == -1]
+            inside = points_in_edges(self.countries[position].edges,
+                                     lats[members], lons[members])
+            result[members[inside]] = position
+
+        if self.buffer > 0:
+            nearest = np.full(len(lats), self.buffer)
+            coastal = np.full(len(lats), -1, dtype=np.int64)
+            for position, members in per_country_members.items():
+                members = members[result[members] == -1]
+                distance = edges_distance(self.countries[position].edges,
+                                          lats[members], lons[members])
+                closer = distance <= nearest[members]
+                nearest[members[closer]] = distance[closer]
+                coastal[members[closer]] = position
+            result = np.where(result == -1, coastal, result)
+        return result
+
+    def contains(self, country: Country, lats, lons) -> np.ndarray:
+        """Маска точок, які classify віднесе до цієї країни"""
+        return self.classify(lats, lons) == self._by_key[country.name.lower()]
+
+    def filter_states(self, country: Country, states: Iterable) -> List:
+        """Залишає лише state vectors, що знаходяться над територією країни"""
+        located = [state for state in states
+                   if state.latitude is not None and state.longitude is not None]
+        lats, lons = points_from_states(located)
+        mask = self.contains(country, lats, lons)
+        return [state for state, inside in zip(located, mask) if inside]
+
+    def group_states(self, states: Iterable) -> Dict[str, List]:
+        """Розподіляє state vectors за країнами за один векторний прохід"""
+        located = [state for state in states
+                   if state.latitude is not None and state.longitude is not None]
+        lats, lons = points_from_states(located)
+        groups: Dict[str, List] = {}
+        for state, position in zip(located, self.classify(lats, lons)):
+            if position >= 0:
+                groups.setdefault(self.countries[position].name, []).append(state)
+        return groups
+
+
+@lru_cache(maxsize=1)
+def get_country_index() -> CountryPolygonIndex:
+    return CountryPolygonIndex.load()
+
+
+def country_bounds(country_name: str) -> Optional[Tuple[float, float, float, float]]:
+    """bbox полігону країни (min_lat, max_lat, min_lon, max_lon) або None"""
+    country = get_country_index().find(country_name)
+    return country.bbox if country else None
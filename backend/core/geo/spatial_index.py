@@ -0,0 +1,207 @@
+import math
+from typing import Iterable, List, Optional, Tuple
+
+import numpy as np
+
+# bbox у форматі проєкту: (min_lat, max_lat, min_lon, max_lon)
+BBox = Tuple[float, float, float, float]
+Cell = Tuple[int, int]
+
+
+def normalize_lon(lon):
+    """Приводить довготу до діапазону [-180, 180)"""
+    return (np.asarray(lon, dtype=float) + 180.0) % 360.0 - 180.0
+
+
+def split_antimeridian(bbox: BBox) -> List[BBox]:
+    """
+    Розбиває bbox, що перетинає антимеридіан (min_lon > max_lon), на два.
+
+    Args:
+        bbox (BBox): (min_lat, max_lat, min_lon, max_lon)
+
+    Returns:
+        List[BBox]: Один або два bbox без перетину ±180°
+    """
+    min_lat, max_lat, min_lon, max_lon = bbox
+    if min_lon <= max_lon:
+        return [bbox]
+    return [(min_lat, max_lat, min_lon, 180.0), (min_lat, max_lat, -180.0, max_lon)]
+
+
+def bbox_lon_span(bbox: BBox) -> float:
+    """Ширина bbox за довготою з урахуванням антимеридіану"""
+    min_lon, max_lon = bbox[2], bbox[3]
+    return (max_lon - min_lon) % 360.0 or 360.0
+
+
+def union_bbox(bboxes: Iterable[BBox], max_lon_span: float = 180.0) -> Optional[BBox]:
+    """
+    Спільний bbox для кількох областей. Повертає None, якщо області
+    перетинають антимеридіан або разом ширші за max_lon_span - тоді
+    дешевше взяти глобальний знімок.
+    """
+    bboxes = list(bboxes)
+    if not bboxes or any(b[2] > b[3] for b in bboxes):
+        return None
+    union = (min(b[0] for b in bboxes), max(b[1] for b in bboxes),
+             min(b[2] for b in bboxes), max(b[3] for b in bboxes))
+    if union[3] - union[2] > max_lon_span:
+        return None
+    return union
+
+
+def points_from_states(states: Iterable) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Витягує координати з state vectors у два масиви.
+    Пропускає лише відсутні координати (0.0 - валідне значення).
+    """
+    coords = [
+        (state.latitude, state.longitude) for state in states
+        if state.latitude is not None and state.longitude is not None
+    ]
+    if not coords:
+        return np.empty(0), np.empty(0)
+    points = np.asarray(coords, dtype=float)
+    return points[:, 0], points[:, 1]
+
+
+class SpatialGridIndex:
+    """
+    Глобальна рівнокутова сітка lat/lon з налаштовуваним розміром комірки.
+
+    Зберігає лише непорожні комірки (розріджено), тому тонка сітка на
+    глобальному знімку не потребує пам'яті на весь світ. Top-k рахується
+    через argpartition без повного сортування.
+    """
+
+    def __init__(self, cell_size_deg: float = 1.0):
+        if cell_size_deg <= 0:
+            raise ValueError("cell_size_deg must be positive")
+        self.cell_size = float(cell_size_deg)
+        self.lat_cells = math.ceil(180.0 / self.cell_size)
+        self.lon_cells = math.ceil(360.0 / self.cell_size)
+        self.cell_ids = np.empty(0, dtype=np.int64)
+        self.counts = np.empty(0, dtype=np.int64)
+
+    @classmethod
+    def from_states(cls, states: Iterable, cell_size_deg: float = 1.0) -> "SpatialGridIndex":
+        index = cls(cell_size_deg)
+        index.add_points(*points_from_states(states))
+        return index
+
+    @property
+    def total(self) -> int:
+        return int(self.counts.sum())
+
+    def __len__(self) -> int:
+        return len(self.cell_ids)
+
+    def cell_id(self, row, col):
+        return np.asarray(row, dtype=np.int64) * self.lon_cells + np.asarray(col, dtype=np.int64)
+
+    def cell_rows_cols(self, cell_ids) -> Tuple[np.ndarray, np.ndarray]:
+        return np.divmod(np.asarray(cell_ids, dtype=np.int64), self.lon_cells)
+
+    def locate(self, lats, lons) -> np.ndarray:
+        """Векторно повертає ідентифікатори комірок для масивів координат"""
+        lats = np.asarray(lats, dtype=float)
+        lons = normalize_lon(lons)
+        rows = np.clip(np.floor((lats + 90.0) / self.cell_size), 0, self.lat_cells - 1)
+        cols = np.floor((lons + 180.0) / self.cell_size) % self.lon_cells
+        return self.cell_id(rows.astype(np.int64), cols.astype(np.int64))
+
+    def cell_of(self, lat: float, lon: float) -> Cell:
+        row, col = self.cell_rows_cols(self.locate([lat], [lon]))
+        return int(row[0]), int(col[0])
+
+    def cell_bounds(self, cell: Cell) -> BBox:
+        """bbox комірки у форматі (min_lat, max_lat, min_lon, max_lon)"""
+        row, col = cell
+        min_lat = -90.0 + row * self.cell_size
+        min_lon = -180.0 + col * self.cell_size
+        return (min_lat, min(min_lat + self.cell_size, 90.0),
+                min_lon, min(min_lon + self.cell_size, 180.0))
+
+    def cell_center(self, cell: Cell) -> Tuple[float, float]:
+        min_lat, max_lat, min_lon, max_lon = self.cell_bounds(cell)
+        return (min_lat + max_lat) / 2, (min_lon + max_lon) / 2
+
+    def add_points(self, lats, lons) -> None:
+        """Додає точки до індексу, об'єднуючи лічильники однакових комірок"""
+        if len(lats) == 0:
+            return
+        ids = np.concatenate([self.cell_ids, self.locate(lats, lons)])
+        weights = np.concatenate([self.counts, np.ones(len(lats), dtype=np.int64)])
+        self.cell_ids, inverse = np.unique(ids, return_inverse=True)
+        self.counts = np.bincount(inverse, weights=weights).astype(np.int64)
+
+    def count(self, cell: Cell) -> int:
+        cell_id = int(self.cell_id(*cell))
+        position = np.searchsorted(self.cell_ids, cell_id)
+        if position < len(self.cell_ids) and self.cell_ids[position] == cell_id:
+            return int(self.counts[position])
+        return 0
+
+    def top_k(self, k: int = 5) -> List[Tuple[Cell, int]]:
+        """k найщільніших комірок за O(n + k log k)"""
+        if not len(self.counts) or k <= 0:
+            return []
+        k = min(k, len(self.counts))
+        top = np.argpartition(self.counts, -k)[-k:]
+        top = top[np.argsort(self.counts[top])[::-1]]
+        rows, cols = self.cell_rows_cols(self.cell_ids[top])
+        return [((int(r), int(c)), int(n)) for r, c, n in zip(rows, cols, self.counts[top])]
+
+    def neighbours(self, cell: Cell, ring: int = 1) -> List[Cell]:
+        """
+        Сусідні комірки в радіусі ring. Довгота замикається через ±180°,
+        широта обрізається на полюсах.
+        """
+        row, col = cell
+        result = []
+        for d_row in range(-ring, ring + 1):
+            n_row = row + d_row
+            if n_row < 0 or n_row >= self.lat_cells:
+                continue
+            for d_col in range(-ring, ring + 1):
+                if d_row == 0 and d_col == 0:
+                    continue
+                n_cell = (n_row, (col + d_col) % self.lon_cells)
+                if n_cell not in result:
+                    result.append(n_cell)
+        return result
+
+    def neighbourhood_count(self, cell: Cell, ring: int = 1) -> int:
+        return self.count(cell) + sum(self.count(n) for n in self.neighbours(cell, ring))
+
+    def _bbox_mask(self, bbox: BBox) -> np.ndarray:
+        rows, cols = self.cell_rows_cols(self.cell_ids)
+        mask = np.zeros(len(self.cell_ids), dtype=bool)
+        for min_lat, max_lat, min_lon, max_lon in split_antimeridian(bbox):
+            row_lo, col_lo = self.cell_of(min_lat, min_lon)
+            row_hi, _ = self.cell_of(max_lat, min_lon)
+            col_hi = self.lon_cells - 1 if max_lon >= 180.0 else self.cell_of(min_lat, max_lon)[1]
+            mask |= (rows >= row_lo) & (rows <= row_hi) & (cols >= col_lo) & (cols <= col_hi)
+        return mask
+
+    def count_in_bbox(self, bbox: BBox) -> int:
+        """Кількість точок у комірках, що перетинають bbox (безпечно для антимеридіану)"""
+        if not len(self.cell_ids):
+            return 0
+        return int(self.counts[self._bbox_mask(bbox)].sum())
+
+    def cells_in_bbox(self, bbox: BBox) -> List[Tuple[Cell, int]]:
+        if not len(self.cell_ids):
+            return []
+        mask = self._bbox_mask(bbox)
+        rows, cols = self.cell_rows_cols(self.cell_ids[mask])
+        return [((int(r), int(c)), int(n)) for r, c, n in zip(rows, cols, self.counts[mask])]
+
+
+def default_cell_size(bounds: Optional[BBox], cells_per_side: int = 10) -> float:
+    """Розмір комірки, що дає приблизно cells_per_side комірок по довшій стороні bbox"""
+    if not bounds:
+        return 1.0
+    span = max(bounds[1] - bounds[0], bbox_lon_span(bounds))
+    return max(span / cells_per_side, 0.01)
@@ -0,0 +1,108 @@
+import logging
+import os
+import threading
+from datetime import datetime
+from typing import List, Optional
+
+from backend.clients.open_sky_client import OpenSkyClient
+from backend.core.agents.sky_analyst_agent import (
+    get_country_bounds,
+    get_country_states,
+    analyze_aircraft_distribution,
+    get_traffic_density_analysis,
+)
+from backend.core.geo.country_index import get_country_index
+from backend.core.managers.airspace_history_manager import AirspaceHistoryManagerContext
+from backend.core.realtime import get_chat_hub
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_INTERVAL_SECONDS = 60
+PRUNE_EVERY_RUNS = 60
+
+
+class AirspaceRecorder:
+    """Періодично знімає агрегати авіапростору країн і пише їх у airspace_snapshots"""
+
+    def __init__(self, countries: List[str], interval: int = DEFAULT_INTERVAL_SECONDS,
+                 client: Optional[OpenSkyClient] = None):
+        self.countries = countries
+        self.interval = interval
+        self.client = client or OpenSkyClient()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._runs = 0
+
+    def record_country(self, country: str) -> bool:
+        """Робить один знімок країни; повертає False якщо країну не знайдено"""
+        bounds = get_country_bounds(country)
+        if not bounds:
+            logger.warning(f"Airspace recorder: unknown country {country}")
+            return False
+        # Канонічна назва, щоб запис і читання трендів збігались за ключем
+        country = get_country_index().find(country).name
+
+        states = get_country_states(self.client, country)
+        distribution = analyze_aircraft_distribution(states)
+        density = get_traffic_density_analysis(states, bounds) if states else None
+
+        recorded_at = datetime.utcnow()
+        with AirspaceHistoryManagerContext() as history_manager:
+            history_manager.record_snapshot(country, distribution, density, recorded_at)
+
+        # Живе оновлення для підписників WebSocket на топік "airspace"
+        get_chat_hub().publish({
+            "type": "airspace",
+            "country": country,
+            "total_aircraft": distribution.get('total_aircraft', 0),
+            "active_flights": distribution.get('active_flights', 0),
+            "max_density": (density or {}).get('max_density', 0),
+            "recorded_at": recorded_at.isoformat(),
+        }, topic="airspace")
+        return True
+
+    def run_once(self) -> None:
+        for country in self.countries:
+            try:
+                self.record_country(country)
+            except Exception as e:
+                logger.error(f"Airspace recorder failed for {country}: {e}")
+
+        self._runs += 1
+        if self._runs % PRUNE_EVERY_RUNS == 0:
+            try:
+                with AirspaceHistoryManagerContext() as history_manager:
+                    history_manager.prune()
+            except Exception as e:
+                logger.error(f"Airspace recorder prune failed: {e}")
+
+    def _loop(self) -> None:
+        while not self._stop.is_set():
+            self.run_once()
+            self._stop.wait(self.interval)
+
+    def start(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="airspace-recorder",
+                                        daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=self.interval)
+
+
+def create_recorder_from_env() -> Optional[AirspaceRecorder]:
+    """
+    Створює рекордер з AIRSPACE_RECORDER_COUNTRIES (через кому) та
+    AIRSPACE_RECORDER_INTERVAL (секунди). Без списку країн повертає None.
+    """
+    countries = os.getenv("AIRSPACE_RECORDER_COUNTRIES", "")
+    countries = [country.strip() for country in countries.split(",") if country.strip()]
+    if not countries:
+        return None
+    interval = int(os.getenv("AIRSPACE_RECORDER_INTERVAL", DEFAULT_INTERVAL_SECONDS))
+    return AirspaceRecorder(countries, interval=interval)
@@ -0,0 +1,165 @@
+"""
+Фонова компакція chat_history: повідомлення, старші за
+CHAT_ARCHIVE_AFTER_DAYS (крім останніх CHAT_HOT_MIN_MESSAGES кожного
+чату), підсумовуються LLM у chat_summaries і переносяться в
+chat_history_archive. Гаряча таблиця лишається малою, а контекст агента
+і /get_chat читають лише її та підсумок - час запитів не росте з віком
+акаунта.
+
+Підсумок оновлюється інкрементально: попередній підсумок + наступна
+пачка повідомлень. LLM-виклик іде поза транзакцією; перенесення і новий
+підсумок пишуться однією транзакцією з перевіркою версії підсумку, тож
+компакцію можуть запускати кілька процесів одночасно.
+"""
+import logging
+import os
+import random
+import threading
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from backend.core.agents.llm_settings import LLMSettings, create_chat_model
+from backend.core.chat_memory import RECENT_MESSAGES, plain_text
+from backend.core.managers.chat_manager import ChatManagerContext
+from backend.core.tracing import start_trace
+from backend.models.chat_history import ChatHistory
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_INTERVAL_SECONDS = 3600
+DEFAULT_HOT_MIN_MESSAGES = 50
+MAX_START_DELAY_SECONDS = 60
+BATCH_MESSAGES = 100
+MAX_CHATS_PER_RUN = 500
+SUMMARY_MESSAGE_CHARS = 1000
+SUMMARY_MAX_CHARS = 4000
+SUMMARY_MAX_TOKENS = 1000
+SUMMARY_TEMPERATURE = 0.2
+
+SUMMARY_PROMPT = """Ти ведеш стислий підсумок довгої розмови користувача з асистентом.
+Онови підсумок з урахуванням нових повідомлень. Збережи факти про користувача,
+його вподобання, домовленості, відкриті питання і важливі відповіді асистента.
+Пиши українською, стисло, без вступу, не довше {max_chars} символів.
+
+Поточний підсумок:
+{summary}
+
+Нові повідомлення:
+{messages}
+
+Оновлений підсумок:"""
+
+
+class ChatCompactor:
+    """Періодично архівує старі повідомлення чатів, оновлюючи їхні підсумки"""
+
+    def __init__(self, archive_after: timedelta, hot_min_messages: int = DEFAULT_HOT_MIN_MESSAGES,
+                 interval: int = DEFAULT_INTERVAL_SECONDS,
+                 llm_settings: Optional[LLMSettings] = None):
+        self.archive_after = archive_after
+        # Останні повідомлення для контексту агента завжди лишаються в гарячому шарі
+        self.hot_min_messages = max(hot_min_messages, RECENT_MESSAGES)
+        self.interval = interval
+        self.llm_settings = llm_settings or LLMSettings(
+            model=os.getenv("CHAT_SUMMARY_MODEL") or None,
+            temperature=SUMMARY_TEMPERATURE,
+            max_tokens=SUMMARY_MAX_TOKENS,
+        )
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def summarize(self, summary: Optional[str], messages: List[ChatHistory]) -> str:
+        transcript = "\n".join(
+            f"{message.sender}: "
+            f"{plain_text(message.message_text, SUMMARY_MESSAGE_CHARS) or '[зображення]'}"
+            for message in messages
+        )
+        prompt = SUMMARY_PROMPT.format(max_chars=SUMMARY_MAX_CHARS, summary=summary or "(порожній)",
+                                       messages=transcript)
+        text = str(create_chat_model(self.llm_settings).invoke(prompt).content).strip()
+        if not text:
+            raise ValueError("LLM returned an empty summary")
+        return text[:SUMMARY_MAX_CHARS]
+
+    def compact_chat(self, user_id: str, agent_id: str, cutoff: datetime) -> int:
+        """Архівує всі старі повідомлення чату пачками; повертає кількість перенесених"""
+        archived = 0
+        while not self._stop.is_set():
+            with ChatManagerContext() as chat_manager:
+                summary = chat_manager.get_chat_summary(user_id, agent_id)
+                messages = chat_manager.get_compactable_messages(
+                    user_id, agent_id, cutoff, self.hot_min_messages, BATCH_MESSAGES)
+                version = summary.version if summary else 0
+                previous_summary = summary.summary if summary else None
+            if not messages:
+                break
+
+            new_summary = self.summarize(previous_summary, messages)
+            with ChatManagerContext() as chat_manager:
+                if not chat_manager.archive_messages(
+                        user_id, agent_id, [message.id for message in messages], new_summary,
+                        messages[-1].was_sent, expected_version=version):
+                    logger.info(f"Chat {user_id}/{agent_id} was compacted concurrently, skipping")
+                    break
+            archived += len(messages)
+        return archived
+
+    def run_once(self) -> int:
+        cutoff = datetime.utcnow() - self.archive_after
+        try:
+            with ChatManagerContext() as chat_manager:
+                chats = chat_manager.get_chats_to_compact(cutoff, self.hot_min_messages,
+                                                          MAX_CHATS_PER_RUN)
+        except Exception as e:
+            logger.error(f"Chat compaction failed to list chats: {e}")
+            return 0
+
+        total = 0
+        for user_id, agent_id in chats:
+            if self._stop.is_set():
+                break
+            try:
+                with start_trace("chat.compact", kind="job", user_id=str(user_id),
+                                 agent_id=str(agent_id)) as root:
+                    archived = self.compact_chat(user_id, agent_id, cutoff)
+                    root.set(archived_messages=archived)
+                total += archived
+            except Exception as e:
+                logger.error(f"Chat compaction failed for {user_id}/{agent_id}: {e}")
+        if total:
+            logger.info(f"Chat compaction archived {total} messages in {len(chats)} chats")
+        return total
+
+    def _loop(self) -> None:
+        # Воркери uvicorn стартують одночасно - розносимо їхні прогони в часі
+        self._stop.wait(random.uniform(0, min(self.interval, MAX_START_DELAY_SECONDS)))
+        while not self._stop.is_set():
+            self.run_once()
+            self._stop.wait(self.interval)
+
+    def start(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="chat-compactor", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10.0) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=timeout)
+
+
+def create_compactor_from_env() -> Optional[ChatCompactor]:
+    """
+    Створює компактор з CHAT_ARCHIVE_AFTER_DAYS, CHAT_HOT_MIN_MESSAGES та
+    CHAT_COMPACTION_INTERVAL (секунди). Без CHAT_ARCHIVE_AFTER_DAYS повертає None.
+    """
+    archive_after_days = os.getenv("CHAT_ARCHIVE_AFTER_DAYS", "").strip()
+    if not archive_after_days:
+        return None
+    return ChatCompactor(
+        archive_after=timedelta(days=float(archive_after_days)),
+        hot_min_messages=int(os.getenv("CHAT_HOT_MIN_MESSAGES", DEFAULT_HOT_MIN_MESSAGES)),
+        interval=int(os.getenv("CHAT_COMPACTION_INTERVAL", DEFAULT_INTERVAL_SECONDS)),
+    )
@@ -0,0 +1,254 @@
+"""
+Фонові задачі: черга в таблиці jobs + локальний пул воркерів.
+
+Воркер забирає задачу через FOR UPDATE SKIP LOCKED, виконує її обробник у
+власному event loop і під час виконання оновлює heartbeat. Скасування
+(статус cancelling) перевіряється разом з heartbeat і зупиняє корутину
+обробника; результат такої задачі не зберігається.
+"""
+import asyncio
+import logging
+import os
+import threading
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from backend.core.agents.progress import progress_listener
+from backend.core.chat_service import handle_chat_message, serialize_message
+from backend.core.managers.agent_manager import AgentManagerContext
+from backend.core.managers.chat_manager import ChatManagerContext
+from backend.core.managers.job_manager import JobManagerContext
+from backend.core.realtime import get_chat_hub
+from backend.core.tracing import start_trace
+from backend.models.job import Job
+from backend.schemas.chat import ChatMessage
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WORKERS = 2
+DEFAULT_MAX_RUNNING_PER_USER = 1
+DEFAULT_MAX_ACTIVE_PER_USER = 5
+POLL_INTERVAL_SECONDS = 2.0
+HEARTBEAT_INTERVAL_SECONDS = 2.0
+STALE_JOB_TIMEOUT = timedelta(minutes=2)
+FINISHED_JOB_RETENTION = timedelta(days=7)
+MAINTENANCE_EVERY_POLLS = 30
+
+JobHandler = Callable[[Dict[str, Any]], Awaitable[Optional[str]]]
+JOB_HANDLERS: Dict[str, JobHandler] = {}
+
+
+def job_handler(kind: str):
+    """Реєструє обробник для типу задачі"""
+    def decorator(handler: JobHandler) -> JobHandler:
+        JOB_HANDLERS[kind] = handler
+        return handler
+    return decorator
+
+
+def serialize_job(job: Job) -> Dict[str, Any]:
+    def iso(value: Optional[datetime]) -> Optional[str]:
+        return value.isoformat() if value else None
+
+    return {
+        "id": str(job.id),
+        "kind": job.kind,
+        "status": job.status,
+        "user_id": str(job.user_id),
+        "agent_id": str(job.agent_id) if job.agent_id else None,
+        "result": job.result,
+        "error": job.error,
+        "created_at": iso(job.created_at),
+        "started_at": iso(job.started_at),
+        "finished_at": iso(job.finished_at),
+    }
+
+
+def publish_job(job: Dict[str, Any]) -> None:
+    """Надсилає стан задачі в WebSocket сесію її власника"""
+    get_chat_hub().publish({"type": "job", "job": job},
+                           user_id=job["user_id"], agent_id=job["agent_id"])
+
+
+@job_handler("chat_response")
+async def run_chat_response(job: Dict[str, Any]) -> Optional[str]:
+    """Повний цикл /send у фоні: зберегти повідомлення, отримати і зберегти відповідь агента"""
+    chat_message = ChatMessage(**job["payload"])
+    hub = get_chat_hub()
+    user_id, agent_id = str(chat_message.user_id), str(chat_message.agent_id)
+
+    def on_progress(event: Dict[str, Any]) -> None:
+        hub.publish({"type": "progress", "job_id": job["id"], **event},
+                    user_id=user_id, agent_id=agent_id)
+
+    async def on_message(message) -> None:
+        hub.publish({"type": "message", "message": serialize_message(message)},
+                    user_id=user_id, agent_id=agent_id)
+
+    with ChatManagerContext() as chat_manager, AgentManagerContext() as agent_manager:
+        with progress_listener(on_progress):
+            return await handle_chat_message(chat_message, chat_manager, agent_manager,
+                                             on_message=on_message)
+
+
+class JobWorkerPool:
+    """Потоки-воркери, що виконують задачі з таблиці jobs"""
+
+    def __init__(self, workers: int = DEFAULT_WORKERS,
+                 max_running_per_user: int = DEFAULT_MAX_RUNNING_PER_USER,
+                 max_active_per_user: int = DEFAULT_MAX_ACTIVE_PER_USER,
+                 poll_interval: float = POLL_INTERVAL_SECONDS):
+        self.workers = workers
+        self.max_running_per_user = max_running_per_user
+        self.max_active_per_user = max_active_per_user
+        self.poll_interval = poll_interval
+        self._stop = threading.Event()
+        self._wakeup = threading.Event()
+        self._threads: List[threading.Thread] = []
+
+    def notify(self) -> None:
+        """Будить воркерів одразу після постановки задачі, не чекаючи опитування"""
+        self._wakeup.set()
+
+    def enqueue(self, user_id: str, kind: str, payload: Dict[str, Any],
+                agent_id: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Ставить задачу в чергу з урахуванням ліміту користувача
+
+        Raises:
+            JobLimitExceeded: Якщо у користувача забагато незавершених задач
+        """
+        if kind not in JOB_HANDLERS:
+            raise ValueError(f"Unknown job kind: {kind}")
+        with JobManagerContext() as job_manager:
+            job = serialize_job(job_manager.create_job(
+                user_id=user_id, kind=kind, payload=payload, agent_id=agent_id,
+                max_active_per_user=self.max_active_per_user))
+        self.notify()
+        return job
+
+    def _claim(self) -> Optional[Dict[str, Any]]:
+        with JobManagerContext() as job_manager:
+            job = job_manager.claim_next_job(list(JOB_HANDLERS), self.max_running_per_user)
+            if job is None:
+                return None
+            claimed = serialize_job(job)
+            claimed["payload"] = job.payload
+            return claimed
+
+    @staticmethod
+    def _heartbeat(job_id: str) -> Optional[str]:
+        with JobManagerContext() as job_manager:
+            return job_manager.heartbeat(job_id)
+
+    @staticmethod
+    def _finish(job_id: str, status: str, result: Optional[str] = None,
+                error: Optional[str] = None) -> None:
+        with JobManagerContext() as job_manager:
+            job = job_manager.finish_job(job_id, status, result=result, error=error)
+            if job:
+                publish_job(serialize_job(job))
+
+    @staticmethod
+    async def _traced(job: Dict[str, Any]) -> Optional[str]:
+        # Траса охоплює лише обробник: heartbeat-и йдуть поза її контекстом
+        with start_trace(f"job {job['kind']}", kind="job", job_id=job["id"]):
+            return await JOB_HANDLERS[job["kind"]](job)
+
+    async def _run(self, job: Dict[str, Any]) -> None:
+        publish_job(job)
+        task = asyncio.create_task(self._traced(job))
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=HEARTBEAT_INTERVAL_SECONDS)
+            if done:
+                break
+            try:
+                if self._heartbeat(job["id"]) == "cancelling":
+                    task.cancel()
+            except Exception as e:
+                logger.warning(f"Job {job['id']} heartbeat failed: {e}")
+
+        if task.cancelled():
+            self._finish(job["id"], "cancelled")
+        elif task.exception() is not None:
+            logger.error(f"Job {job['id']} ({job['kind']}) failed: {task.exception()}")
+            self._finish(job["id"], "failed", error=str(task.exception()))
+        else:
+            self._finish(job["id"], "succeeded", result=task.result())
+
+    def _maintain(self) -> None:
+        try:
+            with JobManagerContext() as job_manager:
+                stale = job_manager.fail_stale_jobs(STALE_JOB_TIMEOUT)
+                job_manager.prune_finished_jobs(FINISHED_JOB_RETENTION)
+            if stale:
+                logger.warning(f"Marked {stale} stale jobs as failed")
+        except Exception as e:
+            logger.error(f"Job maintenance failed: {e}")
+
+    def _loop(self, index: int) -> None:
+        polls = 0
+        while not self._stop.is_set():
+            if index == 0 and polls % MAINTENANCE_EVERY_POLLS == 0:
+                self._maintain()
+            polls += 1
+
+            try:
+                job = self._claim()
+            except Exception as e:
+                logger.error(f"Job worker {index} failed to claim a job: {e}")
+                job = None
+
+            if job is None:
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+                continue
+
+            try:
+                asyncio.run(self._run(job))
+            except Exception as e:
+                logger.error(f"Job worker {index} crashed on job {job['id']}: {e}")
+                try:
+                    self._finish(job["id"], "failed", error=str(e))
+                except Exception:
+                    pass
+
+    def start(self) -> None:
+        if any(thread.is_alive() for thread in self._threads):
+            return
+        self._stop.clear()
+        self._threads = [
+            threading.Thread(target=self._loop, args=(index,), name=f"job-worker-{index}",
+                             daemon=True)
+            for index in range(self.workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        self._wakeup.set()
+        for thread in self._threads:
+            thread.join(timeout=timeout)
+
+
+_worker_pool: Optional[JobWorkerPool] = None
+_worker_pool_lock = threading.Lock()
+
+
+def get_worker_pool() -> JobWorkerPool:
+    """
+    Пул воркерів процесу. Налаштування: JOB_WORKERS, JOB_MAX_RUNNING_PER_USER,
+    JOB_MAX_ACTIVE_PER_USER.
+    """
+    global _worker_pool
+    with _worker_pool_lock:
+        if _worker_pool is None:
+            _worker_pool = JobWorkerPool(
+                workers=int(os.getenv("JOB_WORKERS", DEFAULT_WORKERS)),
+                max_running_per_user=int(os.getenv("JOB_MAX_RUNNING_PER_USER",
+                                                   DEFAULT_MAX_RUNNING_PER_USER)),
+                max_active_per_user=int(os.getenv("JOB_MAX_ACTIVE_PER_USER",
+                                                  DEFAULT_MAX_ACTIVE_PER_USER)),
+            )
+        return _worker_pool
@@ -1,19 +1,26 @@
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError
 
+from backend.core.agent_cache import AgentSnapshot, get_agent_cache
+from backend.core.agents.llm_settings import DEFAULT_TEMPERATURE, LLMSettings, get_llm_provider
 from backend.core.agents.sky_agent import OpenSkyAviationAgent
 from backend.core.agents.sky_analyst_agent import AviationAnalysisAgent
 from backend.core.agents.windy_agent import WindyWeatherAgent
 from backend.models.agents import Agent
 from backend.config.database import SessionLocal
+from backend.core.tracing import traced_methods
 from backend.core.agents.weather_agent import SmartWeatherAgent
 from backend.core.agents.generic_agent import GenericAgent
 
+LLM_SETTING_COLUMNS = {"llm_provider", "model", "temperature", "max_tokens", "timeout"}
 
+
+@traced_methods(kind="manager")
 class AgentManager:
     def __init__(self, db: Session):
         self.db = db
+        self.cache = get_agent_cache()
         self.agents = {
             "weather": SmartWeatherAgent,
             "generic": GenericAgent,
@@ -22,11 +29,15 @@ class AgentManager:
             "sky_analysis": AviationAnalysisAgent
         }
 
-    def create_agent(self, name: str, system_prompt: Optional[str] = None, agent_type: str = "Generic") -> Optional[Agent]:
+    def create_agent(self, name: str, system_prompt: Optional[str] = None, agent_type: str = "Generic",
+                     **llm_settings) -> Optional[Agent]:
         try:
-            agent = Agent(name=name, system_prompt=system_prompt, agent_type=agent_type)
+            agent = Agent(name=name, system_prompt=system_prompt, agent_type=agent_type,
+                          **self._llm_columns(llm_settings))
             self.db.add(agent)
+            self.cache.notify_change(self.db)
             self.db.commit()
+            self.cache.invalidate()
             self.db.refresh(agent)
             return agent
         except IntegrityError:
@@ -36,22 +47,32 @@ class AgentManager:
             self.db.rollback()
             raise e
 
+    def get_snapshot(self) -> AgentSnapshot:
+        """Знімок усіх агентів з кешу процесу (без запиту до БД, поки кеш актуальний)"""
+        return self.cache.snapshot(self.db)
+
     def get_agent_by_id(self, agent_id: str) -> Optional[Agent]:
-        return self.db.query(Agent).filter(Agent.id == agent_id).first()
+        """Агент з кешу; повернений об'єкт не прив'язаний до сесії, змінювати його не можна"""
+        return self.get_snapshot().by_id.get(str(agent_id))
 
     def get_agent_by_name(self, name: str) -> Optional[Agent]:
-        return self.db.query(Agent).filter(Agent.name == name).first()
+        return self.get_snapshot().by_name.get(name)
 
     def get_all_agents(self, limit: int = 100, offset: int = 0) -> List[Agent]:
-        return self.db.query(Agent).offset(offset).limit(limit).all()
+        return list(self.get_snapshot().agents[offset:offset + limit])
+
+    def _load_agent(self, agent_id: str) -> Optional[Agent]:
+        return self.db.query(Agent).filter(Agent.id == agent_id).first()
 
     def update_agent_sp(self, agent_id: str, system_prompt: str) -> Optional[Agent]:
         try:
-            agent = self.get_agent_by_id(agent_id)
+            agent = self._load_agent(agent_id)
             if not agent:
                 return None
             agent.system_prompt = system_prompt
+            self.cache.notify_change(self.db)
             self.db.commit()
+            self.cache.invalidate()
             self.db.refresh(agent)
             return agent
         except IntegrityError:
@@ -61,30 +82,65 @@ class AgentManager:
             self.db.rollback()
             raise e
 
+    @staticmethod
+    def _llm_columns(settings: Dict[str, Any]) -> Dict[str, Any]:
+        unknown = set(settings) - LLM_SETTING_COLUMNS
+        if unknown:
+            raise ValueError(f"Unknown LLM settings: {', '.join(sorted(unknown))}")
+        if settings.get("llm_provider"):
+            get_llm_provider(settings["llm_provider"])
+        if "temperature" in settings and settings["temperature"] is None:
+            # temperature - NOT NULL, тож скидання означає явне значення за замовчуванням
+            settings = {**settings, "temperature": DEFAULT_TEMPERATURE}
+        return settings
+
+    def update_agent_llm_settings(self, agent_id: str, **settings) -> Optional[Agent]:
+        """
+        Змінює налаштування LLM агента (llm_provider, model, temperature, max_tokens, timeout).
+        Передане значення None скидає колонку до значення за замовчуванням.
+        """
+        try:
+            agent = self._load_agent(agent_id)
+            if not agent:
+                return None
+            for column, value in self._llm_columns(settings).items():
+                setattr(agent, column, value)
+            self.cache.notify_change(self.db)
+            self.db.commit()
+            self.cache.invalidate()
+            self.db.refresh(agent)
+            return agent
+        except Exception as e:
+            self.db.rollback()
+            raise e
+
     def delete_agent(self, agent_id: str) -> bool:
         try:
-            agent = self.get_agent_by_id(agent_id)
+            agent = self._load_agent(agent_id)
             if not agent:
                 return False
             self.db.delete(agent)
+            self.cache.notify_change(self.db)
             self.db.commit()
+            self.cache.invalidate()
             return True
         except Exception as e:
             self.db.rollback()
             raise e
 
     def agent_exists(self, name: str) -> bool:
-        return self.db.query(Agent).filter(Agent.name == name).first() is not None
+        return name in self.get_snapshot().by_name
 
     def count_agents(self) -> int:
-        return self.db.query(Agent).count()
+        return len(self.get_snapshot().agents)
 
     def get_agent_instance(self, agent_id: str):
         db_agent = self.get_agent_by_id(agent_id)
         if not db_agent:
             return None
         if db_agent.agent_type in self.agents:
-            return self.agents[db_agent.agent_type](agent_id, db_agent.name, db_agent.system_prompt)
+            return self.agents[db_agent.agent_type](agent_id, db_agent.name, db_agent.system_prompt,
+                                                    LLMSettings.from_agent(db_agent))
         return None
 
 
@@ -93,11 +149,11 @@ def get_agent_manager() -> AgentManager:
     return AgentManager(db)
 
 
-class UserManagerContext:
+class AgentManagerContext:
     def __enter__(self) -> AgentManager:
         self.db = SessionLocal()
-        self.user_manager = AgentManager(self.db)
-        return self.user_manager
+        self.agent_manager = AgentManager(self.db)
+        return self.agent_manager
 
     def __exit__(self, exc_type, exc_val, exc_tb):
         self.db.close()
\ No newline at end of file
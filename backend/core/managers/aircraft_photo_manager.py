@@ -0,0 +1,87 @@
+from datetime import datetime
+from typing import Optional
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+from backend.models.aircraft_photo import AircraftPhoto
+from backend.config.database import SessionLocal
+from backend.core.tracing import traced_methods
+
+
+@traced_methods(kind="manager")
+class AircraftPhotoManager:
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def get_photo(self, hex_code: str) -> Optional[AircraftPhoto]:
+        return self.db.query(AircraftPhoto).filter(
+            AircraftPhoto.hex_code == hex_code.lower()
+        ).first()
+
+    def save_photo(
+            self,
+            hex_code: str,
+            has_photo: bool,
+            expires_at: datetime,
+            thumbnail_url: Optional[str] = None,
+            link: Optional[str] = None,
+            photographer: Optional[str] = None,
+            local_path: Optional[str] = None,
+            etag: Optional[str] = None,
+            last_modified: Optional[str] = None,
+    ) -> None:
+        """
+        Створює або оновлює запис кешу фото літака
+
+        Args:
+            hex_code (str): ICAO24 hex код літака
+            has_photo (bool): False - негативний кеш ("фото немає")
+            expires_at (datetime): До якого моменту запис вважається свіжим
+        """
+        values = {
+            "has_photo": has_photo,
+            "thumbnail_url": thumbnail_url,
+            "link": link,
+            "photographer": photographer,
+            "local_path": local_path,
+            "etag": etag,
+            "last_modified": last_modified,
+            "fetched_at": datetime.utcnow(),
+            "expires_at": expires_at,
+        }
+        statement = insert(AircraftPhoto.__table__).values(hex_code=hex_code.lower(), **values)
+        statement = statement.on_conflict_do_update(index_elements=["hex_code"], set_=values)
+        try:
+            self.db.execute(statement)
+            self.db.commit()
+        except Exception as e:
+            self.db.rollback()
+            raise e
+
+    def extend_photo(self, hex_code: str, expires_at: datetime) -> None:
+        """Продовжує термін запису, який ревалідація підтвердила без змін (мініатюра - 304)"""
+        try:
+            self.db.query(AircraftPhoto).filter(
+                AircraftPhoto.hex_code == hex_code.lower()
+            ).update({"expires_at": expires_at, "fetched_at": datetime.utcnow()},
+                     synchronize_session=False)
+            self.db.commit()
+        except Exception as e:
+            self.db.rollback()
+            raise e
+
+
+def get_aircraft_photo_manager() -> AircraftPhotoManager:
+    db = SessionLocal()
+    return AircraftPhotoManager(db)
+
+
+class AircraftPhotoManagerContext:
+
+    def __enter__(self) -> AircraftPhotoManager:
+        self.db = SessionLocal()
+        self.photo_manager = AircraftPhotoManager(self.db)
+        return self.photo_manager
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.db.close()
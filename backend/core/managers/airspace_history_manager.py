@@ -0,0 +1,214 @@
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+from backend.models.airspace_snapshot import AirspaceSnapshot
+from backend.config.database import SessionLocal
+from backend.core.geo.country_index import get_country_index
+from backend.core.tracing import traced_methods
+
+# Розмір часового відра для кожного рівня агрегації
+RESOLUTIONS = {
+    "1m": timedelta(minutes=1),
+    "1h": timedelta(hours=1),
+    "1d": timedelta(days=1),
+}
+
+# Скільки зберігати рядки кожного рівня
+RETENTION = {
+    "1m": timedelta(days=2),
+    "1h": timedelta(days=90),
+    "1d": timedelta(days=3650),
+}
+
+# Відносна зміна, після якої тренд вважається зростаючим/спадаючим
+TREND_THRESHOLD = 0.1
+
+
+def bucket_start(moment: datetime, resolution: str) -> datetime:
+    """Округлює момент часу вниз до початку відра вказаного рівня"""
+    if resolution == "1m":
+        return moment.replace(second=0, microsecond=0)
+    if resolution == "1h":
+        return moment.replace(minute=0, second=0, microsecond=0)
+    return moment.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def country_key(country: str) -> str:
+    """
+    Ключ країни для airspace_snapshots: канонічна назва з індексу полігонів,
+    щоб "UA", "Україна" і "Ukraine" потрапляли в ті самі відра
+    """
+    found = get_country_index().find(country)
+    return (found.name if found else country).lower().strip()
+
+
+def resolution_for_window(hours_back: int) -> str:
+    """Обирає найгрубший рівень, який ще дає кілька точок у вікні"""
+    if hours_back <= 2:
+        return "1m"
+    if hours_back <= 72:
+        return "1h"
+    return "1d"
+
+
+@traced_methods(kind="manager")
+class AirspaceHistoryManager:
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def record_snapshot(
+            self,
+            country: str,
+            distribution: Dict,
+            density: Optional[Dict] = None,
+            recorded_at: Optional[datetime] = None,
+    ) -> None:
+        """
+        Додає один знімок до всіх рівнів агрегації (1m, 1h, 1d) в одній транзакції
+
+        Args:
+            country (str): Назва країни
+            distribution (Dict): Результат analyze_aircraft_distribution
+            density (Dict): Результат get_traffic_density_analysis
+            recorded_at (datetime): Час знімку (UTC), за замовчуванням - зараз
+        """
+        recorded_at = recorded_at or datetime.utcnow()
+        total = distribution.get('total_aircraft', 0)
+        values = {
+            "samples": 1,
+            "total_sum": total,
+            "total_max": total,
+            "active_sum": distribution.get('active_flights', 0),
+            "ground_sum": distribution.get('ground_aircraft', 0),
+            "high_altitude_sum": distribution.get('altitudes', {}).get('high', 0),
+            "max_density": (density or {}).get('max_density', 0),
+        }
+
+        table = AirspaceSnapshot.__table__
+        try:
+            for resolution in RESOLUTIONS:
+                stmt = insert(table).values(
+                    country=country_key(country),
+                    resolution=resolution,
+                    bucket_start=bucket_start(recorded_at, resolution),
+                    **values
+                )
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=["country", "resolution", "bucket_start"],
+                    set_={
+                        "samples": table.c.samples + stmt.excluded.samples,
+                        "total_sum": table.c.total_sum + stmt.excluded.total_sum,
+                        "total_max": func.greatest(table.c.total_max,
+                                                   stmt.excluded.total_max),
+                        "active_sum": table.c.active_sum + stmt.excluded.active_sum,
+                        "ground_sum": table.c.ground_sum + stmt.excluded.ground_sum,
+                        "high_altitude_sum": table.c.high_altitude_sum
+                                             + stmt.excluded.high_altitude_sum,
+                        "max_density": func.greatest(table.c.max_density,
+                                                     stmt.excluded.max_density),
+                    }
+                )
+                self.db.execute(stmt)
+            self.db.commit()
+        except Exception as e:
+            self.db.rollback()
+            raise e
+
+    def get_series(
+            self,
+            country: str,
+            resolution: str,
+            since: datetime,
+            until: Optional[datetime] = None,
+    ) -> List[AirspaceSnapshot]:
+        """Повертає відра одного рівня за проміжок часу (скан по первинному ключу)"""
+        query = self.db.query(AirspaceSnapshot).filter(
+            AirspaceSnapshot.country == country_key(country),
+            AirspaceSnapshot.resolution == resolution,
+            AirspaceSnapshot.bucket_start >= bucket_start(since, resolution),
+        )
+        if until:
+            query = query.filter(AirspaceSnapshot.bucket_start <= until)
+        return query.order_by(AirspaceSnapshot.bucket_start).all()
+
+    def get_flight_trends(self, country: str, hours_back: int = 24) -> Dict:
+        """
+        Аналіз тренду трафіку над країною за збереженими агрегатами.
+        average_aircraft_per_snapshot - середня кількість літаків в одному
+        знімку за вікно (не кількість рейсів за годину)
+        """
+        resolution = resolution_for_window(hours_back)
+        since = datetime.utcnow() - timedelta(hours=hours_back)
+        series = self.get_series(country, resolution, since)
+
+        points = [
+            (row.bucket_start, row.total_sum / row.samples)
+            for row in series if row.samples
+        ]
+        if not points:
+            return {
+                "trend": "unknown",
+                "peak_hours": [],
+                "average_aircraft_per_snapshot": 0,
+                "resolution": resolution,
+                "points": 0,
+            }
+
+        averages = [value for _, value in points]
+        half = len(averages) // 2
+        trend = "stable"
+        if half:
+            first = sum(averages[:half]) / half
+            last = sum(averages[-half:]) / half
+            if first and (last - first) / first > TREND_THRESHOLD:
+                trend = "increasing"
+            elif first and (first - last) / first > TREND_THRESHOLD:
+                trend = "decreasing"
+            elif not first and last:
+                trend = "increasing"
+
+        peaks = sorted(points, key=lambda point: point[1], reverse=True)[:3]
+        return {
+            "trend": trend,
+            "peak_hours": [moment.strftime("%Y-%m-%d %H:%M") for moment, _ in peaks],
+            "average_aircraft_per_snapshot": round(sum(averages) / len(averages), 1),
+            "current": round(averages[-1], 1),
+            "maximum": max(row.total_max for row in series),
+            "resolution": resolution,
+            "points": len(points),
+        }
+
+    def prune(self, now: Optional[datetime] = None) -> int:
+        """Видаляє відра, старші за RETENTION відповідного рівня"""
+        now = now or datetime.utcnow()
+        deleted = 0
+        try:
+            for resolution, keep in RETENTION.items():
+                deleted += self.db.query(AirspaceSnapshot).filter(
+                    AirspaceSnapshot.resolution == resolution,
+                    AirspaceSnapshot.bucket_start < now - keep
+                ).delete(synchronize_session=False)
+            self.db.commit()
+            return deleted
+        except Exception as e:
+            self.db.rollback()
+            raise e
+
+
+def get_airspace_history_manager() -> AirspaceHistoryManager:
+    db = SessionLocal()
+    return AirspaceHistoryManager(db)
+
+
+class AirspaceHistoryManagerContext:
+
+    def __enter__(self) -> AirspaceHistoryManager:
+        self.db = SessionLocal()
+        self.history_manager = AirspaceHistoryManager(self.db)
+        return self.history_manager
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.db.close()
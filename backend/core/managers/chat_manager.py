@@ -1,12 +1,17 @@
 import uuid
 from datetime import datetime
-from typing import Optional, List
+from typing import Optional, List, Dict, Any, Tuple, Union
+from sqlalchemy import delete, func, insert, literal, select, tuple_
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError
-from backend.models.chat_history import ChatHistory
+from backend.models.chat_history import ChatHistory, ChatHistoryArchive
+from backend.models.chat_memory import ChatMessageEmbedding
+from backend.models.chat_summary import ChatSummary
 from backend.config.database import SessionLocal
+from backend.core.tracing import traced_methods
 
 
+@traced_methods(kind="manager")
 class ChatManager:
 
     def __init__(self, db: Session):
@@ -20,12 +25,14 @@ class ChatManager:
             message_text: str = None,
             message_image: str = None,
             agent_id: str = None,
+            sender: str = None,
     ) -> Optional[ChatHistory]:
         try:
             message = ChatHistory(
                 id=uuid.uuid4(),
                 user_id=user_id,
                 message_type=message_type,
+                sender=sender,
                 was_sent=was_sent,
                 message_text=message_text,
                 message_image=message_image,
@@ -42,6 +49,45 @@ class ChatManager:
             self.db.rollback()
             raise e
 
+    def add_messages(self, messages: List[Dict[str, Any]]) -> List[uuid.UUID]:
+        """
+        Зберігає пакет повідомлень одним INSERT ... VALUES ... RETURNING
+        (SQLAlchemy розбиває великі пакети на кілька таких запитів) і одним commit
+
+        Args:
+            messages (List[Dict]): Поля як у add_message (user_id, message_type,
+                was_sent, message_text, message_image, agent_id, sender)
+
+        Returns:
+            List[UUID]: id збережених повідомлень у порядку вхідного списку
+        """
+        if not messages:
+            return []
+        rows = [
+            {
+                "id": message.get("id") or uuid.uuid4(),
+                "user_id": message["user_id"],
+                "agent_id": message.get("agent_id"),
+                "message_type": message["message_type"],
+                "sender": message.get("sender"),
+                "message_text": message.get("message_text"),
+                "message_image": message.get("message_image"),
+                "was_sent": message.get("was_sent") or datetime.utcnow(),
+            }
+            for message in messages
+        ]
+        try:
+            result = self.db.execute(
+                insert(ChatHistory).returning(ChatHistory.id, sort_by_parameter_order=True),
+                rows
+            )
+            ids = list(result.scalars())
+            self.db.commit()
+            return ids
+        except Exception as e:
+            self.db.rollback()
+            raise e
+
     def get_chat_by_user_and_agent(
             self,
             user_id: str,
@@ -50,7 +96,197 @@ class ChatManager:
         return self.db.query(ChatHistory).filter(
             ChatHistory.user_id == user_id,
             ChatHistory.agent_id == agent_id
-        ).order_by(ChatHistory.was_sent).all()
+        ).order_by(ChatHistory.was_sent, ChatHistory.id).all()
+
+    def get_recent_messages(self, user_id: str, agent_id: str, limit: int) -> List[ChatHistory]:
+        """Останні limit повідомлень чату в хронологічному порядку"""
+        messages = self.db.query(ChatHistory).filter(
+            ChatHistory.user_id == user_id,
+            ChatHistory.agent_id == agent_id
+        ).order_by(ChatHistory.was_sent.desc(), ChatHistory.id.desc()).limit(limit).all()
+        return messages[::-1]
+
+    def get_messages_by_ids(self, message_ids: List[uuid.UUID]
+                            ) -> List[Union[ChatHistory, ChatHistoryArchive]]:
+        """Повідомлення з гарячого шару або архіву в хронологічному порядку"""
+        if not message_ids:
+            return []
+        messages = self.db.query(ChatHistory).filter(ChatHistory.id.in_(message_ids)).all()
+        missing = set(message_ids) - {message.id for message in messages}
+        if missing:
+            messages += self.db.query(ChatHistoryArchive).filter(
+                ChatHistoryArchive.id.in_(missing)).all()
+        return sorted(messages, key=lambda message: (message.was_sent, message.id))
+
+    def get_chat_since(
+            self,
+            user_id: str,
+            agent_id: str,
+            cursor: str
+    ) -> Optional[List[ChatHistory]]:
+        """
+        Повідомлення чату, записані після повідомлення-курсора, у порядку
+        запису (seq). was_sent задає клієнт, тож курсор по ньому пропускав
+        би повідомлення, додані "в минуле". Повертає None, якщо курсора вже
+        немає в чаті (наприклад, після очищення) - тоді клієнт має
+        завантажити історію повністю.
+        """
+        query = self.db.query(ChatHistory).filter(
+            ChatHistory.user_id == user_id,
+            ChatHistory.agent_id == agent_id
+        )
+        cursor_seq = query.with_entities(ChatHistory.seq).filter(ChatHistory.id == cursor).scalar()
+        if cursor_seq is None:
+            return None
+
+        return query.filter(ChatHistory.seq > cursor_seq).order_by(ChatHistory.seq).all()
+
+    def get_chat_version(self, user_id: str, agent_id: str) -> str:
+        """
+        Версія чату для ETag: останній seq + кількість повідомлень
+        (кількість змінюється і після очищення чату)
+        """
+        latest_seq, count = self.db.query(
+            func.max(ChatHistory.seq), func.count(ChatHistory.id)
+        ).filter(
+            ChatHistory.user_id == user_id,
+            ChatHistory.agent_id == agent_id
+        ).one()
+        if not count:
+            return "empty"
+        return f"{latest_seq}-{count}"
+
+    def get_chat_summary(self, user_id: str, agent_id: str) -> Optional[ChatSummary]:
+        return self.db.query(ChatSummary).filter(
+            ChatSummary.user_id == user_id,
+            ChatSummary.agent_id == agent_id
+        ).first()
+
+    def get_archived_messages(self, user_id: str, agent_id: str, before: Optional[str],
+                              limit: int) -> Optional[List[ChatHistoryArchive]]:
+        """
+        Сторінка архіву чату перед повідомленням-курсором before (з
+        гарячого шару або архіву) у хронологічному порядку; без курсора -
+        найновіші архівовані повідомлення. None, якщо курсора немає.
+        """
+        query = self.db.query(ChatHistoryArchive).filter(
+            ChatHistoryArchive.user_id == user_id,
+            ChatHistoryArchive.agent_id == agent_id
+        )
+        if before:
+            cursor = (
+                self.db.query(ChatHistoryArchive.was_sent, ChatHistoryArchive.id)
+                .filter(ChatHistoryArchive.id == before).first()
+                or self.db.query(ChatHistory.was_sent, ChatHistory.id)
+                .filter(ChatHistory.id == before).first()
+            )
+            if cursor is None:
+                return None
+            query = query.filter(
+                tuple_(ChatHistoryArchive.was_sent, ChatHistoryArchive.id)
+                < tuple_(cursor.was_sent, cursor.id)
+            )
+        messages = query.order_by(
+            ChatHistoryArchive.was_sent.desc(), ChatHistoryArchive.id.desc()
+        ).limit(limit).all()
+        return messages[::-1]
+
+    def get_chats_to_compact(self, cutoff: datetime, keep_recent: int,
+                             limit: int) -> List[Tuple[uuid.UUID, uuid.UUID]]:
+        """
+        Чати, де є що архівувати: межа get_compactable_messages (повідомлення
+        одразу після останніх keep_recent) старша за cutoff. Найдавніші межі
+        першими, тож чати без архівованих повідомлень не займають limit
+        """
+        ranked = self.db.query(
+            ChatHistory.user_id,
+            ChatHistory.agent_id,
+            ChatHistory.was_sent,
+            func.row_number().over(
+                partition_by=(ChatHistory.user_id, ChatHistory.agent_id),
+                order_by=(ChatHistory.was_sent.desc(), ChatHistory.id.desc())
+            ).label("position")
+        ).subquery()
+        return self.db.query(ranked.c.user_id, ranked.c.agent_id).filter(
+            ranked.c.position == keep_recent + 1,
+            ranked.c.was_sent < cutoff
+        ).order_by(ranked.c.was_sent).limit(limit).all()
+
+    def get_compactable_messages(self, user_id: str, agent_id: str, cutoff: datetime,
+                                 keep_recent: int, limit: int) -> List[ChatHistory]:
+        """
+        Найстаріші повідомлення чату, старші за cutoff, крім останніх
+        keep_recent (вони лишаються в гарячому шарі за будь-якого віку)
+        """
+        query = self.db.query(ChatHistory).filter(
+            ChatHistory.user_id == user_id,
+            ChatHistory.agent_id == agent_id
+        )
+        boundary = query.with_entities(ChatHistory.was_sent, ChatHistory.id).order_by(
+            ChatHistory.was_sent.desc(), ChatHistory.id.desc()
+        ).offset(keep_recent).first()
+        if boundary is None:
+            return []
+        return query.filter(
+            ChatHistory.was_sent < cutoff,
+            tuple_(ChatHistory.was_sent, ChatHistory.id) <= tuple_(boundary.was_sent, boundary.id)
+        ).order_by(ChatHistory.was_sent, ChatHistory.id).limit(limit).all()
+
+    def archive_messages(self, user_id: str, agent_id: str, message_ids: List[uuid.UUID],
+                         summary: str, summarized_until: datetime, expected_version: int) -> bool:
+        """
+        Переносить повідомлення в chat_history_archive і зберігає новий
+        підсумок чату однією транзакцією
+
+        Args:
+            expected_version (int): Версія підсумку, з якої будувався новий (0 - підсумку не було)
+
+        Returns:
+            bool: False, якщо чат тим часом скомпактував інший процес або
+                повідомлення вже видалено - тоді нічого не змінено
+        """
+        now = datetime.utcnow()
+        columns = ["id", "user_id", "agent_id", "message_type", "sender", "message_text",
+                   "message_image", "was_sent"]
+        try:
+            current = self.db.query(ChatSummary).filter(
+                ChatSummary.user_id == user_id,
+                ChatSummary.agent_id == agent_id
+            ).with_for_update().first()
+            if (current.version if current else 0) != expected_version:
+                self.db.rollback()
+                return False
+
+            self.db.execute(insert(ChatHistoryArchive).from_select(
+                columns + ["archived_at"],
+                select(*(getattr(ChatHistory, column) for column in columns), literal(now))
+                .where(ChatHistory.id.in_(message_ids))
+            ))
+            deleted = self.db.execute(
+                delete(ChatHistory).where(ChatHistory.id.in_(message_ids)).returning(ChatHistory.id)
+            ).scalars().all()
+            if len(deleted) != len(message_ids):
+                self.db.rollback()
+                return False
+
+            if current is None:
+                current = ChatSummary(id=uuid.uuid4(), user_id=user_id, agent_id=agent_id,
+                                      archived_messages=0, version=0)
+                self.db.add(current)
+            current.summary = summary
+            current.archived_messages += len(message_ids)
+            current.summarized_until = summarized_until
+            current.version += 1
+            current.updated_at = now
+            self.db.commit()
+            return True
+        except IntegrityError:
+            # Перший підсумок чату паралельно створив інший процес
+            self.db.rollback()
+            return False
+        except Exception as e:
+            self.db.rollback()
+            raise e
 
     def clear_chat_history(self, user_id: str, agent_id: str) -> bool:
         try:
@@ -58,6 +294,18 @@ class ChatManager:
                 ChatHistory.user_id == user_id,
                 ChatHistory.agent_id == agent_id
             ).delete()
+            self.db.query(ChatMessageEmbedding).filter(
+                ChatMessageEmbedding.user_id == user_id,
+                ChatMessageEmbedding.agent_id == agent_id
+            ).delete()
+            self.db.query(ChatHistoryArchive).filter(
+                ChatHistoryArchive.user_id == user_id,
+                ChatHistoryArchive.agent_id == agent_id
+            ).delete()
+            self.db.query(ChatSummary).filter(
+                ChatSummary.user_id == user_id,
+                ChatSummary.agent_id == agent_id
+            ).delete()
             self.db.commit()
             return True
         except Exception as e:
@@ -0,0 +1,227 @@
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+from sqlalchemy import func
+from sqlalchemy.orm import Session, aliased
+from backend.models.job import Job
+from backend.config.database import SessionLocal
+from backend.core.tracing import traced_methods
+
+ACTIVE_STATUSES = ("queued", "running", "cancelling")
+FINISHED_STATUSES = ("succeeded", "failed", "cancelled")
+RUNNING_STATUSES = ("running", "cancelling")
+# Скільки задач з черги розглядає один claim_next_job
+CLAIM_CANDIDATES = 10
+
+
+class JobLimitExceeded(Exception):
+    """У користувача вже забагато незавершених задач"""
+
+
+@traced_methods(kind="manager")
+class JobManager:
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def create_job(
+            self,
+            user_id: str,
+            kind: str,
+            payload: Dict[str, Any],
+            agent_id: Optional[str] = None,
+            max_active_per_user: Optional[int] = None,
+    ) -> Job:
+        """
+        Ставить задачу в чергу
+
+        Args:
+            user_id (str): Власник задачі
+            kind (str): Тип задачі (ключ обробника воркера)
+            payload (Dict): JSON-параметри для обробника
+            agent_id (str): Агент, до чату з яким відноситься задача
+            max_active_per_user (int): Ліміт незавершених задач користувача
+
+        Raises:
+            JobLimitExceeded: Якщо ліміт незавершених задач вичерпано
+        """
+        try:
+            if max_active_per_user is not None:
+                active = self.db.query(func.count(Job.id)).filter(
+                    Job.user_id == user_id,
+                    Job.status.in_(ACTIVE_STATUSES)
+                ).scalar()
+                if active >= max_active_per_user:
+                    raise JobLimitExceeded(
+                        f"User {user_id} already has {active} unfinished jobs")
+
+            job = Job(user_id=user_id, agent_id=agent_id, kind=kind, payload=payload,
+                      status="queued", attempts=0, created_at=datetime.utcnow())
+            self.db.add(job)
+            self.db.commit()
+            self.db.refresh(job)
+            return job
+        except Exception as e:
+            self.db.rollback()
+            raise e
+
+    def get_job(self, job_id: str) -> Optional[Job]:
+        return self.db.query(Job).filter(Job.id == job_id).first()
+
+    def get_user_jobs(self, user_id: str, active_only: bool = False, limit: int = 50) -> List[Job]:
+        query = self.db.query(Job).filter(Job.user_id == user_id)
+        if active_only:
+            query = query.filter(Job.status.in_(ACTIVE_STATUSES))
+        return query.order_by(Job.created_at.desc()).limit(limit).all()
+
+    def claim_next_job(self, kinds: List[str], max_running_per_user: int) -> Optional[Job]:
+        """
+        Забирає найстарішу задачу з черги (FOR UPDATE SKIP LOCKED, тож кілька
+        воркерів і процесів не отримають одну задачу). Пропускає користувачів,
+        у яких уже виконується max_running_per_user задач: ліміт перевіряється
+        повторно під advisory-блокуванням користувача, тож два воркери не
+        можуть одночасно перевищити його задачами одного користувача.
+        """
+        running = aliased(Job)
+        running_count = self.db.query(func.count(running.id)).filter(
+            running.user_id == Job.user_id,
+            running.status.in_(RUNNING_STATUSES)
+        ).scalar_subquery()
+
+        try:
+            candidates = self.db.query(Job).filter(
+                Job.status == "queued",
+                Job.kind.in_(kinds),
+                running_count < max_running_per_user
+            ).order_by(Job.created_at).with_for_update(skip_locked=True).limit(
+                CLAIM_CANDIDATES).all()
+
+            for job in candidates:
+                # Блокування до кінця транзакції; зайняте - інший воркер саме бере задачу
+                # цього користувача, його задачі пропускаємо
+                locked = self.db.query(
+                    func.pg_try_advisory_xact_lock(func.hashtext(str(job.user_id)))
+                ).scalar()
+                if not locked:
+                    continue
+                # Новий знімок: задачі, взяті іншими воркерами до блокування, вже видно
+                user_running = self.db.query(func.count(Job.id)).filter(
+                    Job.user_id == job.user_id,
+                    Job.status.in_(RUNNING_STATUSES)
+                ).scalar()
+                if user_running >= max_running_per_user:
+                    continue
+
+                now = datetime.utcnow()
+                job.status = "running"
+                job.attempts += 1
+                job.started_at = now
+                job.heartbeat_at = now
+                self.db.commit()
+                self.db.refresh(job)
+                return job
+
+            self.db.rollback()
+            return None
+        except Exception as e:
+            self.db.rollback()
+            raise e
+
+    def heartbeat(self, job_id: str) -> Optional[str]:
+        """Оновлює heartbeat задачі, що виконується, і повертає її поточний статус"""
+        try:
+            job = self.get_job(job_id)
+            if job is None:
+                return None
+            job.heartbeat_at = datetime.utcnow()
+            self.db.commit()
+            return job.status
+        except Exception as e:
+            self.db.rollback()
+            raise e
+
+    def request_cancel(self, job_id: str) -> Optional[Job]:
+        """
+        Скасовує задачу: задача в черзі скасовується одразу, задача, що
+        виконується, отримує статус cancelling і зупиняється воркером.
+        """
+        try:
+            job = self.get_job(job_id)
+            if job is None:
+                return None
+            if job.status == "queued":
+                job.status = "cancelled"
+                job.finished_at = datetime.utcnow()
+            elif job.status == "running":
+                job.status = "cancelling"
+            self.db.commit()
+            self.db.refresh(job)
+            return job
+        except Exception as e:
+            self.db.rollback()
+            raise e
+
+    def finish_job(self, job_id: str, status: str, result: Optional[str] = None,
+                   error: Optional[str] = None) -> Optional[Job]:
+        try:
+            job = self.get_job(job_id)
+            if job is None:
+                return None
+            # Скасування, що надійшло під час виконання, має пріоритет над результатом
+            if job.status == "cancelling" and status == "succeeded":
+                status = "cancelled"
+            job.status = status
+            job.result = result
+            job.error = error
+            job.finished_at = datetime.utcnow()
+            self.db.commit()
+            self.db.refresh(job)
+            return job
+        except Exception as e:
+            self.db.rollback()
+            raise e
+
+    def fail_stale_jobs(self, timeout: timedelta) -> int:
+        """Позначає як failed задачі, воркер яких перестав надсилати heartbeat"""
+        try:
+            now = datetime.utcnow()
+            failed = self.db.query(Job).filter(
+                Job.status.in_(RUNNING_STATUSES),
+                Job.heartbeat_at < now - timeout
+            ).update({
+                "status": "failed",
+                "error": "Worker stopped before the job finished",
+                "finished_at": now,
+            }, synchronize_session=False)
+            self.db.commit()
+            return failed
+        except Exception as e:
+            self.db.rollback()
+            raise e
+
+    def prune_finished_jobs(self, older_than: timedelta) -> int:
+        try:
+            deleted = self.db.query(Job).filter(
+                Job.status.in_(FINISHED_STATUSES),
+                Job.finished_at < datetime.utcnow() - older_than
+            ).delete(synchronize_session=False)
+            self.db.commit()
+            return deleted
+        except Exception as e:
+            self.db.rollback()
+            raise e
+
+
+def get_job_manager() -> JobManager:
+    db = SessionLocal()
+    return JobManager(db)
+
+
+class JobManagerContext:
+
+    def __enter__(self) -> JobManager:
+        self.db = SessionLocal()
+        self.job_manager = JobManager(self.db)
+        return self.job_manager
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.db.close()
@@ -0,0 +1,92 @@
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from sqlalchemy import and_
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+from backend.models.chat_history import ChatHistory
+from backend.models.chat_memory import ChatMessageEmbedding
+from backend.config.database import SessionLocal
+from backend.core.tracing import traced_methods
+
+
+@traced_methods(kind="manager")
+class MemoryManager:
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def save_embeddings(self, embeddings: List[Dict[str, Any]]) -> None:
+        """
+        Зберігає пакет ембеддингів; для повідомлень, що вже мають ембеддинг
+        (інша модель), рядок перезаписується
+
+        Args:
+            embeddings (List[Dict]): message_id, user_id, agent_id, model, embedding
+        """
+        if not embeddings:
+            return
+        now = datetime.utcnow()
+        statement = insert(ChatMessageEmbedding).values(
+            [{**embedding, "created_at": now} for embedding in embeddings])
+        statement = statement.on_conflict_do_update(
+            index_elements=[ChatMessageEmbedding.message_id],
+            set_={
+                "model": statement.excluded.model,
+                "embedding": statement.excluded.embedding,
+                "created_at": statement.excluded.created_at,
+            },
+        )
+        try:
+            self.db.execute(statement)
+            self.db.commit()
+        except Exception as e:
+            self.db.rollback()
+            raise e
+
+    def get_embeddings(self, user_id: str, agent_id: str, model: str,
+                       since: Optional[datetime] = None) -> List[Any]:
+        """Ембеддинги чату моделі model (лише записані після since, якщо задано)"""
+        query = self.db.query(
+            ChatMessageEmbedding.message_id,
+            ChatMessageEmbedding.embedding,
+            ChatMessageEmbedding.created_at,
+        ).filter(
+            ChatMessageEmbedding.user_id == user_id,
+            ChatMessageEmbedding.agent_id == agent_id,
+            ChatMessageEmbedding.model == model,
+        )
+        if since is not None:
+            query = query.filter(ChatMessageEmbedding.created_at > since)
+        return query.order_by(ChatMessageEmbedding.created_at).all()
+
+    def get_unembedded_messages(self, user_id: str, agent_id: str, model: str,
+                                limit: int) -> List[Any]:
+        """Текстові повідомлення чату без ембеддингу моделі model (найстаріші першими)"""
+        return self.db.query(
+            ChatHistory.id, ChatHistory.user_id, ChatHistory.agent_id, ChatHistory.message_text
+        ).outerjoin(
+            ChatMessageEmbedding,
+            and_(ChatMessageEmbedding.message_id == ChatHistory.id,
+                 ChatMessageEmbedding.model == model),
+        ).filter(
+            ChatHistory.user_id == user_id,
+            ChatHistory.agent_id == agent_id,
+            ChatHistory.message_text.isnot(None),
+            ChatMessageEmbedding.message_id.is_(None),
+        ).order_by(ChatHistory.was_sent, ChatHistory.id).limit(limit).all()
+
+
+def get_memory_manager() -> MemoryManager:
+    db = SessionLocal()
+    return MemoryManager(db)
+
+
+class MemoryManagerContext:
+
+    def __enter__(self) -> MemoryManager:
+        self.db = SessionLocal()
+        self.memory_manager = MemoryManager(self.db)
+        return self.memory_manager
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.db.close()
@@ -0,0 +1,106 @@
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from sqlalchemy import func, insert, update
+from sqlalchemy.orm import Session
+from backend.models.llm_usage import LLMUsage
+from backend.models.user import User
+from backend.config.database import SessionLocal
+from backend.core.tracing import traced_methods
+
+USAGE_TOTALS = (
+    func.count(LLMUsage.id).label("messages"),
+    func.coalesce(func.sum(LLMUsage.prompt_tokens), 0).label("prompt_tokens"),
+    func.coalesce(func.sum(LLMUsage.cached_prompt_tokens), 0).label("cached_prompt_tokens"),
+    func.coalesce(func.sum(LLMUsage.completion_tokens), 0).label("completion_tokens"),
+    func.coalesce(func.sum(LLMUsage.llm_requests), 0).label("llm_requests"),
+    func.coalesce(func.sum(LLMUsage.tool_calls), 0).label("tool_calls"),
+    func.coalesce(func.sum(LLMUsage.coins), 0).label("coins"),
+    func.coalesce(func.avg(LLMUsage.duration_ms), 0).label("avg_duration_ms"),
+    func.coalesce(func.max(LLMUsage.duration_ms), 0).label("max_duration_ms"),
+)
+
+
+@traced_methods(kind="manager")
+class UsageManager:
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def get_balance(self, user_id: str) -> Optional[int]:
+        return self.db.query(User.coin_count).filter(User.id == user_id).scalar()
+
+    def record_usage(self, usage: Dict[str, Any]) -> Optional[int]:
+        """
+        Записує облік повідомлення і списує його монети в одній транзакції.
+        Списання - один UPDATE ... RETURNING без читання балансу наперед,
+        тож паралельні запити одного користувача не перезаписують одне
+        одного; баланс не опускається нижче нуля.
+
+        Args:
+            usage (Dict): Поля LLMUsage (coins - скільки списати)
+
+        Returns:
+            Optional[int]: Баланс після списання (None, якщо користувача немає)
+        """
+        try:
+            self.db.execute(insert(LLMUsage).values(created_at=datetime.utcnow(), **usage))
+            balance = self.db.execute(
+                update(User)
+                .where(User.id == usage["user_id"])
+                .values(coin_count=func.greatest(User.coin_count - usage["coins"], 0))
+                .returning(User.coin_count)
+            ).scalar()
+            self.db.commit()
+            return balance
+        except Exception as e:
+            self.db.rollback()
+            raise e
+
+    def get_message_usage(self, chat_message_id: str) -> Optional[LLMUsage]:
+        return self.db.query(LLMUsage).filter(LLMUsage.chat_message_id == chat_message_id).first()
+
+    def usage_by_agent(self, since: Optional[datetime] = None,
+                       user_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Сумарні токени, монети і затримки по агентах, від найдорожчого"""
+        query = self.db.query(LLMUsage.agent_id, LLMUsage.agent_type, *USAGE_TOTALS)
+        if since is not None:
+            query = query.filter(LLMUsage.created_at >= since)
+        if user_id is not None:
+            query = query.filter(LLMUsage.user_id == user_id)
+        rows = query.group_by(LLMUsage.agent_id, LLMUsage.agent_type) \
+            .order_by(func.sum(LLMUsage.prompt_tokens + LLMUsage.completion_tokens).desc()) \
+            .all()
+        return [dict(row._mapping) for row in rows]
+
+    def usage_by_user(self, user_id: str, since: Optional[datetime] = None) -> Dict[str, Any]:
+        query = self.db.query(*USAGE_TOTALS).filter(LLMUsage.user_id == user_id)
+        if since is not None:
+            query = query.filter(LLMUsage.created_at >= since)
+        return dict(query.one()._mapping)
+
+    def top_messages(self, limit: int = 20, since: Optional[datetime] = None,
+                     agent_id: Optional[str] = None) -> List[LLMUsage]:
+        """Найдорожчі повідомлення за токенами - які промпти домінують у витратах"""
+        query = self.db.query(LLMUsage)
+        if since is not None:
+            query = query.filter(LLMUsage.created_at >= since)
+        if agent_id is not None:
+            query = query.filter(LLMUsage.agent_id == agent_id)
+        return query.order_by((LLMUsage.prompt_tokens + LLMUsage.completion_tokens).desc()) \
+            .limit(limit).all()
+
+
+def get_usage_manager() -> UsageManager:
+    db = SessionLocal()
+    return UsageManager(db)
+
+
+class UsageManagerContext:
+
+    def __enter__(self) -> UsageManager:
+        self.db = SessionLocal()
+        self.usage_manager = UsageManager(self.db)
+        return self.usage_manager
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.db.close()
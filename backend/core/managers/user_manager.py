@@ -3,8 +3,10 @@ from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError
 from backend.models.user import User
 from backend.config.database import SessionLocal
+from backend.core.tracing import traced_methods
 
 
+@traced_methods(kind="manager")
 class UserManager:
 
     def __init__(self, db: Session):
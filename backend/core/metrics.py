@@ -0,0 +1,343 @@
+"""
+Метрики процесу у текстовому форматі Prometheus (GET /metrics).
+
+Лічильники і гістограми гарячого шляху оновлюються на місці (запити API,
+crew.kickoff, токени LLM, кеші, очікування пулу БД). Стан, який уже
+рахують інші компоненти (транспорт апстрімів, пул SQLAlchemy), знімається
+колекторами в момент scrape. Метрики - на процес: з кількома воркерами
+uvicorn кожен воркер віддає власні значення.
+"""
+import logging
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Межі відер за замовчуванням (секунди)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+LLM_BUCKETS = (0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0, 300.0)
+
+# Хост апстріму -> постачальник для міток
+PROVIDERS = {
+    "opensky-network.org": "opensky",
+    "api.windy.com": "windy",
+    "api.weatherapi.com": "weatherapi",
+    "api.planespotters.net": "planespotters",
+    "airportdb.io": "airportdb",
+}
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def histogram_lines(name: str, label_names: Sequence[str], label_values: Sequence[str],
+                    buckets: Sequence[float], counts: Sequence[int], total_sum: float) -> List[str]:
+    """Рядки гістограми з некумулятивних лічильників відер (останнє відро може бути +Inf)"""
+    lines = []
+    cumulative = 0
+    for bound, count in zip(buckets, counts):
+        cumulative += count
+        le = f'le="{_format_value(bound)}"'
+        lines.append(f"{name}_bucket{_format_labels(label_names, label_values, le)} {cumulative}")
+    if not buckets or buckets[-1] != float("inf"):
+        cumulative += sum(counts[len(buckets):])
+        le = 'le="+Inf"'
+        lines.append(f"{name}_bucket{_format_labels(label_names, label_values, le)} {cumulative}")
+    labels = _format_labels(label_names, label_values)
+    lines.append(f"{name}_sum{labels} {_format_value(round(total_sum, 6))}")
+    lines.append(f"{name}_count{labels} {cumulative}")
+    return lines
+
+
+class _Metric:
+    type = "untyped"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        return tuple(str(labels.get(name, "")) for name in self.label_names)
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"]
+
+    def render(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    type = "counter"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        super().__init__(name, documentation, labels)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return self.header() + [f"{self.name}{_format_labels(self.label_names, key)} "
+                                f"{_format_value(value)}" for key, value in values]
+
+
+class Gauge(Counter):
+    type = "gauge"
+
+    def set(self, value: float, **labels) -> None:
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def dec(self, amount: float = 1, **labels) -> None:
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(buckets)
+        # На мітки: лічильники відер (+ відро +Inf) і сума
+        self._values: Dict[LabelValues, Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            counts, total = self._values.setdefault(key, ([0] * (len(self.buckets) + 1), [0.0]))
+            counts[bisect_left(self.buckets, value)] += 1
+            total[0] += value
+
+    def time(self, **labels) -> "_Timer":
+        return _Timer(self, labels)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = sorted((key, list(counts), total[0])
+                            for key, (counts, total) in self._values.items())
+        lines = self.header()
+        for key, counts, total in values:
+            lines += histogram_lines(self.name, self.label_names, key, self.buckets, counts, total)
+        return lines
+
+
+class _Timer:
+    def __init__(self, histogram: Histogram, labels: Dict[str, str]):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.started, **self.labels)
+
+
+Collector = Callable[[], Iterable[str]]
+
+
+class MetricsRegistry:
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: List[Collector] = []
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric {metric.name} is already registered")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def add_collector(self, collector: Collector) -> None:
+        """Колектор повертає готові рядки експозиції і викликається на кожен scrape"""
+        with self._lock:
+            self._collectors.append(collector)
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+            collectors = list(self._collectors)
+        lines: List[str] = []
+        for metric in metrics:
+            lines += metric.render()
+        for collector in collectors:
+            try:
+                lines += list(collector())
+            except Exception as e:
+                logger.warning(f"Metrics collector {collector.__name__} failed: {e}")
+        return "\n".join(lines) + "\n"
+
+
+_registry = MetricsRegistry()
+
+
+def get_metrics_registry() -> MetricsRegistry:
+    return _registry
+
+
+def counter(name: str, documentation: str, labels: Sequence[str] = ()) -> Counter:
+    return _registry.register(Counter(name, documentation, labels))
+
+
+def gauge(name: str, documentation: str, labels: Sequence[str] = ()) -> Gauge:
+    return _registry.register(Gauge(name, documentation, labels))
+
+
+def histogram(name: str, documentation: str, labels: Sequence[str] = (),
+              buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+    return _registry.register(Histogram(name, documentation, labels, buckets))
+
+
+HTTP_REQUESTS = counter(
+    "http_requests_total", "API requests by route template and status", ("method", "route", "status"))
+HTTP_REQUEST_SECONDS = histogram(
+    "http_request_duration_seconds", "API request latency by route template", ("method", "route"))
+HTTP_IN_PROGRESS = gauge("http_requests_in_progress", "API requests being handled")
+
+DB_POOL_WAIT_SECONDS = histogram(
+    "db_pool_checkout_wait_seconds", "Time spent waiting for a pooled DB connection",
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0, 30.0))
+DB_POOL_TIMEOUTS = counter("db_pool_checkout_timeouts_total", "DB pool checkouts that timed out")
+
+CREW_QUEUED = gauge("crew_kickoff_queued", "crew.kickoff calls waiting for an executor thread")
+CREW_RUNNING = gauge("crew_kickoff_running", "crew.kickoff calls running in executor threads")
+CREW_QUEUE_SECONDS = histogram(
+    "crew_kickoff_queue_wait_seconds", "Time crew.kickoff waited for an executor thread")
+CREW_SECONDS = histogram(
+    "crew_kickoff_duration_seconds", "crew.kickoff run time by agent type", ("agent",),
+    buckets=LLM_BUCKETS)
+CREW_ERRORS = counter("crew_kickoff_errors_total", "Failed crew.kickoff calls", ("agent",))
+
+LLM_TOKENS = counter(
+    "llm_tokens_total", "LLM tokens by agent type and kind (prompt, completion, cached_prompt)",
+    ("agent", "kind"))
+LLM_REQUESTS = counter("llm_requests_total", "Successful LLM completions by agent type", ("agent",))
+TOOL_CALLS = counter("agent_tool_calls_total", "crewai tool calls by tool and outcome",
+                     ("tool", "outcome"))
+
+CACHE_REQUESTS = counter(
+    "cache_requests_total", "Cache lookups by cache and result (hit ratio = hit / all)",
+    ("cache", "result"))
+SEMANTIC_CACHE_ENTRIES = gauge(
+    "semantic_cache_entries", "Answers stored in the semantic response cache")
+CHAT_MEMORY_EMBEDDED = counter(
+    "chat_memory_embedded_messages_total", "Chat messages embedded for long-term memory")
+
+
+def record_cache(cache: str, result: str) -> None:
+    CACHE_REQUESTS.inc(cache=cache, result=result)
+
+
+def instrument_pool(engine) -> None:
+    """
+    Вимірює очікування з'єднання в пулі SQLAlchemy (обгортка _do_get пулу)
+    і додає колектор стану пулу: розмір, видані, overflow.
+    """
+    pool = engine.pool
+    do_get = getattr(pool, "_do_get", None)
+    if do_get is not None and not getattr(do_get, "_metrics_wrapped", False):
+        def timed_do_get():
+            started = time.perf_counter()
+            try:
+                return do_get()
+            except Exception as e:
+                if type(e).__name__ == "TimeoutError":
+                    DB_POOL_TIMEOUTS.inc()
+                raise
+            finally:
+                DB_POOL_WAIT_SECONDS.observe(time.perf_counter() - started)
+
+        timed_do_get._metrics_wrapped = True
+        pool._do_get = timed_do_get
+
+    def db_pool() -> List[str]:
+        current = engine.pool
+        lines = []
+        for name, documentation, getter in (
+                ("db_pool_size", "Configured DB pool size", "size"),
+                ("db_pool_checked_out", "DB connections currently checked out", "checkedout"),
+                ("db_pool_checked_in", "Idle DB connections in the pool", "checkedin"),
+                ("db_pool_overflow", "DB connections opened above pool_size", "overflow")):
+            method = getattr(current, getter, None)
+            if method is None:
+                continue
+            # QueuePool.overflow() від'ємний, поки пул не заповнений до pool_size
+            lines += [f"# HELP {name} {documentation}", f"# TYPE {name} gauge",
+                      f"{name} {_format_value(max(0, method()))}"]
+        return lines
+
+    _registry.add_collector(db_pool)
+
+
+def collect_upstreams(stats: Callable[[], Dict[str, Dict]]) -> None:
+    """Колектор метрик апстрімів зі статистики HttpTransport.stats()"""
+
+    def upstreams() -> List[str]:
+        hosts = stats()
+        label_names = ("provider", "host")
+        lines = []
+        for name, key, documentation in (
+                ("upstream_requests_total", "requests", "Upstream HTTP attempts"),
+                ("upstream_errors_total", "errors", "Failed upstream attempts (network or 5xx)"),
+                ("upstream_retries_total", "retries", "Upstream retries"),
+                ("upstream_rejected_total", "rejected", "Calls rejected by an open circuit")):
+            lines += [f"# HELP {name} {documentation}", f"# TYPE {name} counter"]
+            for host, host_stats in sorted(hosts.items()):
+                labels = _format_labels(label_names, (PROVIDERS.get(host, host), host))
+                lines.append(f"{name}{labels} {host_stats[key]}")
+
+        name = "upstream_circuit_open"
+        lines += [f"# HELP {name} 1 while the host circuit breaker is not closed",
+                  f"# TYPE {name} gauge"]
+        for host, host_stats in sorted(hosts.items()):
+            labels = _format_labels(label_names, (PROVIDERS.get(host, host), host))
+            lines.append(f"{name}{labels} {int(host_stats['circuit'] != 'closed')}")
+
+        name = "upstream_request_duration_seconds"
+        lines += [f"# HELP {name} Upstream attempt latency", f"# TYPE {name} histogram"]
+        for host, host_stats in sorted(hosts.items()):
+            latency = host_stats["latency"]
+            buckets = [float(bound) for bound in latency["buckets"]]
+            lines += histogram_lines(name, label_names, (PROVIDERS.get(host, host), host),
+                                     buckets, list(latency["buckets"].values()), latency["sum"])
+        return lines
+
+    _registry.add_collector(upstreams)
+
+
+def render_metrics() -> str:
+    return _registry.render()
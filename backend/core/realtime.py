@@ -0,0 +1,107 @@
+"""
+Реєстр WebSocket з'єднань чату. Події надсилаються всім вкладкам сесії
+(user, agent); фонові потоки (рекордер авіапростору, задачі) публікують
+події через publish(), яке безпечно викликати з будь-якого потоку.
+"""
+import asyncio
+import logging
+import threading
+from typing import Any, Dict, Optional, Set, Tuple
+
+from fastapi import WebSocket
+
+logger = logging.getLogger(__name__)
+
+SessionKey = Tuple[str, str]
+
+
+class ChatHub:
+
+    def __init__(self):
+        self._sessions: Dict[SessionKey, Set[WebSocket]] = {}
+        self._topics: Dict[WebSocket, Set[str]] = {}
+        self._send_locks: Dict[WebSocket, asyncio.Lock] = {}
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    async def connect(self, websocket: WebSocket, user_id: str, agent_id: str) -> None:
+        await websocket.accept()
+        self._loop = asyncio.get_running_loop()
+        with self._lock:
+            self._sessions.setdefault((user_id, agent_id), set()).add(websocket)
+            self._topics[websocket] = set()
+            self._send_locks[websocket] = asyncio.Lock()
+
+    def _forget(self, websocket: WebSocket) -> None:
+        for key, connections in list(self._sessions.items()):
+            connections.discard(websocket)
+            if not connections:
+                del self._sessions[key]
+        self._topics.pop(websocket, None)
+        self._send_locks.pop(websocket, None)
+
+    def disconnect(self, websocket: WebSocket) -> None:
+        with self._lock:
+            self._forget(websocket)
+
+    def subscribe(self, websocket: WebSocket, topic: str) -> None:
+        with self._lock:
+            if websocket in self._topics:
+                self._topics[websocket].add(topic)
+
+    async def _send_to(self, websocket: WebSocket, event: Dict[str, Any]) -> None:
+        # Один відправник на з'єднання - події (зокрема фрагменти стріму) не перемішуються
+        lock = self._send_locks.get(websocket)
+        if lock is None:
+            return
+        try:
+            async with lock:
+                await websocket.send_json(event)
+        except Exception as e:
+            logger.info(f"Dropping chat websocket after send failure: {e}")
+            self.disconnect(websocket)
+
+    async def send(self, user_id: str, agent_id: str, event: Dict[str, Any]) -> None:
+        """Надсилає подію всім з'єднанням сесії (user, agent)"""
+        with self._lock:
+            connections = list(self._sessions.get((str(user_id), str(agent_id)), ()))
+        for websocket in connections:
+            await self._send_to(websocket, event)
+
+    async def broadcast(self, event: Dict[str, Any], topic: Optional[str] = None,
+                        user_id: Optional[str] = None) -> None:
+        """Надсилає подію підписникам топіка (або всім), опційно лише одному користувачу"""
+        with self._lock:
+            targets = [
+                websocket
+                for (session_user, _), connections in self._sessions.items()
+                if user_id is None or session_user == str(user_id)
+                for websocket in connections
+                if topic is None or topic in self._topics.get(websocket, ())
+            ]
+        for websocket in targets:
+            await self._send_to(websocket, event)
+
+    def publish(self, event: Dict[str, Any], topic: Optional[str] = None,
+                user_id: Optional[str] = None, agent_id: Optional[str] = None) -> None:
+        """Потокобезпечна публікація з фонових потоків; без активного циклу подія губиться"""
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            return
+        if agent_id is not None and user_id is not None:
+            coroutine = self.send(user_id, agent_id, event)
+        else:
+            coroutine = self.broadcast(event, topic=topic, user_id=user_id)
+        asyncio.run_coroutine_threadsafe(coroutine, loop)
+
+    @property
+    def connection_count(self) -> int:
+        with self._lock:
+            return sum(len(connections) for connections in self._sessions.values())
+
+
+_chat_hub = ChatHub()
+
+
+def get_chat_hub() -> ChatHub:
+    return _chat_hub
@@ -0,0 +1,155 @@
+"""
+Семантичний кеш відповідей агентів: питання, схоже на вже відповідене
+(косинусна подібність ембеддингів нормованого тексту не менша за
+SEMANTIC_CACHE_THRESHOLD), отримує збережену відповідь без виклику LLM.
+
+Кеш розділений на області: агент + хеш системного промпту і налаштувань
+LLM, тож після зміни промпту старі відповіді не повертаються. Пошук -
+повний перебір NumPy: в області до SEMANTIC_CACHE_MAX_ENTRIES записів, а
+добуток матриці 1000x384 на вектор - десятки мікросекунд.
+
+Кешуються лише агенти без живих даних (SEMANTIC_CACHE_AGENT_TYPES, за
+замовчуванням generic): відповіді про погоду чи повітряний простір швидко
+застарівають. Історія чату в ключ не входить, тому поріг високий. Записи
+живуть SEMANTIC_CACHE_TTL секунд; у повній області витісняються найстаріші.
+"""
+import hashlib
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from backend.core.agents.llm_settings import LLMSettings
+from backend.core.embeddings import embed, normalize_text
+from backend.core.metrics import SEMANTIC_CACHE_ENTRIES, record_cache
+from backend.core.tracing import annotate
+
+SEMANTIC_CACHE_ENABLED = os.getenv("SEMANTIC_CACHE", "false").lower() in ("1", "true", "yes")
+SEMANTIC_CACHE_AGENT_TYPES = frozenset(
+    agent_type.strip() for agent_type in os.getenv("SEMANTIC_CACHE_AGENT_TYPES", "generic").split(",")
+    if agent_type.strip())
+DEFAULT_THRESHOLD = 0.92
+DEFAULT_TTL_SECONDS = 3600.0
+DEFAULT_MAX_ENTRIES = 1000
+
+
+@dataclass
+class _ScopeEntries:
+    vectors: np.ndarray
+    answers: List[str]
+    expires_at: List[float]
+
+
+class SemanticCache:
+
+    def __init__(self, threshold: float = DEFAULT_THRESHOLD, ttl: float = DEFAULT_TTL_SECONDS,
+                 max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._scopes: Dict[str, _ScopeEntries] = {}
+        self._lock = threading.Lock()
+        self._last_purge = time.monotonic()
+
+    @staticmethod
+    def scope_for(agent) -> Optional[str]:
+        """Область кешу для рядка agents або None, якщо агент не кешується"""
+        if not SEMANTIC_CACHE_ENABLED or agent is None or agent.agent_type not in SEMANTIC_CACHE_AGENT_TYPES:
+            return None
+        settings = LLMSettings.from_agent(agent)
+        digest = hashlib.sha1(repr((
+            agent.system_prompt, settings.provider, settings.model_name,
+            settings.temperature, settings.max_tokens,
+        )).encode("utf-8")).hexdigest()[:16]
+        return f"{agent.id}:{digest}"
+
+    def _drop_expired(self, scope: str, entries: _ScopeEntries, now: float) -> None:
+        # Записи додаються в порядку часу, тож прострочені - на початку
+        expired = 0
+        while expired < len(entries.expires_at) and entries.expires_at[expired] <= now:
+            expired += 1
+        if expired:
+            self._drop_oldest(scope, entries, expired)
+
+    def _drop_oldest(self, scope: str, entries: _ScopeEntries, count: int) -> None:
+        entries.vectors = entries.vectors[count:]
+        del entries.answers[:count]
+        del entries.expires_at[:count]
+        if not entries.answers:
+            del self._scopes[scope]
+
+    def _purge(self, now: float) -> None:
+        """Прибирає прострочені записи всіх областей (і області змінених промптів)"""
+        for scope, entries in list(self._scopes.items()):
+            self._drop_expired(scope, entries, now)
+        self._last_purge = now
+
+    def _update_size_metric(self) -> None:
+        SEMANTIC_CACHE_ENTRIES.set(sum(len(entries.answers) for entries in self._scopes.values()))
+
+    def lookup(self, scope: str, question: str) -> Optional[str]:
+        """Збережена відповідь на найсхожіше питання області або None"""
+        text = normalize_text(question)
+        if not text:
+            return None
+        vector = embed([text])[0]
+        answer, similarity = None, 0.0
+        with self._lock:
+            entries = self._scopes.get(scope)
+            if entries is not None:
+                self._drop_expired(scope, entries, time.monotonic())
+                self._update_size_metric()
+                entries = self._scopes.get(scope)
+            if entries is not None:
+                similarities = entries.vectors @ vector
+                best = int(np.argmax(similarities))
+                similarity = float(similarities[best])
+                if similarity >= self.threshold:
+                    answer = entries.answers[best]
+        result = "hit" if answer is not None else "miss"
+        annotate(semantic_cache=result, semantic_similarity=round(similarity, 3))
+        record_cache("semantic", result)
+        return answer
+
+    def store(self, scope: str, question: str, answer: str) -> None:
+        text = normalize_text(question)
+        if not text or not answer:
+            return
+        vector = embed([text])
+        now = time.monotonic()
+        with self._lock:
+            if now - self._last_purge >= self.ttl:
+                self._purge(now)
+            entries = self._scopes.get(scope)
+            if entries is not None:
+                self._drop_expired(scope, entries, now)
+                overflow = len(entries.answers) - self.max_entries + 1
+                if overflow > 0:
+                    self._drop_oldest(scope, entries, overflow)
+            entries = self._scopes.get(scope)
+            if entries is None:
+                self._scopes[scope] = _ScopeEntries(vector, [answer], [now + self.ttl])
+            else:
+                entries.vectors = np.vstack((entries.vectors, vector))
+                entries.answers.append(answer)
+                entries.expires_at.append(now + self.ttl)
+            self._update_size_metric()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._scopes.clear()
+            self._update_size_metric()
+
+
+_semantic_cache = SemanticCache(
+    threshold=float(os.getenv("SEMANTIC_CACHE_THRESHOLD", DEFAULT_THRESHOLD)),
+    ttl=float(os.getenv("SEMANTIC_CACHE_TTL", DEFAULT_TTL_SECONDS)),
+    max_entries=int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", DEFAULT_MAX_ENTRIES)),
+)
+
+
+def get_semantic_cache() -> SemanticCache:
+    return _semantic_cache
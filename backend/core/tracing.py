@@ -0,0 +1,300 @@
+"""
+Трасування запитів: дерево спанів (HTTP запит -> обробка повідомлення ->
+crew.kickoff -> LLM / інструменти -> upstream HTTP, SQL) з таймінгами,
+розмірами даних і ознаками кешу. Поточний спан живе в contextvar, тому
+спани з executor-потоків crewai (run_crew копіює контекст) потрапляють у
+трасу запиту, що їх спричинив. Поза трасою span() нічого не записує -
+фонові heartbeat-и та опитування не створюють шуму.
+
+Кожна завершена траса довша за TRACING_SLOW_MS логується з розбивкою часу
+за типами спанів. Експорт (TRACING_EXPORTER): none, console (лог) або json
+(JSON Lines у TRACING_FILE).
+"""
+import asyncio
+import functools
+import inspect
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+TRACING_EXPORTER = os.getenv("TRACING_EXPORTER", "none").lower()
+TRACING_FILE = os.getenv("TRACING_FILE", "traces.jsonl")
+SLOW_TRACE_MS = float(os.getenv("TRACING_SLOW_MS", 3000))
+MAX_SPANS_PER_TRACE = 2000
+MAX_STATEMENT_CHARS = 300
+SLOWEST_SPANS_IN_REPORT = 5
+
+
+class Trace:
+
+    def __init__(self):
+        self.trace_id = uuid.uuid4().hex
+        self.spans: List["Span"] = []
+        self.dropped = 0
+        self._lock = threading.Lock()
+
+    def add(self, span: "Span") -> None:
+        with self._lock:
+            if len(self.spans) < MAX_SPANS_PER_TRACE:
+                self.spans.append(span)
+            else:
+                self.dropped += 1
+
+
+class Span:
+
+    def __init__(self, name: str, kind: str, trace: Trace, parent: Optional["Span"],
+                 attributes: Dict[str, Any]):
+        self.name = name
+        self.kind = kind
+        self.trace = trace
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent.span_id if parent else None
+        self.attributes = attributes
+        self.status = "ok"
+        self.error: Optional[str] = None
+        self.start_time = time.time()
+        self._started = time.perf_counter()
+        self.duration_ms: Optional[float] = None
+
+    def set(self, **attributes) -> None:
+        self.attributes.update(attributes)
+
+    def fail(self, error: Any) -> None:
+        self.status = "error"
+        self.error = (f"{type(error).__name__}: {error}"
+                      if isinstance(error, BaseException) else str(error))
+
+    def finish(self) -> None:
+        if self.duration_ms is None:
+            self.duration_ms = round((time.perf_counter() - self._started) * 1000, 3)
+            self.trace.add(self)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "kind": self.kind,
+            "start_time": self.start_time,
+            "duration_ms": self.duration_ms,
+            "status": self.status,
+            "error": self.error,
+            "attributes": self.attributes,
+        }
+
+
+_current_span: ContextVar[Optional[Span]] = ContextVar("tracing_current_span", default=None)
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+def annotate(**attributes) -> None:
+    """Додає атрибути до поточного спану (якщо трасування активне)"""
+    span = _current_span.get()
+    if span is not None:
+        span.set(**attributes)
+
+
+def fail_current(error: Any, **attributes) -> None:
+    """Позначає поточний спан помилкою, яку код обробив сам (без винятку назовні)"""
+    span = _current_span.get()
+    if span is not None:
+        span.set(**attributes)
+        span.fail(error)
+
+
+def open_span(name: str, kind: str = "internal", **attributes) -> Optional[Tuple[Span, Any]]:
+    """
+    Відкриває дочірній спан для подій без спільного блоку коду (початок і
+    кінець приходять окремими callback-ами). Закривати через close_span у
+    тому самому контексті.
+    """
+    parent = _current_span.get()
+    if parent is None:
+        return None
+    span = Span(name, kind, parent.trace, parent, attributes)
+    return span, _current_span.set(span)
+
+
+def close_span(handle: Optional[Tuple[Span, Any]], error: Any = None, **attributes) -> None:
+    if handle is None:
+        return
+    span, token = handle
+    span.set(**attributes)
+    if error is not None:
+        span.fail(error)
+    try:
+        _current_span.reset(token)
+    except ValueError:
+        # Закриття прийшло з іншого контексту: спан завершуємо, контекст не чіпаємо
+        pass
+    span.finish()
+
+
+@contextmanager
+def span(name: str, kind: str = "internal", **attributes):
+    """Дочірній спан поточної траси; поза трасою нічого не записує"""
+    handle = open_span(name, kind, **attributes)
+    if handle is None:
+        yield None
+        return
+    error = None
+    try:
+        yield handle[0]
+    except BaseException as e:
+        error = e
+        raise
+    finally:
+        close_span(handle, error=error)
+
+
+@contextmanager
+def start_trace(name: str, kind: str = "server", **attributes):
+    """Кореневий спан нової траси; після завершення траса експортується"""
+    trace = Trace()
+    root = Span(name, kind, trace, None, attributes)
+    token = _current_span.set(root)
+    try:
+        yield root
+    except BaseException as e:
+        root.fail(e)
+        raise
+    finally:
+        _current_span.reset(token)
+        root.finish()
+        _export(trace, root)
+
+
+def traced(name: Optional[str] = None, kind: str = "internal"):
+    """Декоратор: виклик функції (sync або async) - окремий спан"""
+    def decorator(func: Callable) -> Callable:
+        span_name = name or func.__qualname__
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with span(span_name, kind):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(span_name, kind):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def traced_methods(kind: str = "internal"):
+    """Декоратор класу: кожен публічний метод - спан <Клас>.<метод>"""
+    def decorator(cls):
+        for attribute, value in list(vars(cls).items()):
+            if attribute.startswith("_") or not inspect.isfunction(value):
+                continue
+            setattr(cls, attribute, traced(f"{cls.__name__}.{attribute}", kind)(value))
+        return cls
+    return decorator
+
+
+def instrument_engine(engine) -> None:
+    """SQL-спани для кожного запиту через події SQLAlchemy"""
+    from sqlalchemy import event
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if context is None:
+            return
+        context._trace_handle = open_span(
+            "db.query", kind="db", executemany=executemany,
+            statement=" ".join(statement.split())[:MAX_STATEMENT_CHARS])
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        handle = getattr(context, "_trace_handle", None)
+        if handle is not None:
+            context._trace_handle = None
+            close_span(handle, rowcount=cursor.rowcount)
+
+    @event.listens_for(engine, "handle_error")
+    def handle_error(exception_context):
+        context = exception_context.execution_context
+        handle = getattr(context, "_trace_handle", None) if context is not None else None
+        if handle is not None:
+            context._trace_handle = None
+            close_span(handle, error=exception_context.original_exception)
+
+
+def breakdown(trace: Trace) -> Dict[str, Dict[str, float]]:
+    """Сумарний час і кількість спанів за типом (вкладені спани рахуються в обох типах)"""
+    totals: Dict[str, Dict[str, float]] = {}
+    for item in trace.spans:
+        if item.parent_id is None:
+            continue
+        entry = totals.setdefault(item.kind, {"count": 0, "total_ms": 0.0})
+        entry["count"] += 1
+        entry["total_ms"] = round(entry["total_ms"] + (item.duration_ms or 0), 3)
+    return totals
+
+
+_export_lock = threading.Lock()
+
+
+def _export(trace: Trace, root: Span) -> None:
+    try:
+        if root.duration_ms >= SLOW_TRACE_MS:
+            parts = ", ".join(f"{kind} {entry['total_ms']:.0f} ms ({entry['count']})"
+                              for kind, entry in sorted(breakdown(trace).items(),
+                                                        key=lambda item: -item[1]["total_ms"]))
+            slowest = sorted((s for s in trace.spans if s is not root),
+                             key=lambda s: -(s.duration_ms or 0))[:SLOWEST_SPANS_IN_REPORT]
+            logger.warning(
+                f"Slow {root.name} {root.duration_ms:.0f} ms [trace {trace.trace_id}]: {parts}; "
+                "slowest: " + "; ".join(f"{s.name} {s.duration_ms:.0f} ms" for s in slowest))
+
+        if TRACING_EXPORTER == "console":
+            logger.info(_format_tree(trace, root))
+        elif TRACING_EXPORTER == "json":
+            record = {
+                "trace_id": trace.trace_id,
+                "name": root.name,
+                "duration_ms": root.duration_ms,
+                "status": root.status,
+                "breakdown": breakdown(trace),
+                "dropped_spans": trace.dropped,
+                "spans": [s.to_dict() for s in trace.spans],
+            }
+            line = json.dumps(record, ensure_ascii=False, default=str)
+            with _export_lock, open(TRACING_FILE, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+    except Exception as e:
+        logger.warning(f"Trace export failed: {e}")
+
+
+def _format_tree(trace: Trace, root: Span) -> str:
+    children: Dict[Optional[str], List[Span]] = {}
+    for s in trace.spans:
+        children.setdefault(s.parent_id, []).append(s)
+
+    lines = [f"Trace {trace.trace_id}"]
+
+    def walk(node: Span, depth: int) -> None:
+        attributes = " ".join(f"{key}={value}" for key, value in node.attributes.items()
+                              if key != "statement")
+        error = f" ERROR {node.error}" if node.error else ""
+        lines.append(f"{'  ' * depth}{node.name} [{node.kind}] {node.duration_ms:.1f} ms "
+                     f"{attributes}{error}".rstrip())
+        for child in sorted(children.get(node.span_id, []), key=lambda s: s.start_time):
+            walk(child, depth + 1)
+
+    walk(root, 0)
+    return "\n".join(lines)
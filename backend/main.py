@@ -1,7 +1,9 @@
 import os
+import time
 from fastapi import FastAPI, Depends, Request
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import HTMLResponse
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import HTMLResponse, PlainTextResponse
 from fastapi.templating import Jinja2Templates
 from sqlalchemy.orm import Session
 
@@ -9,9 +11,32 @@ from backend.api.routes.text import router as text_router
 from backend.api.routes.agents import router as agent_router
 from backend.api.routes.tasks import router as task_router
 from backend.api.routes.chats import router as chat_router
+from backend.api.routes.jobs import router as job_router
+from backend.api.routes.usage import router as usage_router
 from backend.utils.logging import setup_logging
-from backend.config.database import SessionLocal
+from backend.config.database import SessionLocal, engine
 from backend.core.managers.user_manager import UserManager
+from backend.core.jobs.airspace_recorder import create_recorder_from_env
+from backend.core.jobs.chat_compactor import create_compactor_from_env
+from backend.core.jobs.worker import get_worker_pool
+from backend.core.chat_service import get_write_behind
+from backend.core.chat_memory import get_chat_memory
+from backend.core.agent_cache import get_agent_cache
+from backend.core.tracing import instrument_engine, start_trace
+from backend.core.metrics import (
+    HTTP_IN_PROGRESS,
+    HTTP_REQUESTS,
+    HTTP_REQUEST_SECONDS,
+    collect_upstreams,
+    instrument_pool,
+    render_metrics,
+)
+from backend.clients.transport import get_transport
+
+try:
+    from brotli_asgi import BrotliMiddleware
+except ImportError:
+    BrotliMiddleware = None
 
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -34,18 +59,95 @@ def get_user_manager(db: Session = Depends(get_db)) -> UserManager:
 
 
 setup_logging()
+instrument_engine(engine)
+instrument_pool(engine)
+collect_upstreams(get_transport().stats)
 app = FastAPI()
+airspace_recorder = create_recorder_from_env()
+chat_compactor = create_compactor_from_env()
+
+
+@app.middleware("http")
+async def trace_api_requests(request: Request, call_next):
+    """Кожен запит до API - окрема траса (статика і сторінки не трасуються)"""
+    if not request.url.path.startswith("/api/"):
+        return await call_next(request)
+    with start_trace(f"{request.method} {request.url.path}", kind="server",
+                     method=request.method, path=request.url.path) as root:
+        response = await call_next(request)
+        root.set(status_code=response.status_code,
+                 response_bytes=int(response.headers.get("content-length", 0) or 0))
+        if response.status_code >= 500:
+            root.status = "error"
+        response.headers["X-Trace-Id"] = root.trace.trace_id
+        return response
+
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    """Затримка і статуси API за шаблоном маршруту (не за конкретним шляхом)"""
+    if not request.url.path.startswith("/api/"):
+        return await call_next(request)
+    started = time.perf_counter()
+    status = 500
+    HTTP_IN_PROGRESS.inc()
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        HTTP_IN_PROGRESS.dec()
+        route = getattr(request.scope.get("route"), "path", "unmatched")
+        HTTP_REQUESTS.inc(method=request.method, route=route, status=status)
+        HTTP_REQUEST_SECONDS.observe(time.perf_counter() - started,
+                                     method=request.method, route=route)
+
+# Відповіді агентів - великі HTML блоки, тому стискаємо все понад 1 КБ
+# (brotli, якщо встановлено brotli-asgi, інакше gzip)
+if BrotliMiddleware:
+    app.add_middleware(BrotliMiddleware, minimum_size=1024, gzip_fallback=True)
+else:
+    app.add_middleware(GZipMiddleware, minimum_size=1024)
 
 app.include_router(text_router, prefix="/api/v1")
 app.include_router(agent_router, prefix="/api/v1")
 app.include_router(task_router, prefix="/api/v1")
 app.include_router(chat_router, prefix="/api/v1")
+app.include_router(job_router, prefix="/api/v1")
+app.include_router(usage_router, prefix="/api/v1")
 
 current_dir = os.path.dirname(os.path.abspath(__file__))
 static_dir = os.path.join(current_dir, "..", "frontend", "static")
 app.mount("/static", StaticFiles(directory=static_dir), name="static")
 
 
+@app.on_event("startup")
+async def start_background_jobs():
+    get_worker_pool().start()
+    get_agent_cache().start_listener()
+    if airspace_recorder:
+        airspace_recorder.start()
+    if chat_compactor:
+        chat_compactor.start()
+
+
+@app.on_event("shutdown")
+async def stop_background_jobs():
+    get_worker_pool().stop()
+    get_write_behind().stop()
+    get_chat_memory().stop()
+    get_agent_cache().stop_listener()
+    if airspace_recorder:
+        airspace_recorder.stop()
+    if chat_compactor:
+        chat_compactor.stop()
+
+
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def get_metrics():
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+
 @app.get("/", response_class=HTMLResponse)
 async def get_root(request: Request):
     return templates.TemplateResponse("main.html", {"request": request})
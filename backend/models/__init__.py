@@ -1,3 +1,9 @@
 from backend.config.database import Base
 from backend.models.user import User
-from backend.models.chat_history import ChatHistory
+from backend.models.chat_history import ChatHistory, ChatHistoryArchive
+from backend.models.airspace_snapshot import AirspaceSnapshot
+from backend.models.aircraft_photo import AircraftPhoto
+from backend.models.job import Job
+from backend.models.llm_usage import LLMUsage
+from backend.models.chat_memory import ChatMessageEmbedding
+from backend.models.chat_summary import ChatSummary
@@ -1,5 +1,5 @@
 import uuid
-from sqlalchemy import Column, String, Float, Boolean
+from sqlalchemy import Column, String, Float, Boolean, Integer
 from sqlalchemy.dialects.postgresql import UUID
 from backend.config.database import Base
 
@@ -12,3 +12,8 @@ class Agent(Base):
     system_prompt = Column(String, nullable=True)
     agent_type = Column(String, nullable=False, default="Generic")  # Generic\Specific
     temperature = Column(Float, nullable=False, default=0.8)
+    # Порожні - значення за замовчуванням (див. backend.core.agents.llm_settings)
+    llm_provider = Column(String, nullable=True)  # openai\local\fake
+    model = Column(String, nullable=True)
+    max_tokens = Column(Integer, nullable=True)
+    timeout = Column(Float, nullable=True)  # секунди на один LLM-запит
@@ -0,0 +1,18 @@
+from sqlalchemy import Column, String, DateTime, Boolean
+from backend.config.database import Base
+
+
+class AircraftPhoto(Base):
+    """Cached planespotters photo metadata for an aircraft (including "no photo" results)"""
+    __tablename__ = "aircraft_photos"
+
+    hex_code = Column(String, primary_key=True)
+    has_photo = Column(Boolean, nullable=False, default=False)
+    thumbnail_url = Column(String, nullable=True)
+    link = Column(String, nullable=True)
+    photographer = Column(String, nullable=True)
+    local_path = Column(String, nullable=True)
+    etag = Column(String, nullable=True)
+    last_modified = Column(String, nullable=True)
+    fetched_at = Column(DateTime, nullable=False)
+    expires_at = Column(DateTime, nullable=False)
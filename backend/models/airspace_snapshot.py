@@ -0,0 +1,19 @@
+from sqlalchemy import Column, String, DateTime, Integer
+from backend.config.database import Base
+
+
+class AirspaceSnapshot(Base):
+    """Pre-aggregated per-country airspace counters for a single time bucket"""
+    __tablename__ = "airspace_snapshots"
+
+    country = Column(String, primary_key=True)
+    resolution = Column(String, primary_key=True)  # 1m \ 1h \ 1d
+    bucket_start = Column(DateTime, primary_key=True)
+
+    samples = Column(Integer, nullable=False, default=0)
+    total_sum = Column(Integer, nullable=False, default=0)
+    total_max = Column(Integer, nullable=False, default=0)
+    active_sum = Column(Integer, nullable=False, default=0)
+    ground_sum = Column(Integer, nullable=False, default=0)
+    high_altitude_sum = Column(Integer, nullable=False, default=0)
+    max_density = Column(Integer, nullable=False, default=0)
@@ -1,6 +1,6 @@
 import uuid
 from datetime import datetime
-from sqlalchemy import Column, Enum, String, DateTime, ForeignKey
+from sqlalchemy import BigInteger, Column, Enum, String, DateTime, ForeignKey, Identity, Index
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 from backend.config.database import Base
@@ -23,6 +23,37 @@ class ChatHistory(Base):
     message_text = Column(String, nullable=True)
     message_image = Column(String, nullable=True)
     was_sent = Column(DateTime, default=datetime.utcnow)
+    # Порядок запису на сервері: курсор синхронізації (was_sent задає клієнт)
+    seq = Column(BigInteger, Identity(), nullable=False)
 
     user = relationship("User", backref="chat_history")
     agent = relationship("Agent", backref="chat_history")
+
+    __table_args__ = (
+        Index("ix_chat_history_user_agent_was_sent", "user_id", "agent_id", "was_sent"),
+        Index("ix_chat_history_user_agent_seq", "user_id", "agent_id", "seq"),
+    )
+
+
+class ChatHistoryArchive(Base):
+    """
+    Холодний шар історії: повідомлення, старші за поріг архівації,
+    переносяться сюди фоновою компакцією (backend.core.jobs.chat_compactor).
+    Їхній зміст для агента - підсумок у chat_summaries.
+    """
+    __tablename__ = "chat_history_archive"
+
+    id = Column(UUID(as_uuid=True), primary_key=True)
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
+    agent_id = Column(UUID(as_uuid=True), ForeignKey("agents.id"), nullable=True)
+    message_type = Column(Enum(MessageType), nullable=False)
+    sender = Column(String, nullable=True)
+    message_text = Column(String, nullable=True)
+    message_image = Column(String, nullable=True)
+    was_sent = Column(DateTime, nullable=True)
+    archived_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index("ix_chat_history_archive_user_agent_was_sent", "user_id", "agent_id", "was_sent"),
+    )
+
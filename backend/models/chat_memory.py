@@ -0,0 +1,24 @@
+from datetime import datetime
+from sqlalchemy import Column, String, DateTime, ForeignKey, Index, LargeBinary
+from sqlalchemy.dialects.postgresql import UUID
+from backend.config.database import Base
+
+
+class ChatMessageEmbedding(Base):
+    """
+    Ембеддинг повідомлення chat_history для пошуку релевантної історії
+    (float32, нормований). message_id без FK: рядки пише фоновий
+    індексатор, незалежно від write-behind черги повідомлень.
+    """
+    __tablename__ = "chat_message_embeddings"
+
+    message_id = Column(UUID(as_uuid=True), primary_key=True)
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
+    agent_id = Column(UUID(as_uuid=True), ForeignKey("agents.id"), nullable=True)
+    model = Column(String, nullable=False)
+    embedding = Column(LargeBinary, nullable=False)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index("ix_chat_message_embeddings_user_agent_created_at", "user_id", "agent_id", "created_at"),
+    )
@@ -0,0 +1,26 @@
+import uuid
+from datetime import datetime
+from sqlalchemy import Column, String, DateTime, ForeignKey, Integer, UniqueConstraint
+from sqlalchemy.dialects.postgresql import UUID
+from backend.config.database import Base
+
+
+class ChatSummary(Base):
+    """
+    Підсумок архівованої частини чату (user, agent). version зростає з
+    кожною компакцією - паралельні компактори не перезаписують одне одного.
+    """
+    __tablename__ = "chat_summaries"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
+    agent_id = Column(UUID(as_uuid=True), ForeignKey("agents.id"), nullable=True)
+    summary = Column(String, nullable=False)
+    archived_messages = Column(Integer, nullable=False, default=0)
+    summarized_until = Column(DateTime, nullable=True)  # was_sent останнього архівованого
+    version = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__ = (
+        UniqueConstraint("user_id", "agent_id", name="uq_chat_summaries_user_agent"),
+    )
@@ -0,0 +1,29 @@
+import uuid
+from datetime import datetime
+from sqlalchemy import Column, String, DateTime, ForeignKey, Index, Integer, JSON
+from sqlalchemy.dialects.postgresql import UUID
+from backend.config.database import Base
+
+
+class Job(Base):
+    """Background job (queue row + stored result)"""
+    __tablename__ = "jobs"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
+    agent_id = Column(UUID(as_uuid=True), ForeignKey("agents.id"), nullable=True)
+    kind = Column(String, nullable=False)
+    status = Column(String, nullable=False, default="queued")  # queued \ running \ cancelling \ succeeded \ failed \ cancelled
+    payload = Column(JSON, nullable=False, default=dict)
+    result = Column(String, nullable=True)
+    error = Column(String, nullable=True)
+    attempts = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+    heartbeat_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index("ix_jobs_status_created_at", "status", "created_at"),
+        Index("ix_jobs_user_id_status", "user_id", "status"),
+    )
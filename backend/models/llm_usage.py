@@ -0,0 +1,37 @@
+import uuid
+from datetime import datetime
+from sqlalchemy import Column, String, DateTime, ForeignKey, Index, Integer
+from sqlalchemy.dialects.postgresql import UUID
+from backend.config.database import Base
+
+
+class LLMUsage(Base):
+    """
+    Облік LLM на одне повідомлення: токени, виклики, інструменти і списані монети.
+    chat_message_id посилається на chat_history без FK: журнал витрат
+    переживає очищення історії і пишеться незалежно від write-behind
+    черги повідомлень.
+    """
+    __tablename__ = "llm_usage"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    chat_message_id = Column(UUID(as_uuid=True), nullable=False)
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
+    agent_id = Column(UUID(as_uuid=True), ForeignKey("agents.id"), nullable=True)
+    agent_type = Column(String, nullable=False)
+    model = Column(String, nullable=True)
+    prompt_chars = Column(Integer, nullable=False, default=0)
+    prompt_tokens = Column(Integer, nullable=False, default=0)
+    cached_prompt_tokens = Column(Integer, nullable=False, default=0)
+    completion_tokens = Column(Integer, nullable=False, default=0)
+    llm_requests = Column(Integer, nullable=False, default=0)
+    tool_calls = Column(Integer, nullable=False, default=0)
+    duration_ms = Column(Integer, nullable=False, default=0)
+    coins = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index("ix_llm_usage_chat_message_id", "chat_message_id"),
+        Index("ix_llm_usage_user_id_created_at", "user_id", "created_at"),
+        Index("ix_llm_usage_agent_id_created_at", "agent_id", "created_at"),
+    )
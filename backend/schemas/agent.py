@@ -0,0 +1,20 @@
+from typing import Literal, Optional
+from pydantic import BaseModel, Field
+
+
+class AgentLLMSettingsUpdate(BaseModel):
+    """Передані поля змінюються; null скидає поле до значення за замовчуванням"""
+    llm_provider: Optional[Literal["openai", "local", "fake"]] = None
+    model: Optional[str] = Field(None, min_length=1)
+    temperature: Optional[float] = Field(None, ge=0, le=2)
+    max_tokens: Optional[int] = Field(None, ge=1)
+    timeout: Optional[float] = Field(None, gt=0)
+
+
+class AgentLLMSettingsResponse(BaseModel):
+    id: str
+    llm_provider: str
+    model: str
+    temperature: float
+    max_tokens: Optional[int] = None
+    timeout: Optional[float] = None
@@ -1,7 +1,7 @@
 from datetime import datetime
 from uuid import UUID
-from typing import Optional
-from pydantic import BaseModel
+from typing import List, Literal, Optional
+from pydantic import BaseModel, Field
 from enum import Enum
 
 
@@ -17,6 +17,21 @@ class ChatMessageCreate(BaseModel):
     message_text: Optional[str] = None
     message_image: Optional[str] = None
     was_sent: datetime
+    sender: Optional[str] = None
+
+
+class ChatMessageBulkItem(ChatMessageCreate):
+    # Інакше один рядок з іншим sender ламає ChatMessageResponse для всього чату
+    sender: Literal["USER", "AGENT"]
+
+
+class ChatMessageBulkCreate(BaseModel):
+    messages: List[ChatMessageBulkItem] = Field(..., max_length=10000)
+
+
+class ChatMessageBulkResponse(BaseModel):
+    ids: List[UUID]
+    count: int
 
 
 class ChatMessageResponse(BaseModel):
@@ -33,6 +48,16 @@ class ChatMessageResponse(BaseModel):
         from_attributes = True
 
 
+class ChatSummaryResponse(BaseModel):
+    summary: str
+    archived_messages: int
+    summarized_until: Optional[datetime]
+    updated_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
 class ChatQuery(BaseModel):
     user_id: UUID
     agent_id: UUID
@@ -70,3 +95,4 @@ class MessageResponse(BaseModel):
     agent_id: str
     user_id: str
     ai_response: Optional[str] = None
+    job_id: Optional[str] = None
@@ -0,0 +1,91 @@
+"""
+Запуск backend.main:app для load-тесту. Перед імпортом застосунку всі
+зовнішні URL HttpTransport переписуються на stub (LOADTEST_STUB_URL), а
+пул з'єднань БД обгортається заміром часу очікування checkout. Статистика
+пулу і транспорту доступна на GET /__loadtest/stats, скидання - POST
+/__loadtest/reset. Раннер запускає його окремим процесом:
+
+    python -m uvicorn benchmarks.loadtest.app_server:app --port 8100
+"""
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict
+from urllib.parse import urlsplit
+
+from backend.clients.transport import HttpTransport, get_transport
+from backend.config.database import engine
+from benchmarks.loadtest.stats import summarize
+
+STUB_URL = os.environ.get("LOADTEST_STUB_URL", "").rstrip("/")
+LOCAL_HOSTS = {"127.0.0.1", "localhost"}
+MAX_SAMPLES = 200_000
+
+
+def _redirect_to_stub() -> None:
+    # Підміна на рівні однієї спроби: політики, статистика і hedging
+    # HttpTransport лишаються прив'язаними до справжнього хоста апстріму
+    original_send = HttpTransport._send
+
+    def send(self, host, endpoint, method, url, timeout, kwargs):
+        parts = urlsplit(url)
+        if STUB_URL and parts.hostname not in LOCAL_HOSTS:
+            url = f"{STUB_URL}/{parts.netloc}{parts.path}" + (f"?{parts.query}" if parts.query else "")
+        return original_send(self, host, endpoint, method, url, timeout, kwargs)
+
+    HttpTransport._send = send
+
+
+class PoolProbe:
+    """Замір очікування з'єднання з пулу SQLAlchemy (QueuePool._do_get)"""
+
+    def __init__(self, pool):
+        self.pool = pool
+        self.waits: Deque[float] = deque(maxlen=MAX_SAMPLES)
+        self.timeouts = 0
+        self._lock = threading.Lock()
+        original_get = pool._do_get
+
+        def timed_get():
+            started = time.perf_counter()
+            try:
+                return original_get()
+            except Exception:
+                with self._lock:
+                    self.timeouts += 1
+                raise
+            finally:
+                self.waits.append(time.perf_counter() - started)
+
+        pool._do_get = timed_get
+
+    def reset(self) -> None:
+        with self._lock:
+            self.waits.clear()
+            self.timeouts = 0
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "checkout_wait": summarize(list(self.waits)),
+            "timeouts": self.timeouts,
+            "status": self.pool.status(),
+        }
+
+
+_redirect_to_stub()
+pool_probe = PoolProbe(engine.pool)
+
+from backend.main import app  # noqa: E402  (після патчів транспорту і пулу)
+
+
+@app.get("/__loadtest/stats", include_in_schema=False)
+async def loadtest_stats():
+    return {"pid": os.getpid(), "db_pool": pool_probe.stats(), "transport": get_transport().stats()}
+
+
+@app.post("/__loadtest/reset", include_in_schema=False)
+async def loadtest_reset():
+    pool_probe.reset()
+    return {"pid": os.getpid()}
+
@@ -0,0 +1,184 @@
+"""
+Генератор навантаження: N віртуальних користувачів паралельно виконують
+операції /api/v1 у пропорціях mix, поки не мине duration або не буде
+виконано requests запитів. Як і фронтенд, /get_chat і /all_agents
+перевалідовуються через If-None-Match, а /get_chat дочитує лише нові
+повідомлення через since.
+"""
+import asyncio
+import random
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+
+from benchmarks.loadtest.stats import summarize
+
+OPERATIONS = ("send", "get_chat", "add_message", "all_agents")
+DEFAULT_MIX = {"send": 1, "get_chat": 4, "add_message": 2, "all_agents": 3}
+
+
+def parse_mix(value: str) -> Dict[str, int]:
+    """'send=1,get_chat=4' -> {'send': 1, 'get_chat': 4}"""
+    mix = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in OPERATIONS:
+            raise ValueError(f"Unknown operation '{name}', expected one of {', '.join(OPERATIONS)}")
+        mix[name] = int(weight or 1)
+    return {name: weight for name, weight in mix.items() if weight > 0}
+
+
+@dataclass
+class Sample:
+    operation: str
+    status: int
+    latency: float
+    error: Optional[str] = None
+
+
+@dataclass
+class VirtualUser:
+    user_id: str
+    agent_ids: List[str]
+    rng: random.Random
+    chat_etags: Dict[str, str] = field(default_factory=dict)
+    chat_cursors: Dict[str, str] = field(default_factory=dict)
+    agents_etag: Optional[str] = None
+
+
+class LoadDriver:
+
+    def __init__(self, base_url: str, user_ids: List[str], agent_ids: List[str],
+                 prompts: List[str], concurrency: int = 10, mix: Optional[Dict[str, int]] = None,
+                 revalidate: bool = True, timeout: float = 120.0, seed: int = 1):
+        self.base_url = base_url.rstrip("/")
+        self.user_ids = user_ids
+        self.agent_ids = agent_ids
+        self.prompts = prompts
+        self.concurrency = concurrency
+        self.mix = mix or DEFAULT_MIX
+        self.revalidate = revalidate
+        self.timeout = timeout
+        self.seed = seed
+        self.samples: List[Sample] = []
+
+    async def _call(self, client: httpx.AsyncClient, operation: str, user: VirtualUser) -> Sample:
+        agent_id = user.rng.choice(self.agent_ids)
+        headers: Dict[str, str] = {}
+        started = time.perf_counter()
+        try:
+            if operation == "send":
+                response = await client.post("/api/v1/send", json={
+                    "user_id": user.user_id,
+                    "agent_id": agent_id,
+                    "message_type": "TEXT",
+                    "text": user.rng.choice(self.prompts),
+                    "was_sent": datetime.now().isoformat(),
+                })
+            elif operation == "add_message":
+                response = await client.post("/api/v1/add_message", json={
+                    "user_id": user.user_id,
+                    "agent_id": agent_id,
+                    "message_type": "TEXT",
+                    "message_text": user.rng.choice(self.prompts),
+                    "was_sent": datetime.now().isoformat(),
+                    "sender": "USER",
+                })
+            elif operation == "get_chat":
+                params = {"user_id": user.user_id, "agent_id": agent_id}
+                if self.revalidate:
+                    if agent_id in user.chat_etags:
+                        headers["If-None-Match"] = user.chat_etags[agent_id]
+                    if agent_id in user.chat_cursors:
+                        params["since"] = user.chat_cursors[agent_id]
+                response = await client.get("/api/v1/get_chat", params=params, headers=headers)
+                if response.status_code == 200:
+                    if "etag" in response.headers:
+                        user.chat_etags[agent_id] = response.headers["etag"]
+                    if "x-chat-cursor" in response.headers:
+                        user.chat_cursors[agent_id] = response.headers["x-chat-cursor"]
+            else:
+                if self.revalidate and user.agents_etag:
+                    headers["If-None-Match"] = user.agents_etag
+                response = await client.get("/api/v1/all_agents", headers=headers)
+                if response.status_code == 200 and "etag" in response.headers:
+                    user.agents_etag = response.headers["etag"]
+            # Тіло дочитується всередині заміру: latency включає передачу відповіді
+            await response.aread()
+            latency = time.perf_counter() - started
+            error = None if response.status_code < 400 else response.text[:200]
+            return Sample(operation, response.status_code, latency, error)
+        except httpx.HTTPError as e:
+            return Sample(operation, 0, time.perf_counter() - started, f"{type(e).__name__}: {e}")
+
+    async def _user_loop(self, client: httpx.AsyncClient, user: VirtualUser,
+                         deadline: Optional[float], budget: List[int],
+                         record: List[Sample]) -> None:
+        operations, weights = zip(*self.mix.items())
+        while True:
+            if deadline is not None and time.perf_counter() >= deadline:
+                return
+            if budget[0] == 0:
+                return
+            if budget[0] > 0:
+                budget[0] -= 1
+            operation = user.rng.choices(operations, weights=weights)[0]
+            record.append(await self._call(client, operation, user))
+
+    async def run(self, duration: Optional[float] = None, requests: Optional[int] = None,
+                  warmup: float = 0.0, on_warmup_done=None) -> Tuple[List[Sample], float]:
+        """
+        Виконує прогін і повертає (samples, elapsed). Запити під час warmup
+        не потрапляють у результат; після нього викликається on_warmup_done.
+        """
+        limits = httpx.Limits(max_connections=self.concurrency,
+                              max_keepalive_connections=self.concurrency)
+        async with httpx.AsyncClient(base_url=self.base_url, timeout=self.timeout,
+                                     limits=limits) as client:
+            users = [
+                VirtualUser(
+                    user_id=self.user_ids[index % len(self.user_ids)],
+                    agent_ids=self.agent_ids,
+                    rng=random.Random(self.seed * 1000 + index),
+                )
+                for index in range(self.concurrency)
+            ]
+
+            if warmup:
+                discarded: List[Sample] = []
+                deadline = time.perf_counter() + warmup
+                await asyncio.gather(*(self._user_loop(client, user, deadline, [-1], discarded)
+                                       for user in users))
+                if on_warmup_done:
+                    await on_warmup_done(client)
+
+            samples: List[Sample] = []
+            started = time.perf_counter()
+            deadline = started + duration if duration else None
+            budget = [requests if requests else -1]
+            await asyncio.gather(*(self._user_loop(client, user, deadline, budget, samples)
+                                   for user in users))
+            return samples, time.perf_counter() - started
+
+
+def build_report(samples: List[Sample], elapsed: float) -> Dict[str, Any]:
+    """Латентність і пропускна здатність по кожній операції та загалом"""
+    report: Dict[str, Any] = {"elapsed_s": round(elapsed, 2), "operations": {}}
+    for operation in OPERATIONS:
+        selected = [sample for sample in samples if sample.operation == operation]
+        if not selected:
+            continue
+        errors = [sample for sample in selected if sample.error]
+        summary = summarize([sample.latency for sample in selected], elapsed)
+        summary["errors"] = len(errors)
+        summary["not_modified"] = sum(1 for sample in selected if sample.status == 304)
+        if errors:
+            summary["first_error"] = f"{errors[0].status}: {errors[0].error}"
+        report["operations"][operation] = summary
+    report["total"] = summarize([sample.latency for sample in samples], elapsed)
+    report["total"]["errors"] = sum(1 for sample in samples if sample.error)
+    return report
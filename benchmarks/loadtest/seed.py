@@ -0,0 +1,42 @@
+"""Тестові користувачі та агенти для load-тесту (повторний запуск перевикористовує їх)"""
+from typing import List
+
+import backend.models  # noqa: F401  (реєструє всі моделі для зв'язків ORM)
+from backend.core.managers.agent_manager import AgentManagerContext
+from backend.core.managers.chat_manager import ChatManagerContext
+from backend.core.managers.user_manager import UserManagerContext
+
+USER_EMAIL = "loadtest-{index}@example.com"
+AGENT_NAME = "loadtest-{agent_type}"
+AGENT_PROMPT = "Ти - агент для навантажувального тестування. Відповідай коротко."
+
+
+def ensure_users(count: int) -> List[str]:
+    user_ids = []
+    with UserManagerContext() as user_manager:
+        for index in range(count):
+            email = USER_EMAIL.format(index=index)
+            user = user_manager.get_user_by_email(email) or user_manager.create_user(email)
+            user_ids.append(str(user.id))
+    return user_ids
+
+
+def ensure_agents(agent_types: List[str]) -> List[str]:
+    agent_ids = []
+    with AgentManagerContext() as agent_manager:
+        for agent_type in agent_types:
+            if agent_type not in agent_manager.agents:
+                raise ValueError(f"Unknown agent type '{agent_type}', "
+                                 f"expected one of {', '.join(agent_manager.agents)}")
+            name = AGENT_NAME.format(agent_type=agent_type)
+            agent = (agent_manager.get_agent_by_name(name)
+                     or agent_manager.create_agent(name, AGENT_PROMPT, agent_type))
+            agent_ids.append(str(agent.id))
+    return agent_ids
+
+
+def clear_history(user_ids: List[str], agent_ids: List[str]) -> None:
+    with ChatManagerContext() as chat_manager:
+        for user_id in user_ids:
+            for agent_id in agent_ids:
+                chat_manager.clear_chat_history(user_id=user_id, agent_id=agent_id)
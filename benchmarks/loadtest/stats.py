@@ -0,0 +1,31 @@
+"""Агрегація латентностей для звітів бенчмарків"""
+import math
+from typing import Any, Dict, List, Optional, Sequence
+
+
+def percentile(sorted_values: Sequence[float], q: float) -> Optional[float]:
+    """Перцентиль за методом nearest-rank; значення мають бути відсортовані"""
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(q / 100.0 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def summarize(latencies: List[float], elapsed: Optional[float] = None) -> Dict[str, Any]:
+    """count/mean/p50/p95/p99/max у мілісекундах і пропускна здатність (запитів/с)"""
+    values = sorted(latencies)
+
+    def ms(value: Optional[float]) -> Optional[float]:
+        return round(value * 1000, 2) if value is not None else None
+
+    summary = {
+        "count": len(values),
+        "mean_ms": ms(sum(values) / len(values)) if values else None,
+        "p50_ms": ms(percentile(values, 50)),
+        "p95_ms": ms(percentile(values, 95)),
+        "p99_ms": ms(percentile(values, 99)),
+        "max_ms": ms(values[-1]) if values else None,
+    }
+    if elapsed:
+        summary["throughput_rps"] = round(len(values) / elapsed, 2)
+    return summary
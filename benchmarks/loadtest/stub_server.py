@@ -0,0 +1,209 @@
+"""
+Локальний stub для load-тестів, без мережі і без витрат на API:
+
+- OpenAI-сумісний POST /v1/chat/completions (звичайний і stream). crewai
+  перетворює ChatOpenAI агентів на LLM через litellm, тож фейкова модель -
+  це endpoint, на який вказує OPENAI_BASE_URL. Відповіді сценарні: якщо в
+  промпті є інструмент зі сценарію (fixtures/llm_script.json), спочатку
+  повертається Action з його аргументами, після Observation - Final Answer.
+- Записані відповіді OpenSky / Windy / WeatherAPI / planespotters / airportdb
+  (fixtures/upstreams.json). Апстрім адресується як /<host>/<path>;
+  app_server переписує на цей префікс URL-и HttpTransport.
+"""
+import json
+import os
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+TOOL_NAME_PATTERN = re.compile(r"Tool Name: ([\w\-]+)")
+STREAM_CHUNK_CHARS = 24
+
+
+def load_fixture(name: str) -> Any:
+    with open(os.path.join(FIXTURES_DIR, name), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _message_text(message: Dict[str, Any]) -> str:
+    content = message.get("content") or ""
+    if isinstance(content, list):
+        return "".join(part.get("text", "") for part in content if isinstance(part, dict))
+    return content
+
+
+class FakeLLM:
+    """Сценарна модель у форматі ReAct, який парсить crewai"""
+
+    def __init__(self, script: Dict[str, Any], tool_calls: bool = True):
+        self.final_answer = script["final_answer"]
+        self.actions = script.get("actions", {}) if tool_calls else {}
+
+    def reply(self, messages: List[Dict[str, Any]]) -> str:
+        already_acted = any(
+            message.get("role") == "assistant" and "Action:" in _message_text(message)
+            for message in messages
+        )
+        if not already_acted:
+            prompt = "\n".join(_message_text(message) for message in messages)
+            for tool_name in TOOL_NAME_PATTERN.findall(prompt):
+                if tool_name in self.actions:
+                    return (
+                        "Thought: I need fresh data for this question\n"
+                        f"Action: {tool_name}\n"
+                        f"Action Input: {json.dumps(self.actions[tool_name], ensure_ascii=False)}"
+                    )
+        return f"Thought: I now know the final answer\nFinal Answer: {self.final_answer}"
+
+
+class StubState:
+    def __init__(self, llm: FakeLLM, upstreams: Dict[str, Any],
+                 llm_latency: float, upstream_latency: float):
+        self.llm = llm
+        # Найдовший префікс виграє: api/states/all не перекриється коротшим api/
+        self.upstreams = sorted(upstreams.items(), key=lambda item: len(item[0]), reverse=True)
+        self.llm_latency = llm_latency
+        self.upstream_latency = upstream_latency
+        self.counters: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def count(self, key: str) -> None:
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + 1
+
+    def find_upstream(self, path: str) -> Optional[Tuple[str, Any]]:
+        key = path.strip("/")
+        for prefix, body in self.upstreams:
+            if key == prefix or key.startswith(prefix + "/"):
+                return prefix, body
+        return None
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: "StubServer"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _read_body(self) -> bytes:
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length) if length else b""
+
+    def _send_json(self, status: int, payload: Any) -> None:
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        self._serve_upstream()
+
+    def do_POST(self):
+        path = urlsplit(self.path).path
+        if path.rstrip("/").endswith("/chat/completions"):
+            self._serve_completion()
+        else:
+            self._read_body()
+            self._serve_upstream()
+
+    def _serve_upstream(self) -> None:
+        state = self.server.state
+        match = state.find_upstream(urlsplit(self.path).path)
+        if match is None:
+            state.count("upstream:404")
+            self._send_json(404, {"error": {"message": f"No fixture for {self.path}"}})
+            return
+        prefix, body = match
+        state.count(f"upstream:{prefix}")
+        if state.upstream_latency:
+            time.sleep(state.upstream_latency)
+        self._send_json(200, body)
+
+    def _serve_completion(self) -> None:
+        state = self.server.state
+        request = json.loads(self._read_body() or b"{}")
+        messages = request.get("messages", [])
+        text = state.llm.reply(messages)
+        state.count("llm:completion")
+        if state.llm_latency:
+            time.sleep(state.llm_latency)
+
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+        model = request.get("model", "gpt-4o")
+        prompt_tokens = sum(len(_message_text(message)) for message in messages) // 4
+        usage = {"prompt_tokens": prompt_tokens, "completion_tokens": len(text) // 4,
+                 "total_tokens": prompt_tokens + len(text) // 4}
+
+        if not request.get("stream"):
+            self._send_json(200, {
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "finish_reason": "stop",
+                             "message": {"role": "assistant", "content": text}}],
+                "usage": usage,
+            })
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+
+        def emit(delta: Dict[str, Any], finish_reason: Optional[str] = None, **extra) -> None:
+            chunk = {"id": completion_id, "object": "chat.completion.chunk",
+                     "created": int(time.time()), "model": model,
+                     "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+                     **extra}
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+
+        emit({"role": "assistant", "content": ""})
+        for start in range(0, len(text), STREAM_CHUNK_CHARS):
+            emit({"content": text[start:start + STREAM_CHUNK_CHARS]})
+        emit({}, finish_reason="stop", usage=usage)
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, host: str, port: int, state: StubState):
+        super().__init__((host, port), StubHandler)
+        self.state = state
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self.serve_forever, name="loadtest-stub",
+                                        daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self.shutdown()
+        self.server_close()
+
+
+def create_stub_server(host: str = "127.0.0.1", port: int = 0, llm_latency: float = 0.5,
+                       upstream_latency: float = 0.05, tool_calls: bool = True) -> StubServer:
+    state = StubState(
+        llm=FakeLLM(load_fixture("llm_script.json"), tool_calls=tool_calls),
+        upstreams=load_fixture("upstreams.json"),
+        llm_latency=llm_latency,
+        upstream_latency=upstream_latency,
+    )
+    return StubServer(host, port, state)
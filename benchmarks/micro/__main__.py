@@ -0,0 +1,159 @@
+"""
+Раннер мікробенчмарків: час (медіана і мінімум на виклик) та пам'ять
+(tracemalloc: пік і утримане після виклику) для кожного бенчмарку і
+розміру. Результати пишуться в benchmarks/micro/results/<commit>.json;
+--compare порівнює з іншим прогоном і завершується з кодом 1, якщо
+щось сповільнилось або стало їсти більше пам'яті понад поріг:
+
+    python -m benchmarks.micro --output base.json
+    python -m benchmarks.micro --compare base.json
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+from benchmarks.micro.suite import BENCHMARKS
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+PROJECT_ROOT = os.path.dirname(os.path.dirname(RESULTS_DIR))
+
+
+def _git(*args: str) -> Optional[str]:
+    try:
+        return subprocess.run(["git", *args], cwd=PROJECT_ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def measure_time(run: Callable[[], object], min_time: float, repeat: int) -> Dict[str, Any]:
+    """Як timeit.autorange: кількість повторів у вимірі росте, поки вимір не триває min_time"""
+    run()
+    loops = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(loops):
+            run()
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_time:
+            break
+        loops *= 2 if elapsed < min_time / 10 else 1 + int(min_time / max(elapsed, 1e-9))
+
+    timings = [elapsed / loops]
+    for _ in range(repeat - 1):
+        started = time.perf_counter()
+        for _ in range(loops):
+            run()
+        timings.append((time.perf_counter() - started) / loops)
+    return {"median_s": statistics.median(timings), "min_s": min(timings), "loops": loops,
+            "repeat": repeat}
+
+
+def measure_memory(run: Callable[[], object]) -> Dict[str, int]:
+    gc.collect()
+    tracemalloc.start()
+    try:
+        baseline, _ = tracemalloc.get_traced_memory()
+        result = run()
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del result
+    return {"peak_bytes": peak - baseline, "retained_bytes": current - baseline}
+
+
+def run_suite(names: List[str], sizes: Optional[List[int]], min_time: float,
+              repeat: int) -> Dict[str, Dict[str, Any]]:
+    results = {}
+    for name in names:
+        bench = BENCHMARKS[name]
+        for size in bench.sizes:
+            if sizes and size not in sizes:
+                continue
+            run = bench.setup(size)
+            result = {**measure_time(run, min_time, repeat), **measure_memory(run)}
+            key = f"{name}[{size}]"
+            results[key] = result
+            print(f"{key:<55} {result['median_s'] * 1000:>12.3f} ms "
+                  f"{result['peak_bytes'] / 1024:>12.1f} KiB peak", flush=True)
+            del run
+    return results
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], time_threshold: float,
+            memory_threshold: float) -> List[str]:
+    """Порівнює прогони і повертає список регресій"""
+    regressions = []
+    print(f"\nvs {baseline.get('commit') or 'baseline'}:")
+    for key, result in current["results"].items():
+        previous = baseline["results"].get(key)
+        if previous is None:
+            continue
+        time_ratio = result["median_s"] / previous["median_s"] if previous["median_s"] else 1.0
+        memory_ratio = (result["peak_bytes"] / previous["peak_bytes"]
+                        if previous["peak_bytes"] > 0 else 1.0)
+        flags = []
+        if time_ratio > time_threshold:
+            flags.append("SLOWER")
+        if memory_ratio > memory_threshold:
+            flags.append("MORE MEMORY")
+        print(f"{key:<55} time x{time_ratio:>6.2f}  memory x{memory_ratio:>6.2f}  {' '.join(flags)}")
+        if flags:
+            regressions.append(f"{key}: {', '.join(flags)}")
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.micro",
+                                     description="Microbenchmarks for the aviation analytics")
+    parser.add_argument("--filter", help="Run benchmarks whose name contains this text")
+    parser.add_argument("--sizes", help="Comma-separated sizes, e.g. 100,10000")
+    parser.add_argument("--min-time", type=float, default=0.2, help="Seconds per measurement")
+    parser.add_argument("--repeat", type=int, default=5, help="Measurements per benchmark")
+    parser.add_argument("--output", help="Result file (default: results/<commit>.json)")
+    parser.add_argument("--compare", help="Baseline result file to compare against")
+    parser.add_argument("--time-threshold", type=float, default=1.15,
+                        help="Median time ratio that counts as a regression")
+    parser.add_argument("--memory-threshold", type=float, default=1.15,
+                        help="Peak memory ratio that counts as a regression")
+    args = parser.parse_args(argv)
+
+    names = [name for name in BENCHMARKS if not args.filter or args.filter in name]
+    sizes = [int(size) for size in args.sizes.split(",")] if args.sizes else None
+    commit = _git("rev-parse", "--short", "HEAD")
+    report = {
+        "commit": commit,
+        "dirty": bool(_git("status", "--porcelain", "--untracked-files=no")),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "results": run_suite(names, sizes, args.min_time, args.repeat),
+    }
+
+    output = args.output or os.path.join(RESULTS_DIR, f"{commit or 'local'}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            regressions = compare(report, json.load(f), args.time_threshold,
+                                  args.memory_threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s):\n  " + "\n  ".join(regressions))
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,93 @@
+"""
+Синтетичні дані OpenSky для мікробенчмарків. Генерація детермінована
+(seed), тож прогони на різних комітах працюють з однаковими входами.
+Списки кешуються і спільні для бенчмарків - змінювати їх не можна.
+"""
+import random
+from functools import lru_cache
+from typing import Any, Dict, List
+
+from backend.clients.open_sky_client import Flight, StateVector, TrackPoint
+
+BASE_TIME = 1760000000
+AIRLINES = ["PS", "LOT", "WZZ", "RYR", "AUI", "THY", "DLH", "SAS", "KLM", "BAW", "EZY", "AFR"]
+COUNTRIES = ["Ukraine", "Poland", "Hungary", "Ireland", "Turkey", "Germany", "Sweden",
+             "Netherlands", "United Kingdom", "France", "United States", "China"]
+AIRPORTS = ["UKBB", "EPWA", "LHBP", "EIDW", "LTFM", "EDDF", "ESSA", "EHAM", "EGLL", "LFPG"]
+
+
+@lru_cache(maxsize=8)
+def state_rows(count: int, seed: int = 42) -> List[List[Any]]:
+    """Рядки states/all у форматі OpenSky (18 полів), розкидані по всій земній кулі"""
+    rng = random.Random(seed)
+    rows = []
+    for index in range(count):
+        on_ground = rng.random() < 0.1
+        has_position = rng.random() > 0.02
+        rows.append([
+            f"{rng.randrange(0x100000, 0xffffff):06x}",
+            f"{rng.choice(AIRLINES)}{rng.randrange(1, 9999):<5}",
+            rng.choice(COUNTRIES),
+            BASE_TIME - rng.randrange(0, 15),
+            BASE_TIME - rng.randrange(0, 5),
+            round(rng.uniform(-180.0, 180.0), 4) if has_position else None,
+            round(rng.uniform(-60.0, 72.0), 4) if has_position else None,
+            None if on_ground else round(rng.uniform(300, 12500), 2),
+            on_ground,
+            round(rng.uniform(0, 25), 2) if on_ground else round(rng.uniform(60, 300), 2),
+            round(rng.uniform(0, 359.9), 2),
+            0.0 if on_ground else round(rng.uniform(-15, 15), 2),
+            None,
+            None if on_ground else round(rng.uniform(300, 12800), 2),
+            f"{rng.randrange(1000, 7777)}",
+            False,
+            rng.choice([0, 0, 0, 2]),
+            rng.randrange(0, 8),
+        ])
+    return rows
+
+
+def states_payload(count: int, seed: int = 42) -> Dict[str, Any]:
+    """Відповідь states/all, як її повертає _get_json"""
+    return {"time": BASE_TIME, "states": state_rows(count, seed)}
+
+
+@lru_cache(maxsize=8)
+def state_vectors(count: int, seed: int = 42) -> List[StateVector]:
+    fields = list(StateVector.model_fields)
+    return [StateVector(**dict(zip(fields, row))) for row in state_rows(count, seed)]
+
+
+def flights(count: int, seed: int = 42) -> List[Flight]:
+    rng = random.Random(seed)
+    result = []
+    for index in range(count):
+        first_seen = BASE_TIME - rng.randrange(3600, 86400)
+        result.append(Flight(
+            icao24=f"{rng.randrange(0x100000, 0xffffff):06x}",
+            first_seen=first_seen,
+            est_departure_airport=rng.choice(AIRPORTS + [None]),
+            last_seen=first_seen + rng.randrange(1800, 14400),
+            est_arrival_airport=rng.choice(AIRPORTS + [None]),
+            callsign=f"{rng.choice(AIRLINES)}{rng.randrange(1, 9999)}",
+            est_departure_airport_horiz_distance=rng.randrange(0, 5000),
+            est_departure_airport_vert_distance=rng.randrange(0, 200),
+            est_arrival_airport_horiz_distance=rng.randrange(0, 5000),
+            est_arrival_airport_vert_distance=rng.randrange(0, 200),
+            departure_airport_candidates_count=rng.randrange(0, 3),
+            arrival_airport_candidates_count=rng.randrange(0, 3),
+        ))
+    return result
+
+
+def track_points(count: int, seed: int = 42) -> List[TrackPoint]:
+    rng = random.Random(seed)
+    latitude, longitude = 50.0, 24.0
+    points = []
+    for index in range(count):
+        latitude += rng.uniform(-0.05, 0.05)
+        longitude += rng.uniform(0.0, 0.1)
+        points.append(TrackPoint(time=BASE_TIME - (count - index) * 30, latitude=latitude,
+                                 longitude=longitude, baro_altitude=rng.uniform(8000, 11000),
+                                 true_track=rng.uniform(80, 100), on_ground=False))
+    return points
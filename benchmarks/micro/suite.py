@@ -0,0 +1,108 @@
+"""
+Мікробенчмарки аналітики авіапростору. Кожен бенчмарк - функція
+setup(size) -> callable: підготовка входів не потрапляє в замір, а
+повернений callable виконує рівно одну операцію, яку міряє раннер.
+"""
+import contextlib
+import io
+from dataclasses import dataclass
+from typing import Callable, Dict, Tuple
+
+from benchmarks.micro import fixtures
+
+SIZES = (100, 10_000, 100_000)
+# HTML-картки рендеряться по одній на літак, 100k карток - це ~150 МБ рядків
+HTML_SIZES = (100, 10_000)
+EUROPE_BOUNDS = (35.0, 72.0, -25.0, 45.0)
+
+Setup = Callable[[int], Callable[[], object]]
+
+
+@dataclass(frozen=True)
+class Benchmark:
+    name: str
+    setup: Setup
+    sizes: Tuple[int, ...]
+
+
+BENCHMARKS: Dict[str, Benchmark] = {}
+
+
+def benchmark(name: str, sizes: Tuple[int, ...] = SIZES):
+    """Реєструє бенчмарк у наборі"""
+    def decorator(setup: Setup) -> Setup:
+        BENCHMARKS[name] = Benchmark(name, setup, sizes)
+        return setup
+    return decorator
+
+
+@benchmark("analyze_aircraft_distribution")
+def bench_aircraft_distribution(size: int):
+    from backend.core.agents.sky_analyst_agent import analyze_aircraft_distribution
+
+    states = fixtures.state_vectors(size)
+    return lambda: analyze_aircraft_distribution(states)
+
+
+@benchmark("get_traffic_density_analysis[global]")
+def bench_density_global(size: int):
+    from backend.core.agents.sky_analyst_agent import get_traffic_density_analysis
+
+    states = fixtures.state_vectors(size)
+    return lambda: get_traffic_density_analysis(states)
+
+
+@benchmark("get_traffic_density_analysis[bounds]")
+def bench_density_bounds(size: int):
+    from backend.core.agents.sky_analyst_agent import get_traffic_density_analysis
+
+    states = fixtures.state_vectors(size)
+    return lambda: get_traffic_density_analysis(states, bounds=EUROPE_BOUNDS)
+
+
+@benchmark("OpenSkyClient.get_states")
+def bench_get_states(size: int):
+    from backend.clients.open_sky_client import OpenSkyClient
+
+    client = OpenSkyClient()
+    payload = fixtures.states_payload(size)
+    # Відповідь підставляється замість HTTP: міряється лише розбір state vectors
+    client._get_json = lambda endpoint, params: payload
+
+    def run():
+        # get_states друкує відповідь - вивід теж частина вартості, але не в консоль
+        with contextlib.redirect_stdout(io.StringIO()):
+            return client.get_states(bbox=EUROPE_BOUNDS)
+    return run
+
+
+@benchmark("_create_aircraft_card", sizes=HTML_SIZES)
+def bench_aircraft_cards(size: int):
+    from backend.core.agents.sky_agent import _create_aircraft_card
+
+    states = fixtures.state_vectors(size)
+    return lambda: "".join(_create_aircraft_card(state) for state in states)
+
+
+@benchmark("_create_flight_card", sizes=HTML_SIZES)
+def bench_flight_cards(size: int):
+    from backend.core.agents.sky_agent import _create_flight_card
+
+    flights = fixtures.flights(size)
+    return lambda: "".join(_create_flight_card(flight) for flight in flights)
+
+
+@benchmark("_create_simple_flight_card", sizes=HTML_SIZES)
+def bench_simple_flight_cards(size: int):
+    from backend.core.agents.sky_agent import _create_simple_flight_card
+
+    flights = fixtures.flights(size)
+    return lambda: "".join(_create_simple_flight_card(flight) for flight in flights)
+
+
+@benchmark("_create_track_point", sizes=HTML_SIZES)
+def bench_track_points(size: int):
+    from backend.core.agents.sky_agent import _create_track_point
+
+    points = fixtures.track_points(size)
+    return lambda: "".join(_create_track_point(point, index) for index, point in enumerate(points))
@@ -21,7 +21,7 @@ if config.config_file_name is not None:
 try:
     from backend.models import Base
     target_metadata = Base.metadata
-    from backend.models import agents, user, chat_history
+    from backend.models import agents, user, chat_history, airspace_snapshot, aircraft_photo, job, llm_usage, chat_memory, chat_summary
 except ImportError:
     try:
         from backend.database import Base
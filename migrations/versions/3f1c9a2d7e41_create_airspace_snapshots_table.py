@@ -0,0 +1,38 @@
+"""create airspace_snapshots table
+
+Revision ID: 3f1c9a2d7e41
+Revises: b6cd52f5bf0a
+Create Date: 2025-06-08 19:12:44.517306
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f1c9a2d7e41'
+down_revision: Union[str, None] = 'b6cd52f5bf0a'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('airspace_snapshots',
+    sa.Column('country', sa.String(), nullable=False),
+    sa.Column('resolution', sa.String(), nullable=False),
+    sa.Column('bucket_start', sa.DateTime(), nullable=False),
+    sa.Column('samples', sa.Integer(), nullable=False),
+    sa.Column('total_sum', sa.Integer(), nullable=False),
+    sa.Column('total_max', sa.Integer(), nullable=False),
+    sa.Column('active_sum', sa.Integer(), nullable=False),
+    sa.Column('ground_sum', sa.Integer(), nullable=False),
+    sa.Column('high_altitude_sum', sa.Integer(), nullable=False),
+    sa.Column('max_density', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('country', 'resolution', 'bucket_start')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('airspace_snapshots')
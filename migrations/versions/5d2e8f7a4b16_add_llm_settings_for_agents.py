@@ -0,0 +1,30 @@
+"""add llm settings for agents
+
+Revision ID: 5d2e8f7a4b16
+Revises: e4b7a1c93f20
+Create Date: 2025-06-13 09:52:14.207631
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5d2e8f7a4b16'
+down_revision: Union[str, None] = 'e4b7a1c93f20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('agents', sa.Column('model', sa.String(), nullable=True))
+    op.add_column('agents', sa.Column('max_tokens', sa.Integer(), nullable=True))
+    op.add_column('agents', sa.Column('timeout', sa.Float(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('agents', 'timeout')
+    op.drop_column('agents', 'max_tokens')
+    op.drop_column('agents', 'model')
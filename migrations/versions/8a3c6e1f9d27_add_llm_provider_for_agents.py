@@ -0,0 +1,26 @@
+"""add llm provider for agents
+
+Revision ID: 8a3c6e1f9d27
+Revises: 5d2e8f7a4b16
+Create Date: 2025-06-16 11:08:41.532904
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8a3c6e1f9d27'
+down_revision: Union[str, None] = '5d2e8f7a4b16'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('agents', sa.Column('llm_provider', sa.String(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('agents', 'llm_provider')
@@ -0,0 +1,38 @@
+"""create aircraft_photos table
+
+Revision ID: 8a4e0c7b5d13
+Revises: 3f1c9a2d7e41
+Create Date: 2025-06-09 11:03:27.184452
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8a4e0c7b5d13'
+down_revision: Union[str, None] = '3f1c9a2d7e41'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('aircraft_photos',
+    sa.Column('hex_code', sa.String(), nullable=False),
+    sa.Column('has_photo', sa.Boolean(), nullable=False),
+    sa.Column('thumbnail_url', sa.String(), nullable=True),
+    sa.Column('link', sa.String(), nullable=True),
+    sa.Column('photographer', sa.String(), nullable=True),
+    sa.Column('local_path', sa.String(), nullable=True),
+    sa.Column('etag', sa.String(), nullable=True),
+    sa.Column('last_modified', sa.String(), nullable=True),
+    sa.Column('fetched_at', sa.DateTime(), nullable=False),
+    sa.Column('expires_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('hex_code')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('aircraft_photos')
@@ -0,0 +1,38 @@
+"""create chat message embeddings table
+
+Revision ID: b1e5d7c3a942
+Revises: 8a3c6e1f9d27
+Create Date: 2025-06-18 10:24:16.840217
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b1e5d7c3a942'
+down_revision: Union[str, None] = '8a3c6e1f9d27'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('chat_message_embeddings',
+    sa.Column('message_id', sa.UUID(), nullable=False),
+    sa.Column('user_id', sa.UUID(), nullable=False),
+    sa.Column('agent_id', sa.UUID(), nullable=True),
+    sa.Column('model', sa.String(), nullable=False),
+    sa.Column('embedding', sa.LargeBinary(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['agent_id'], ['agents.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('message_id')
+    )
+    op.create_index('ix_chat_message_embeddings_user_agent_created_at', 'chat_message_embeddings', ['user_id', 'agent_id', 'created_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_chat_message_embeddings_user_agent_created_at', table_name='chat_message_embeddings')
+    op.drop_table('chat_message_embeddings')
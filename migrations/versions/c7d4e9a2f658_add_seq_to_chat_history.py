@@ -0,0 +1,40 @@
+"""add seq to chat_history
+
+Revision ID: c7d4e9a2f658
+Revises: f3a8c2d6b915
+Create Date: 2025-06-23 10:12:41.508317
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c7d4e9a2f658'
+down_revision: Union[str, None] = 'f3a8c2d6b915'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('chat_history', sa.Column('seq', sa.BigInteger(), nullable=True))
+    # Наявні повідомлення нумеруються в старому порядку курсора (was_sent, id)
+    op.execute(
+        "UPDATE chat_history SET seq = ordered.seq "
+        "FROM (SELECT id, row_number() OVER (ORDER BY was_sent, id) AS seq FROM chat_history) AS ordered "
+        "WHERE chat_history.id = ordered.id"
+    )
+    op.alter_column('chat_history', 'seq', nullable=False)
+    op.execute("ALTER TABLE chat_history ALTER COLUMN seq ADD GENERATED BY DEFAULT AS IDENTITY")
+    op.execute(
+        "SELECT setval(pg_get_serial_sequence('chat_history', 'seq'), "
+        "COALESCE((SELECT max(seq) FROM chat_history), 0) + 1, false)"
+    )
+    op.create_index('ix_chat_history_user_agent_seq', 'chat_history', ['user_id', 'agent_id', 'seq'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_chat_history_user_agent_seq', table_name='chat_history')
+    op.drop_column('chat_history', 'seq')
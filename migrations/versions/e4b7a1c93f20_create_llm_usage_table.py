@@ -0,0 +1,51 @@
+"""create llm usage table
+
+Revision ID: e4b7a1c93f20
+Revises: c25d9f61e0b8
+Create Date: 2025-06-12 11:08:37.415902
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e4b7a1c93f20'
+down_revision: Union[str, None] = 'c25d9f61e0b8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('llm_usage',
+    sa.Column('id', sa.UUID(), nullable=False),
+    sa.Column('chat_message_id', sa.UUID(), nullable=False),
+    sa.Column('user_id', sa.UUID(), nullable=False),
+    sa.Column('agent_id', sa.UUID(), nullable=True),
+    sa.Column('agent_type', sa.String(), nullable=False),
+    sa.Column('model', sa.String(), nullable=True),
+    sa.Column('prompt_chars', sa.Integer(), nullable=False),
+    sa.Column('prompt_tokens', sa.Integer(), nullable=False),
+    sa.Column('cached_prompt_tokens', sa.Integer(), nullable=False),
+    sa.Column('completion_tokens', sa.Integer(), nullable=False),
+    sa.Column('llm_requests', sa.Integer(), nullable=False),
+    sa.Column('tool_calls', sa.Integer(), nullable=False),
+    sa.Column('duration_ms', sa.Integer(), nullable=False),
+    sa.Column('coins', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['agent_id'], ['agents.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_llm_usage_chat_message_id', 'llm_usage', ['chat_message_id'], unique=False)
+    op.create_index('ix_llm_usage_user_id_created_at', 'llm_usage', ['user_id', 'created_at'], unique=False)
+    op.create_index('ix_llm_usage_agent_id_created_at', 'llm_usage', ['agent_id', 'created_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_llm_usage_agent_id_created_at', table_name='llm_usage')
+    op.drop_index('ix_llm_usage_user_id_created_at', table_name='llm_usage')
+    op.drop_index('ix_llm_usage_chat_message_id', table_name='llm_usage')
+    op.drop_table('llm_usage')
@@ -0,0 +1,59 @@
+"""add chat archive and summaries
+
+Revision ID: f3a8c2d6b915
+Revises: b1e5d7c3a942
+Create Date: 2025-06-20 14:37:52.119604
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3a8c2d6b915'
+down_revision: Union[str, None] = 'b1e5d7c3a942'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_chat_history_user_agent_was_sent', 'chat_history', ['user_id', 'agent_id', 'was_sent'], unique=False)
+    op.create_table('chat_history_archive',
+    sa.Column('id', sa.UUID(), nullable=False),
+    sa.Column('user_id', sa.UUID(), nullable=False),
+    sa.Column('agent_id', sa.UUID(), nullable=True),
+    sa.Column('message_type', postgresql.ENUM('TEXT', 'IMAGE', name='messagetype', create_type=False), nullable=False),
+    sa.Column('sender', sa.String(), nullable=True),
+    sa.Column('message_text', sa.String(), nullable=True),
+    sa.Column('message_image', sa.String(), nullable=True),
+    sa.Column('was_sent', sa.DateTime(), nullable=True),
+    sa.Column('archived_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['agent_id'], ['agents.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_chat_history_archive_user_agent_was_sent', 'chat_history_archive', ['user_id', 'agent_id', 'was_sent'], unique=False)
+    op.create_table('chat_summaries',
+    sa.Column('id', sa.UUID(), nullable=False),
+    sa.Column('user_id', sa.UUID(), nullable=False),
+    sa.Column('agent_id', sa.UUID(), nullable=True),
+    sa.Column('summary', sa.String(), nullable=False),
+    sa.Column('archived_messages', sa.Integer(), nullable=False),
+    sa.Column('summarized_until', sa.DateTime(), nullable=True),
+    sa.Column('version', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['agent_id'], ['agents.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('user_id', 'agent_id', name='uq_chat_summaries_user_agent')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('chat_summaries')
+    op.drop_index('ix_chat_history_archive_user_agent_was_sent', table_name='chat_history_archive')
+    op.drop_table('chat_history_archive')
+    op.drop_index('ix_chat_history_user_agent_was_sent', table_name='chat_history')